@@ -0,0 +1,136 @@
+"""
+Накладные расходы хранилища FSM-состояний на одно обновление
+
+Каждое обновление повторяет обращения к хранилищу, которые делают
+middleware aiogram и обработчики: чтение состояния на каждом
+обновлении, затем по кругу — начало редактирования задачи
+(update_data + set_state), ввод текста (get_data + clear) и обычное
+сообщение без состояния. Серия прогоняется на MemoryStorage,
+BoundedMemoryStorage и PostgresStorage с кэшем и без него; выводятся
+p50/p99 на обновление и разница с MemoryStorage.
+
+Нужна PostgreSQL с примененными миграциями (python migrate.py).
+
+Использование:
+    python benchmark_fsm.py [--updates N] [--users N] [--concurrency N]
+"""
+import argparse
+import asyncio
+import time
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from database import db
+from services.fsm_storage import BoundedMemoryStorage, PostgresStorage
+from states import TaskStates
+from utils.metrics import acquire
+
+# Отдельный bot_id, чтобы не задеть состояния настоящего бота
+BENCHMARK_BOT_ID = -1
+
+
+def percentile(values, fraction: float) -> float:
+    """Перцентиль по отсортированному списку значений"""
+    values = sorted(values)
+    index = min(len(values) - 1, int(len(values) * fraction))
+    return values[index]
+
+
+async def handle_update(state: FSMContext, step: int):
+    """Обращения к хранилищу при обработке одного обновления"""
+    # FSMContextMiddleware читает состояние на каждом обновлении
+    await state.get_state()
+
+    if step % 3 == 0:
+        await state.update_data(editing_task_id=step)
+        await state.set_state(TaskStates.waiting_for_task_edit)
+    elif step % 3 == 1:
+        await state.get_data()
+        await state.clear()
+
+
+async def run_updates(storage, updates: int, users: int, concurrency: int):
+    """Задержки обновлений в мс; обновления пользователя идут по порядку"""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_user(user_id: int, count: int):
+        key = StorageKey(
+            bot_id=BENCHMARK_BOT_ID, chat_id=user_id, user_id=user_id
+        )
+        state = FSMContext(storage=storage, key=key)
+        for step in range(count):
+            async with semaphore:
+                started = time.perf_counter()
+                await handle_update(state, step)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    per_user = max(1, updates // users)
+    await asyncio.gather(
+        *(run_user(user_id, per_user) for user_id in range(1, users + 1))
+    )
+    return latencies
+
+
+async def run_benchmark(updates: int, users: int, concurrency: int):
+    """Сравнение хранилищ с MemoryStorage"""
+    try:
+        await db.create_pool()
+
+        storages = [
+            ("MemoryStorage", MemoryStorage()),
+            ("BoundedMemoryStorage", BoundedMemoryStorage()),
+            ("PostgresStorage (кэш)", PostgresStorage()),
+            ("PostgresStorage (без кэша)", PostgresStorage(cache_size=0))
+        ]
+
+        baseline = None
+        for title, storage in storages:
+            latencies = await run_updates(storage, updates, users, concurrency)
+            p50 = percentile(latencies, 0.5) * 1000
+            p99 = percentile(latencies, 0.99) * 1000
+            mean = sum(latencies) / len(latencies) * 1000
+
+            line = (
+                f"📊 {title}: среднее {mean:.0f} мкс, "
+                f"p50={p50:.0f} мкс, p99={p99:.0f} мкс"
+            )
+            if baseline is None:
+                baseline = mean
+            else:
+                line += f", +{mean - baseline:.0f} мкс к памяти"
+            print(line)
+
+            if hasattr(storage, 'stats'):
+                print(f"   {storage.stats()}")
+            await storage.close()
+
+        # Убираем состояния, созданные замером
+        async with acquire(db.pool) as connection:
+            await connection.execute(
+                "DELETE FROM fsm_states WHERE bot_id = $1", BENCHMARK_BOT_ID
+            )
+        return True
+
+    except Exception as e:
+        print(f"❌ Ошибка: {e}")
+        return False
+    finally:
+        await db.close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Сравнение хранилищ FSM-состояний"
+    )
+    parser.add_argument("--updates", type=int, default=6000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    success = asyncio.run(
+        run_benchmark(args.updates, args.users, args.concurrency)
+    )
+    exit(0 if success else 1)
@@ -0,0 +1,128 @@
+"""
+Сравнение задержки запросов на холодном и прогретом пуле
+
+Холодный пул — обычный asyncpg.create_pool: каждый запрос готовится
+на соединении при первом выполнении. Прогретый — пул с init-хуком,
+который заранее готовит запросы реестра (utils/statements.py).
+На каждом пуле выполняется серия снимков списка задач и выводятся
+p50/p99, отдельно для первых запросов после создания пула.
+
+Использование:
+    python benchmark_pool.py [--requests N] [--concurrency N]
+"""
+import argparse
+import asyncio
+import time
+
+import asyncpg
+
+from config import DB_CONFIG
+from database import POOL_SETTINGS
+from utils.statements import (
+    STATEMENTS,
+    create_statement_pool,
+    page_statement
+)
+
+SNAPSHOT = page_statement(
+    'tasks_snapshot', include_completed=False, has_cursor=False,
+    backward=False
+)
+
+
+def percentile(values, fraction: float) -> float:
+    """Перцентиль по отсортированному списку значений"""
+    values = sorted(values)
+    index = min(len(values) - 1, int(len(values) * fraction))
+    return values[index]
+
+
+async def run_requests(pool, user_ids, concurrency: int, prepared: bool):
+    """Выполнение снимков списка задач, возвращает задержки в мс"""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_request(user_id: int):
+        async with semaphore:
+            started = time.perf_counter()
+            async with pool.acquire() as connection:
+                if prepared:
+                    await connection.fetch_statement(SNAPSHOT, user_id, 11)
+                else:
+                    await connection.fetch(STATEMENTS[SNAPSHOT], user_id, 11)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one_request(user_id) for user_id in user_ids))
+    return latencies
+
+
+def report(title: str, latencies, warmup: int):
+    """Вывод p50/p99 по всем запросам и по первым warmup запросам"""
+    first = latencies[:warmup]
+    print(
+        f"{title}: p50={percentile(latencies, 0.5):.2f} мс, "
+        f"p99={percentile(latencies, 0.99):.2f} мс; "
+        f"первые {len(first)}: p99={percentile(first, 0.99):.2f} мс"
+    )
+
+
+async def run_benchmark(requests: int, concurrency: int):
+    """Замер на холодном и прогретом пуле"""
+    try:
+        probe = await asyncpg.connect(**DB_CONFIG)
+        try:
+            rows = await probe.fetch(
+                "SELECT user_id FROM user_task_counters LIMIT 1000"
+            )
+        finally:
+            await probe.close()
+
+        if not rows:
+            print("❌ В базе нет пользователей с задачами")
+            return False
+
+        user_ids = [
+            rows[i % len(rows)]['user_id'] for i in range(requests)
+        ]
+        warmup = POOL_SETTINGS['max_size']
+
+        cold_pool = await asyncpg.create_pool(**POOL_SETTINGS, **DB_CONFIG)
+        try:
+            cold = await run_requests(
+                cold_pool, user_ids, concurrency, prepared=False
+            )
+        finally:
+            await cold_pool.close()
+
+        warm_pool = await create_statement_pool(
+            STATEMENTS, **POOL_SETTINGS, **DB_CONFIG
+        )
+        try:
+            warm = await run_requests(
+                warm_pool, user_ids, concurrency, prepared=True
+            )
+        finally:
+            await warm_pool.close()
+
+        report("❄️ Холодный пул", cold, warmup)
+        report("🔥 Прогретый пул", warm, warmup)
+        return True
+
+    except asyncpg.PostgresError as e:
+        print(f"❌ Ошибка PostgreSQL: {e}")
+        return False
+    except Exception as e:
+        print(f"❌ Неожиданная ошибка: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Задержка запросов на холодном и прогретом пуле"
+    )
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    success = asyncio.run(run_benchmark(args.requests, args.concurrency))
+    exit(0 if success else 1)
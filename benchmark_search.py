@@ -0,0 +1,158 @@
+"""
+Задержка поиска задач (/search) у пользователя с большим числом задач
+
+У отдельного пользователя создаются --tasks задач из случайных слов
+и обновляется статистика. Затем через пул с подготовленными запросами
+(как в боте) выполняется --requests поисков первой страницы: по целому
+слову, по словоформе, с опечаткой и по подстроке. Выводятся p50/p99
+по каждому виду и в целом; код выхода 1, если общий p99 больше
+--target-ms. Тестовые задачи удаляются после замера.
+
+Нужна PostgreSQL с примененными миграциями (python migrate.py).
+
+Использование:
+    python benchmark_search.py [--tasks N] [--requests N] [--target-ms N]
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+from config import DB_CONFIG
+from database import POOL_SETTINGS
+from utils.statements import (
+    STATEMENTS,
+    contains_pattern,
+    create_statement_pool,
+    search_statement
+)
+
+# Отдельный пользователь, чтобы не задеть задачи настоящих пользователей
+BENCHMARK_USER_ID = -1
+
+WORDS = [
+    "купить", "молоко", "позвонить", "маме", "отчет", "квартальный",
+    "записаться", "врачу", "оплатить", "интернет", "подготовить",
+    "презентацию", "встреча", "командой", "забрать", "посылку",
+    "почитать", "книгу", "починить", "велосипед", "отправить", "документы",
+    "бухгалтерию", "проверить", "почту", "заказать", "билеты", "поезд"
+]
+
+# Вид поиска -> запросы (словоформа и опечатка проверяют
+# полнотекстовый и нечеткий поиск соответственно)
+QUERIES = {
+    "слово": ["молоко", "отчет", "велосипед", "билеты"],
+    "словоформа": ["купила", "отчеты", "встречи", "документ"],
+    "опечатка": ["малоко", "презентацыю", "велосепед", "пасылку"],
+    "подстрока": ["лосип", "зентац", "хгалт", "ылку"]
+}
+
+
+def percentile(values, fraction: float) -> float:
+    """Перцентиль по отсортированному списку значений"""
+    values = sorted(values)
+    index = min(len(values) - 1, int(len(values) * fraction))
+    return values[index]
+
+
+def random_task_text() -> str:
+    """Текст задачи из 3-6 случайных слов"""
+    return " ".join(random.choices(WORDS, k=random.randint(3, 6)))
+
+
+async def seed_tasks(pool, count: int):
+    """Тестовые задачи пользователя BENCHMARK_USER_ID"""
+    texts = [random_task_text() for _ in range(count)]
+    async with pool.acquire() as connection:
+        await connection.execute(
+            """
+            INSERT INTO tasks (user_id, task_text)
+            SELECT $1, task_text FROM unnest($2::TEXT[]) AS task_text
+            """,
+            BENCHMARK_USER_ID, texts
+        )
+        await connection.execute("ANALYZE tasks")
+
+
+async def run_searches(pool, requests: int):
+    """Поиски первой страницы, задержки в мс по видам запросов"""
+    statement = search_statement(has_cursor=False, backward=False)
+    latencies = defaultdict(list)
+
+    for i in range(requests):
+        kind = list(QUERIES)[i % len(QUERIES)]
+        query = random.choice(QUERIES[kind])
+
+        started = time.perf_counter()
+        async with pool.acquire() as connection:
+            await connection.fetch_statement(
+                statement,
+                BENCHMARK_USER_ID,
+                query,
+                contains_pattern(query),
+                11
+            )
+        latencies[kind].append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def run_benchmark(tasks: int, requests: int, target_ms: float):
+    """Замер поиска; True, если p99 укладывается в target_ms"""
+    pool = None
+    try:
+        pool = await create_statement_pool(
+            STATEMENTS, **POOL_SETTINGS, **DB_CONFIG
+        )
+        await seed_tasks(pool, tasks)
+
+        try:
+            latencies = await run_searches(pool, requests)
+        finally:
+            async with pool.acquire() as connection:
+                await connection.execute(
+                    "DELETE FROM tasks WHERE user_id = $1", BENCHMARK_USER_ID
+                )
+                await connection.execute(
+                    "DELETE FROM user_task_counters WHERE user_id = $1",
+                    BENCHMARK_USER_ID
+                )
+
+        everything = []
+        for kind, values in latencies.items():
+            everything.extend(values)
+            print(
+                f"🔎 {kind}: p50={percentile(values, 0.5):.2f} мс, "
+                f"p99={percentile(values, 0.99):.2f} мс"
+            )
+
+        p99 = percentile(everything, 0.99)
+        ok = p99 <= target_ms
+        print(
+            f"{'✅' if ok else '❌'} Все запросы ({tasks} задач): "
+            f"p50={percentile(everything, 0.5):.2f} мс, p99={p99:.2f} мс "
+            f"(цель {target_ms:.0f} мс)"
+        )
+        return ok
+
+    except Exception as e:
+        print(f"❌ Ошибка: {e}")
+        return False
+    finally:
+        if pool is not None:
+            await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Задержка поиска задач у пользователя с большим списком"
+    )
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--target-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    success = asyncio.run(
+        run_benchmark(args.tasks, args.requests, args.target_ms)
+    )
+    exit(0 if success else 1)
@@ -0,0 +1,231 @@
+"""
+Нагрузочная проверка режима webhook без Telegram
+
+Скрипт поднимает локально фейковый Bot API (отвечает на любые
+методы), webhook-сервер бота и отправитель, который, как Telegram,
+POST-запросами присылает обновления: сообщения "📋 Мои задачи"
+и нажатия кнопок выбора задач. Выводятся обработанные обновления
+в секунду, p50/p99 задержки ответа на webhook, число запросов
+к Bot API и сколько ответов на callback ушло в ответе на webhook.
+
+По умолчанию используется хранилище в памяти (DB_BACKEND=memory),
+чтобы замерять накладные расходы обработчиков отдельно от БД.
+С --rate-limit отправки идут через очередь с лимитами Telegram
+(services/outbound.py) и выводятся ее глубина и время ожидания.
+
+Использование:
+    python benchmark_webhook.py [--updates N] [--concurrency N]
+        [--users N] [--rate-limit]
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+
+os.environ.setdefault('DB_BACKEND', 'memory')
+
+from aiogram import Bot  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiohttp import ClientSession, web  # noqa: E402
+
+from bot import create_dispatcher  # noqa: E402
+from config import BOT_TOKEN, WEBHOOK_PATH  # noqa: E402
+from database import db  # noqa: E402
+from services.outbound import (  # noqa: E402
+    OutboundLimiter,
+    OutboundScheduler
+)
+from services.webhook import create_webhook_app  # noqa: E402
+
+SECRET = "benchmark-secret"
+
+
+def percentile(values, fraction: float) -> float:
+    """Перцентиль по отсортированному списку значений"""
+    values = sorted(values)
+    index = min(len(values) - 1, int(len(values) * fraction))
+    return values[index]
+
+
+def fake_message(chat_id: int) -> dict:
+    """Минимальное сообщение бота, которое вернет фейковый Bot API"""
+    return {
+        "message_id": 1,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "text": "ok"
+    }
+
+
+def create_fake_api(calls: Counter) -> web.Application:
+    """Фейковый Bot API: считает вызовы методов и отвечает успехом"""
+
+    async def handle(request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        calls[method] += 1
+        data = await request.post()
+
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Bench"}
+        elif method in ("sendMessage", "editMessageText"):
+            result = fake_message(int(data.get("chat_id", 1)))
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", handle)
+    return app
+
+
+def make_update(update_id: int, user_id: int) -> dict:
+    """Сообщение со списком задач или нажатие кнопки выбора задачи"""
+    user = {"id": user_id, "is_bot": False, "first_name": "User"}
+    chat = {"id": user_id, "type": "private"}
+
+    if update_id % 2:
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": chat,
+                "from": user,
+                "text": "📋 Мои задачи"
+            }
+        }
+
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": user,
+            "chat_instance": str(user_id),
+            "data": f"select_task:{update_id}",
+            "message": {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": chat,
+                "text": "Выбор задач"
+            }
+        }
+    }
+
+
+async def start_site(app: web.Application) -> tuple:
+    """Запуск приложения на свободном локальном порту (без access-лога)"""
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def run_benchmark(
+        updates: int,
+        concurrency: int,
+        users: int,
+        rate_limit: bool = False
+):
+    """Отправка обновлений на webhook и замер задержки ответа"""
+    calls = Counter()
+    runners = []
+    outbound = OutboundScheduler() if rate_limit else None
+
+    try:
+        await db.create_pool()
+        for user_id in range(1, users + 1):
+            await db.add_tasks(
+                user_id, [f"Задача {i}" for i in range(1, 21)]
+            )
+
+        api_runner, api_url = await start_site(create_fake_api(calls))
+        runners.append(api_runner)
+
+        bot = Bot(
+            token=BOT_TOKEN,
+            session=AiohttpSession(api=TelegramAPIServer.from_base(api_url))
+        )
+        if outbound is not None:
+            bot.session.middleware(OutboundLimiter(outbound))
+        app = create_webhook_app(bot, create_dispatcher(), SECRET)
+        bot_runner, bot_url = await start_site(app)
+        runners.append(bot_runner)
+
+        latencies = []
+        replies = 0
+        semaphore = asyncio.Semaphore(concurrency)
+        headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+
+        async with ClientSession() as session:
+            async def send(update_id: int):
+                nonlocal replies
+                update = make_update(update_id, update_id % users + 1)
+                async with semaphore:
+                    started = time.perf_counter()
+                    async with session.post(
+                        bot_url + WEBHOOK_PATH, json=update, headers=headers
+                    ) as response:
+                        body = await response.read()
+                        if response.status != 200:
+                            raise RuntimeError(
+                                f"Webhook ответил {response.status}"
+                            )
+                    latencies.append((time.perf_counter() - started) * 1000)
+                if b"answerCallbackQuery" in body:
+                    replies += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(send(i) for i in range(1, updates + 1)))
+            # Фоновые обработчики сообщений могут еще выполняться
+            await asyncio.sleep(0.5)
+            while outbound is not None and sum(outbound.queued):
+                await asyncio.sleep(0.1)
+            elapsed = time.perf_counter() - started
+
+        print(
+            f"📨 Обновлений: {updates} за {elapsed:.2f} с "
+            f"({updates / elapsed:.0f}/с)"
+        )
+        print(
+            f"⏱ Ответ webhook: p50={percentile(latencies, 0.5):.2f} мс, "
+            f"p99={percentile(latencies, 0.99):.2f} мс"
+        )
+        print(f"📡 Запросы к Bot API: {dict(calls)}")
+        print(f"↩️ Ответов на callback в ответе webhook: {replies}")
+        if outbound is not None:
+            print(f"🚦 Очередь отправки: {outbound.stats()}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Ошибка: {e}")
+        return False
+    finally:
+        for runner in reversed(runners):
+            await runner.cleanup()
+        if outbound is not None:
+            await outbound.close()
+        await db.close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Нагрузочная проверка webhook с фейковым Bot API"
+    )
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument(
+        "--rate-limit",
+        action="store_true",
+        help="отправлять через очередь с лимитами Telegram"
+    )
+    args = parser.parse_args()
+
+    success = asyncio.run(run_benchmark(
+        args.updates, args.concurrency, args.users, args.rate_limit
+    ))
+    exit(0 if success else 1)
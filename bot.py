@@ -1,21 +1,43 @@
+import argparse
 import asyncio
 import sys
+from typing import Optional
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.base import BaseStorage
 
-from config import BOT_TOKEN
+from config import (
+    ARCHIVE_ENABLED,
+    BOT_MODE,
+    BOT_TOKEN,
+    OUTBOUND_RATE_LIMIT,
+    QUERY_STATS_LOG_INTERVAL
+)
 from database import db
+from services.archiver import run_archiver
+from services.fsm_storage import (
+    PostgresStorage,
+    create_fsm_storage,
+    run_fsm_cleanup
+)
+from services.outbound import OutboundLimiter, OutboundScheduler
+from services.query_stats import run_query_stats_logger
+from services.webhook import run_webhook
 from utils.logging_config import setup_logging, get_logger
 
 # Импортируем все роутеры
 from handlers import (
     actions,
+    archive,
+    bulk,
+    export,
     help,
     new_task,
+    search,
     start,
+    task_import,
     tasks_list,
     timezone
 )
@@ -25,17 +47,9 @@ setup_logging()
 logger = get_logger(__name__)
 
 
-async def main():
-    """Основная функция запуска бота"""
-
-    # Инициализация бота с настройками по умолчанию
-    bot = Bot(
-        token=BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
-    )
-
-    # Создаем диспетчер с хранилищем состояний в памяти
-    dp = Dispatcher(storage=MemoryStorage())
+def create_dispatcher() -> Dispatcher:
+    """Диспетчер с хранилищем состояний по FSM_STORAGE и всеми роутерами"""
+    dp = Dispatcher(storage=create_fsm_storage())
 
     # Подключаем все роутеры
     dp.include_routers(
@@ -44,34 +58,127 @@ async def main():
         new_task.router,
         tasks_list.router,
         actions.router,
+        bulk.router,
+        archive.router,
+        search.router,
+        export.router,
+        task_import.router,
         timezone.router
     )
+    return dp
+
+
+def create_bot(outbound: Optional[OutboundScheduler] = None) -> Bot:
+    """
+    Бот с настройками по умолчанию
+
+    С outbound все отправки бота проходят через очередь с лимитами
+    Telegram (services/outbound.py).
+    """
+    bot = Bot(
+        token=BOT_TOKEN,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    )
+    if outbound is not None:
+        bot.session.middleware(OutboundLimiter(outbound))
+    return bot
+
+
+def start_background_tasks(
+        archiver: bool = ARCHIVE_ENABLED,
+        fsm_storage: Optional[BaseStorage] = None,
+        fsm_cleanup: bool = True,
+        outbound: Optional[OutboundScheduler] = None
+) -> list:
+    """Запуск фоновых задач (после подключения к БД)"""
+    tasks = []
+
+    # Фоновая архивация холодных задач
+    if archiver:
+        tasks.append(asyncio.create_task(run_archiver()))
+
+    # Удаление устаревших FSM-состояний из БД
+    if fsm_cleanup and isinstance(fsm_storage, PostgresStorage):
+        tasks.append(asyncio.create_task(run_fsm_cleanup(fsm_storage)))
+
+    # Периодически пишем в лог задержки запросов, размер FSM-хранилища
+    # и очередь исходящих запросов
+    if QUERY_STATS_LOG_INTERVAL > 0:
+        tasks.append(asyncio.create_task(
+            run_query_stats_logger(fsm_storage, outbound)
+        ))
+
+    return tasks
+
+
+async def stop_background_tasks(tasks: list):
+    """Остановка фоновых задач (до закрытия пула)"""
+    for task in tasks:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+async def main(mode: str = BOT_MODE):
+    """Основная функция запуска бота"""
+
+    # Инициализация бота с настройками по умолчанию и лимитами отправки
+    outbound = OutboundScheduler() if OUTBOUND_RATE_LIMIT else None
+    bot = create_bot(outbound)
+    dp = create_dispatcher()
+    background_tasks = []
 
     try:
         # Инициализируем подключение к базе данных
         await db.create_pool()
         logger.info("Установлено подключение к базе данных")
 
+        # Запускаем архивацию, очистку FSM-состояний и журнал
+        # задержек запросов
+        background_tasks = start_background_tasks(
+            fsm_storage=dp.storage, outbound=outbound
+        )
+
         # Получаем информацию о боте
         bot_info = await bot.get_me()
         logger.info(f"Бот запущен: @{bot_info.username}")
 
-        # Запускаем поллинг
-        await dp.start_polling(bot)
+        if mode == "webhook":
+            await run_webhook(bot, dp)
+        else:
+            # При поллинге webhook должен быть снят
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
 
     except Exception as e:
         logger.error(f"Ошибка при запуске бота: {e}")
         raise
     finally:
+        # Останавливаем фоновые задачи до закрытия пула
+        await stop_background_tasks(background_tasks)
+
         # Закрываем подключение к БД при завершении
         await db.close_pool()
+        if outbound is not None:
+            await outbound.close()
         await bot.session.close()
         logger.info("Подключение к базе данных закрыто")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Telegram-бот задач")
+    parser.add_argument(
+        "--mode",
+        choices=("polling", "webhook"),
+        default=BOT_MODE,
+        help="способ получения обновлений (по умолчанию BOT_MODE)"
+    )
+    args = parser.parse_args()
+
     try:
-        asyncio.run(main())
+        asyncio.run(main(args.mode))
     except KeyboardInterrupt:
         logger.info("Бот остановлен пользователем")
     except Exception as e:
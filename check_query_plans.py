@@ -0,0 +1,189 @@
+"""
+Проверка планов запросов списка задач и подсчета задач
+
+Для каждого варианта запроса страницы (tasks_page:* и tasks_snapshot:*
+из utils/statements.py) и для подсчета активных/видимых задач
+пользователя выполняется EXPLAIN и проверяется, что таблица tasks
+читается по частичному индексу idx_tasks_user_active (только активные)
+или idx_tasks_user_visible (с выполненными). Если tasks секционирована
+(partition_tasks.py), засчитываются индексы секций, созданные
+из этих индексов.
+
+Перед проверкой у отдельного пользователя создаются тестовые задачи
+и обновляется статистика; последовательное чтение запрещается
+(enable_seqscan = off), чтобы на небольшой таблице планировщик
+показал, каким индексом он может выполнить запрос. Тестовые задачи
+и их счетчики удаляются после проверки.
+
+Нужна PostgreSQL с примененными миграциями (python migrate.py).
+
+Использование:
+    python check_query_plans.py [--tasks N]
+"""
+import argparse
+import asyncio
+import json
+from datetime import datetime, timezone
+from itertools import product
+from typing import List
+
+import asyncpg
+
+from config import DB_CONFIG
+from utils.statements import STATEMENTS, page_statement, tasks_page_params
+
+# Отдельный пользователь, чтобы не задеть задачи настоящих пользователей
+CHECK_USER_ID = -1
+
+ACTIVE_INDEX = 'idx_tasks_user_active'
+VISIBLE_INDEX = 'idx_tasks_user_visible'
+
+# Подсчет задач пользователя с теми же условиями, что и в списке
+COUNT_QUERIES = {
+    'count:active': (
+        """
+        SELECT COUNT(*) FROM tasks
+        WHERE user_id = $1 AND status = FALSE AND is_hidden = FALSE
+        """,
+        ACTIVE_INDEX
+    ),
+    'count:visible': (
+        """
+        SELECT COUNT(*) FROM tasks
+        WHERE user_id = $1 AND is_hidden = FALSE
+        """,
+        VISIBLE_INDEX
+    )
+}
+
+INDEX_ROOT = """
+SELECT COALESCE(pg_partition_root(to_regclass($1))::text, $1)
+"""
+
+
+def page_checks():
+    """Варианты запросов страницы: (имя, параметры, ожидаемый индекс)"""
+    cursor = (False, datetime.now(timezone.utc), 2 ** 31 - 1)
+    for kind, (include_completed, has_cursor, backward) in product(
+            ('tasks_page', 'tasks_snapshot'),
+            product((False, True), repeat=3)
+    ):
+        name = page_statement(kind, include_completed, has_cursor, backward)
+        params = [CHECK_USER_ID, 11]
+        if has_cursor:
+            params += tasks_page_params(include_completed, cursor)
+        expected = VISIBLE_INDEX if include_completed else ACTIVE_INDEX
+        yield name, STATEMENTS[name], params, expected
+
+
+def count_checks():
+    """Подсчет задач: (имя, параметры, ожидаемый индекс)"""
+    for name, (query, expected) in COUNT_QUERIES.items():
+        yield name, query, [CHECK_USER_ID], expected
+
+
+def plan_indexes(plan: dict) -> List[str]:
+    """Имена индексов по tasks во всех узлах плана"""
+    indexes = []
+    if plan.get('Index Name') and plan.get('Relation Name', '').startswith(
+            'tasks'
+    ):
+        indexes.append(plan['Index Name'])
+    for child in plan.get('Plans', []):
+        indexes.extend(plan_indexes(child))
+    return indexes
+
+
+def has_seq_scan(plan: dict) -> bool:
+    """Есть ли в плане последовательное чтение tasks"""
+    if (plan.get('Node Type') == 'Seq Scan'
+            and plan.get('Relation Name', '').startswith('tasks')):
+        return True
+    return any(has_seq_scan(child) for child in plan.get('Plans', []))
+
+
+async def seed_tasks(connection, count: int):
+    """Тестовые задачи: треть выполнена, каждая десятая скрыта"""
+    await connection.execute(
+        """
+        INSERT INTO tasks (user_id, task_text, status, is_hidden,
+                           created_at, completed_at)
+        SELECT
+            $1,
+            'Проверка плана ' || n,
+            n % 3 = 0,
+            n % 10 = 0,
+            CURRENT_TIMESTAMP - n * INTERVAL '1 minute',
+            CASE WHEN n % 3 = 0 THEN CURRENT_TIMESTAMP END
+        FROM generate_series(1, $2) AS n
+        """,
+        CHECK_USER_ID, count
+    )
+    await connection.execute("ANALYZE tasks")
+
+
+async def check_plan(connection, name, query, params, expected) -> bool:
+    """EXPLAIN запроса и сравнение индексов плана с ожидаемым"""
+    raw = await connection.fetchval(
+        f"EXPLAIN (FORMAT JSON) {query}", *params
+    )
+    plan = json.loads(raw)[0]['Plan']
+
+    indexes = []
+    for index in plan_indexes(plan):
+        indexes.append(await connection.fetchval(INDEX_ROOT, index))
+
+    ok = not has_seq_scan(plan) and bool(indexes) and all(
+        index == expected for index in indexes
+    )
+    used = ", ".join(sorted(set(indexes))) or "Seq Scan"
+    print(f"{'✅' if ok else '❌'} {name}: {used} (ожидался {expected})")
+    return ok
+
+
+async def run_check(tasks: int):
+    """Проверка всех запросов; True, если все используют нужный индекс"""
+    connection = None
+    try:
+        connection = await asyncpg.connect(**DB_CONFIG)
+        await seed_tasks(connection, tasks)
+
+        results = []
+        try:
+            async with connection.transaction():
+                await connection.execute("SET LOCAL enable_seqscan = off")
+                for check in (*page_checks(), *count_checks()):
+                    results.append(await check_plan(connection, *check))
+        finally:
+            await connection.execute(
+                "DELETE FROM tasks WHERE user_id = $1", CHECK_USER_ID
+            )
+            await connection.execute(
+                "DELETE FROM user_task_counters WHERE user_id = $1",
+                CHECK_USER_ID
+            )
+
+        failed = results.count(False)
+        if failed:
+            print(f"❌ Не по нужному индексу: {failed} из {len(results)}")
+            return False
+        print(f"✅ Все {len(results)} запросов используют частичные индексы")
+        return True
+
+    except Exception as e:
+        print(f"❌ Ошибка: {e}")
+        return False
+    finally:
+        if connection is not None:
+            await connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Проверка индексов в планах запросов списка задач"
+    )
+    parser.add_argument("--tasks", type=int, default=1000)
+    args = parser.parse_args()
+
+    success = asyncio.run(run_check(args.tasks))
+    exit(0 if success else 1)
@@ -1,21 +1,144 @@
+import asyncio
 import asyncpg
 import logging
-from typing import List, Dict, Optional
+from collections import defaultdict, deque
+from typing import AsyncIterator, Iterable, List, Dict, Optional, Tuple
 
-from config import DB_CONFIG
+from config import (
+    ADD_TASK_BATCH_DELAY_MS,
+    ADD_TASK_BATCH_SIZE,
+    ADD_TASK_BATCHING,
+    DB_BACKEND,
+    DB_CONFIG,
+    DB_POOL_MAX_INACTIVE_LIFETIME,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_MIN_SIZE,
+    DB_REPLICA_DSN,
+    DB_SHARD_DSNS,
+    SHARD_MAP_TTL,
+    SLOW_QUERY_EXPLAIN_INTERVAL,
+    SLOW_QUERY_THRESHOLD_MS,
+    SQLITE_PATH,
+    READ_YOUR_WRITES_WINDOW,
+    TASKS_CACHE_MAX_ENTRIES,
+    TASKS_CACHE_PAGES_PER_USER,
+    TASKS_CACHE_TTL,
+    TIMEZONE_CACHE_SIZE,
+    TIMEZONE_CACHE_TTL
+)
+from repositories.base import TaskRepository, validate_task_text
+from utils.batching import MicroBatcher
+from utils.cache import PerUserCache, TTLCache
+from utils.metrics import (
+    POOL_ACQUIRE_WAIT,
+    QUERY_LATENCY,
+    SLOW_QUERIES,
+    acquire,
+    observe_query
+)
+from utils.migrations import get_latest_version, get_pending_migrations
+from utils.pagination import Cursor, SearchCursor
+from utils.sharding import shard_for_user
+from utils.statements import (
+    READ_STATEMENTS,
+    STATEMENTS,
+    contains_pattern,
+    create_statement_pool,
+    page_statement,
+    search_statement,
+    tasks_page_params
+)
 
 logger = logging.getLogger(__name__)
 
+# Канал LISTEN/NOTIFY: user_id через запятую, чьи задачи изменены
+# в другом процессе (архивация); получатели сбрасывают их кэш
+TASKS_CHANGED_CHANNEL = 'tasks_changed'
+# Сколько user_id в одном уведомлении (payload — до 8000 байт)
+NOTIFY_USERS_CHUNK = 300
+
+POOL_SETTINGS = {
+    'min_size': DB_POOL_MIN_SIZE,
+    'max_size': DB_POOL_MAX_SIZE,
+    'max_inactive_connection_lifetime': DB_POOL_MAX_INACTIVE_LIFETIME
+}
+
 
 class Database:
+    """Хранилище задач в PostgreSQL (реализация TaskRepository)"""
+
     def __init__(self):
+        # Основной пул; при шардировании это шард 0, на нем же
+        # хранится карта шардов (user_shards)
         self.pool = None
+        # Пулы всех шардов, shard_pools[0] — основной пул
+        self.shard_pools: List[asyncpg.Pool] = []
+        # Кэш записей карты шардов: user_id -> (шард или None, locked)
+        self.shard_map_cache = TTLCache(
+            maxsize=100000,
+            ttl=SHARD_MAP_TTL
+        )
+        # Пул реплики для чтения (None — все запросы идут в primary)
+        self.replica_pool = None
+        # Соединение, слушающее TASKS_CHANGED_CHANNEL
+        self.listener = None
+        # Пользователи, недавно изменявшие данные: их чтения идут
+        # в primary, пока реплика может отставать
+        self.recent_writers = TTLCache(
+            maxsize=100000,
+            ttl=READ_YOUR_WRITES_WINDOW
+        )
+        # Часовой пояс меняется редко, а нужен почти каждому обработчику
+        self.timezone_cache = TTLCache(
+            maxsize=TIMEZONE_CACHE_SIZE,
+            ttl=TIMEZONE_CACHE_TTL
+        )
+        # Страницы списка и счетчики: пользователи листают и обновляют
+        # список чаще, чем меняют задачи. Сбрасывается любой мутацией
+        self.tasks_cache = PerUserCache(
+            max_entries=TASKS_CACHE_MAX_ENTRIES,
+            max_entries_per_user=TASKS_CACHE_PAGES_PER_USER,
+            ttl=TASKS_CACHE_TTL
+        )
+        # Пачки add_task (None — каждая задача отдельным INSERT)
+        self.add_task_batcher = None
+        if ADD_TASK_BATCHING:
+            self.add_task_batcher = MicroBatcher(
+                self._insert_tasks_batch,
+                max_delay=ADD_TASK_BATCH_DELAY_MS / 1000,
+                max_size=ADD_TASK_BATCH_SIZE
+            )
 
     async def create_pool(self):
         """Создание пула подключений к БД"""
+        SLOW_QUERIES.configure(
+            SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_EXPLAIN_INTERVAL
+        )
         try:
-            self.pool = await asyncpg.create_pool(**DB_CONFIG)
-            await self.create_tables()
+            # До создания пулов: init-хук готовит запросы, и на схеме
+            # без миграций он упал бы с UndefinedTableError вместо
+            # понятной ошибки
+            await self.check_schema_version()
+
+            self.pool = await create_statement_pool(
+                STATEMENTS, **POOL_SETTINGS, **DB_CONFIG
+            )
+            self.shard_pools = [self.pool]
+            for dsn in DB_SHARD_DSNS:
+                self.shard_pools.append(await create_statement_pool(
+                    STATEMENTS, **POOL_SETTINGS, dsn=dsn
+                ))
+            if len(self.shard_pools) > 1:
+                logger.info(f"Подключено шардов: {len(self.shard_pools)}")
+
+            # Реплика используется только без шардирования
+            if DB_REPLICA_DSN and len(self.shard_pools) == 1:
+                self.replica_pool = await create_statement_pool(
+                    READ_STATEMENTS, **POOL_SETTINGS, dsn=DB_REPLICA_DSN
+                )
+                logger.info("Подключение к реплике для чтения установлено")
+
+            await self._listen_tasks_changed()
             logger.info("Подключение к базе данных установлено")
         except Exception as e:
             logger.error(f"Ошибка подключения к базе данных: {e}")
@@ -23,68 +146,279 @@ class Database:
 
     async def close_pool(self):
         """Закрытие пула подключений"""
+        if self.add_task_batcher:
+            await self.add_task_batcher.close()
+        if self.listener is not None:
+            self.listener.remove_termination_listener(self._on_listener_lost)
+            await self.listener.close()
+            self.listener = None
+        if self.replica_pool:
+            await self.replica_pool.close()
+        for pool in self.shard_pools[1:]:
+            await pool.close()
         if self.pool:
             await self.pool.close()
             logger.info("Подключение к базе данных закрыто")
+        logger.info(f"Статистика кэшей: {self.get_cache_stats()}")
+        logger.info(f"Статистика запросов: {self.get_query_stats()}")
 
-    async def create_tables(self):
-        """Создание таблиц в БД"""
-        query = """
-        CREATE TABLE IF NOT EXISTS tasks (
-            id SERIAL PRIMARY KEY,
-            user_id BIGINT NOT NULL,
-            task_text TEXT NOT NULL,
-            status BOOLEAN DEFAULT FALSE,
-            is_hidden BOOLEAN DEFAULT FALSE,
-            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-            completed_at TIMESTAMP WITH TIME ZONE NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS users (
-            user_id BIGINT PRIMARY KEY,
-            timezone VARCHAR(50) DEFAULT 'UTC',
-            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-        );
-
-        CREATE INDEX IF NOT EXISTS idx_tasks_user_id ON tasks(user_id);
-        CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
-        CREATE INDEX IF NOT EXISTS idx_tasks_is_hidden ON tasks(is_hidden);
-        CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks(created_at);
-        CREATE INDEX IF NOT EXISTS idx_tasks_completed_at
-        ON tasks(completed_at);
-        CREATE INDEX IF NOT EXISTS idx_users_timezone ON users(timezone);
-        """
-
-        async with self.pool.acquire() as connection:
-            await connection.execute(query)
-        logger.info("Таблицы созданы")
+    async def _listen_tasks_changed(self):
+        """
+        Подписка на изменения задач из других процессов
+
+        Кэш страниц у каждого процесса свой, а архивация идет в одном
+        из них. Без подписки остальные процессы показывали бы
+        перенесенные задачи до истечения TASKS_CACHE_TTL. Если соединение
+        подписки оборвалось, кэш сбрасывается целиком и снова
+        полагается только на TTL.
+        """
+        self.listener = await asyncpg.connect(**DB_CONFIG)
+        self.listener.add_termination_listener(self._on_listener_lost)
+        await self.listener.add_listener(
+            TASKS_CHANGED_CHANNEL, self._on_tasks_changed
+        )
+
+    def _on_tasks_changed(self, connection, pid, channel, payload: str):
+        for user_id in payload.split(','):
+            self._mark_user_write(int(user_id))
+
+    def _on_listener_lost(self, connection):
+        logger.warning(
+            "Соединение подписки на изменения задач потеряно: "
+            "кэш страниц сбрасывается только по TTL"
+        )
+        self.tasks_cache.clear()
+        self.listener = None
+
+    async def _notify_tasks_changed(self, user_ids: Iterable[int]):
+        """Уведомление процессов бота о задачах, измененных не ими"""
+        user_ids = list(user_ids)
+        async with acquire(self.pool) as connection:
+            for start in range(0, len(user_ids), NOTIFY_USERS_CHUNK):
+                chunk = user_ids[start:start + NOTIFY_USERS_CHUNK]
+                await connection.execute(
+                    "SELECT pg_notify($1, $2)",
+                    TASKS_CHANGED_CHANNEL,
+                    ','.join(map(str, chunk))
+                )
+
+    async def _shard_for(self, user_id: int, write: bool) -> int:
+        """
+        Номер шарда пользователя
+
+        Перенесенные пользователи записаны в карте шардов (user_shards
+        на шарде 0), остальные распределяются по хэшу user_id.
+
+        Raises:
+            RuntimeError: при записи, пока данные пользователя
+                переносятся между шардами
+        """
+        entry = self.shard_map_cache.get(user_id)
+        if entry is None:
+            async with acquire(self.pool) as connection:
+                row = await connection.fetchrow_statement(
+                    'get_shard_map_entry', user_id
+                )
+            entry = (row['shard'], row['locked']) if row else (None, False)
+            self.shard_map_cache.set(user_id, entry)
+
+        shard, locked = entry
+        if locked and write:
+            raise RuntimeError(
+                f"Данные пользователя {user_id} переносятся между шардами"
+            )
+        if shard is None:
+            return shard_for_user(user_id, len(self.shard_pools))
+        return shard
+
+    async def _pool_for(
+            self,
+            user_id: int,
+            read: bool = False
+    ) -> asyncpg.Pool:
+        """Выбор пула для запроса к данным пользователя"""
+        if len(self.shard_pools) > 1:
+            shard = await self._shard_for(user_id, write=not read)
+            return self.shard_pools[shard]
+        if read:
+            return self._read_pool(user_id)
+        return self.pool
+
+    def _read_pool(self, user_id: int) -> asyncpg.Pool:
+        """
+        Выбор пула для чтения данных пользователя
+
+        Чтения идут в реплику, кроме короткого окна после собственной
+        записи пользователя (read-your-writes)
+        """
+        if self.replica_pool is None:
+            return self.pool
+        if self.recent_writers.get(user_id) is not None:
+            return self.pool
+        return self.replica_pool
+
+    def _mark_user_write(self, user_id: int):
+        """Учет записи пользователя: сброс кэша и чтение из primary"""
+        self.tasks_cache.invalidate_user(user_id)
+        if self.replica_pool is not None:
+            self.recent_writers.set(user_id, True)
+
+    async def check_schema_version(self):
+        """
+        Проверка, что к БД применены все известные миграции
+
+        Сами миграции применяются отдельно (python migrate.py),
+        поэтому при старте бот не выполняет DDL. Проверка идет
+        по отдельному соединению с каждым шардом, без пулов.
+        """
+        shards = [DB_CONFIG] + [{'dsn': dsn} for dsn in DB_SHARD_DSNS]
+        for shard, connect_kwargs in enumerate(shards):
+            connection = await asyncpg.connect(**connect_kwargs)
+            try:
+                pending = await get_pending_migrations(connection)
+            finally:
+                await connection.close()
+
+            if pending:
+                versions = ', '.join(version for version, _ in pending)
+                raise RuntimeError(
+                    f"Схема БД шарда {shard} устарела, не применены "
+                    f"миграции: {versions}. Выполните python migrate.py"
+                )
+
+        logger.info(f"Версия схемы БД: {get_latest_version()}")
 
     async def add_task(self, user_id: int, task_text: str) -> int:
-        """Добавление новой задачи"""
-        # Валидация входных данных
-        if not task_text or not task_text.strip():
-            raise ValueError("Текст задачи не может быть пустым")
+        """
+        Добавление новой задачи
 
-        if len(task_text) > 1000:
-            raise ValueError("Текст задачи слишком длинный")
+        При включенном ADD_TASK_BATCHING задачи, добавленные разными
+        пользователями в течение нескольких миллисекунд, записываются
+        одним INSERT на шард
+        """
+        task_text = validate_task_text(task_text)
 
-        query = """
-        INSERT INTO tasks (user_id, task_text)
-        VALUES ($1, $2)
-        RETURNING id
+        pool = await self._pool_for(user_id)
+        if self.add_task_batcher:
+            task_id = await self.add_task_batcher.submit(
+                pool, (user_id, task_text)
+            )
+        else:
+            async with acquire(pool) as connection:
+                task_id = await connection.fetchval_statement(
+                    'add_task',
+                    user_id,
+                    task_text
+                )
+
+        self._mark_user_write(user_id)
+        logger.info(
+            f"Добавлена задача {task_id} для пользователя {user_id}"
+        )
+        return task_id
+
+    async def add_tasks(
+            self,
+            user_id: int,
+            task_texts: List[str]
+    ) -> List[int]:
         """
+        Добавление нескольких задач пользователя одним INSERT
 
-        async with self.pool.acquire() as connection:
-            task_id = await connection.fetchval(
-                query,
-                user_id,
-                task_text.strip()
+        Тексты проверяются как в add_task; при ошибке проверки
+        не добавляется ни одна задача.
+
+        Returns:
+            ID задач в порядке task_texts
+        """
+        tasks = [
+            (user_id, validate_task_text(task_text))
+            for task_text in task_texts
+        ]
+        if not tasks:
+            return []
+
+        pool = await self._pool_for(user_id)
+        if self.add_task_batcher:
+            task_ids = list(await asyncio.gather(*(
+                self.add_task_batcher.submit(pool, task) for task in tasks
+            )))
+        else:
+            task_ids = await self._insert_tasks_batch(pool, tasks)
+
+        self._mark_user_write(user_id)
+        logger.info(
+            f"Добавлены задачи {task_ids} для пользователя {user_id}"
+        )
+        return task_ids
+
+    async def _insert_tasks_batch(
+            self,
+            pool: asyncpg.Pool,
+            tasks: List[Tuple[int, str]]
+    ) -> List[int]:
+        """
+        Запись пачки задач (user_id, текст) одним INSERT ... RETURNING
+
+        Returns:
+            ID задач в порядке tasks
+        """
+        async with acquire(pool) as connection:
+            rows = await connection.fetch_statement(
+                'add_tasks_batch',
+                [user_id for user_id, _ in tasks],
+                [task_text for _, task_text in tasks]
             )
+
+        # Порядок строк RETURNING не гарантирован: сопоставляем id
+        # с вызывающими по (user_id, текст), одинаковые задачи
+        # получают id по возрастанию
+        ids_by_task = defaultdict(deque)
+        for row in sorted(rows, key=lambda row: row['id']):
+            ids_by_task[(row['user_id'], row['task_text'])].append(row['id'])
+
+        return [ids_by_task[task].popleft() for task in tasks]
+
+    async def import_tasks(
+            self,
+            user_id: int,
+            task_texts: Iterable[str]
+    ) -> Dict[str, int]:
+        """
+        Массовое добавление задач через COPY
+
+        Тексты проверяются по тем же правилам, что и в add_task;
+        прошедшие проверку загружаются одной командой COPY
+        в одной транзакции (все или ничего).
+
+        Returns:
+            Словарь с ключами accepted и rejected
+        """
+        records = []
+        rejected = 0
+        for task_text in task_texts:
+            try:
+                records.append((user_id, validate_task_text(task_text)))
+            except ValueError:
+                rejected += 1
+
+        if records:
+            pool = await self._pool_for(user_id)
+            async with acquire(pool) as connection:
+                async with connection.transaction():
+                    with observe_query('import_tasks', 'COPY tasks'):
+                        await connection.copy_records_to_table(
+                            'tasks',
+                            records=records,
+                            columns=['user_id', 'task_text']
+                        )
+            self._mark_user_write(user_id)
             logger.info(
-                f"Добавлена задача {task_id} для пользователя {user_id}"
+                f"Импортировано задач: {len(records)} "
+                f"для пользователя {user_id} (отклонено: {rejected})"
             )
-            return task_id
+
+        return {'accepted': len(records), 'rejected': rejected}
 
     async def get_user_tasks(
             self,
@@ -92,64 +426,153 @@ class Database:
             include_completed: bool = False,
             only_active: bool = True,
             limit: int = 10,
-            offset: int = 0
+            cursor: Optional[Cursor] = None,
+            backward: bool = False
     ) -> List[Dict]:
-        """Получение задач пользователя с пагинацией"""
-        if include_completed:
-            # Показываем все задачи (активные + выполненные),
-            # но исключаем скрытые
-            query = """
-            SELECT id, task_text, status, created_at, completed_at, is_hidden
-            FROM tasks
-            WHERE user_id = $1 AND (is_hidden = FALSE OR is_hidden IS NULL)
-            ORDER BY status ASC, created_at DESC
-            LIMIT $2 OFFSET $3
-            """
+        """
+        Получение задач пользователя с keyset-пагинацией
+
+        Args:
+            cursor: ключ (status, created_at, id) задачи, после которой
+                (или перед которой при backward=True) начинается страница
+            backward: выбрать страницу, предшествующую курсору
+        """
+        cache_key = ('tasks', include_completed, limit, cursor, backward)
+        cached = self.tasks_cache.get(user_id, cache_key)
+        if cached is not None:
+            return cached
+
+        statement = page_statement(
+            'tasks_page', include_completed, cursor is not None, backward
+        )
+        params = tasks_page_params(include_completed, cursor)
+
+        pool = await self._pool_for(user_id, read=True)
+        async with acquire(pool) as connection:
+            rows = await connection.fetch_statement(
+                statement, user_id, limit, *params
+            )
+            tasks = [dict(row) for row in rows]
+
+        # Страница "назад" выбрана в обратном порядке
+        if backward:
+            tasks.reverse()
+
+        self.tasks_cache.set(user_id, cache_key, tasks)
+        return tasks
+
+    async def get_tasks_list_snapshot(
+            self,
+            user_id: int,
+            include_completed: bool = False,
+            limit: int = 10,
+            cursor: Optional[Cursor] = None,
+            backward: bool = False
+    ) -> Dict:
+        """
+        Получение всего необходимого для экрана списка задач одним запросом
+
+        Возвращает словарь с ключами:
+            tasks: страница задач (как в get_user_tasks)
+            has_prev: есть ли задачи перед страницей
+            has_next: есть ли задачи после страницы
+            active_count: количество активных задач
+            completed_count: количество выполненных (но не скрытых) задач
+            timezone: часовой пояс пользователя
+        """
+        cache_key = ('snapshot', include_completed, limit, cursor, backward)
+        cached = self.tasks_cache.get(user_id, cache_key)
+        if cached is not None:
+            return cached
+
+        statement = page_statement(
+            'tasks_snapshot', include_completed, cursor is not None, backward
+        )
+        params = tasks_page_params(include_completed, cursor)
+
+        # Запрашиваем на одну задачу больше, чтобы узнать,
+        # есть ли следующая страница в направлении выборки
+        pool = await self._pool_for(user_id, read=True)
+        async with acquire(pool) as connection:
+            rows = await connection.fetch_statement(
+                statement, user_id, limit + 1, *params
+            )
+
+        # Счетчики и часовой пояс одинаковы во всех строках;
+        # если задач нет, LEFT JOIN вернет одну строку с NULL в полях задачи
+        first = rows[0]
+        self.timezone_cache.set(user_id, first['timezone'])
+        tasks = [
+            {
+                'id': row['id'],
+                'task_text': row['task_text'],
+                'status': row['status'],
+                'created_at': row['created_at'],
+                'completed_at': row['completed_at'],
+                'is_hidden': row['is_hidden']
+            }
+            for row in rows
+            if row['id'] is not None
+        ]
+
+        has_more = len(tasks) > limit
+        if backward:
+            # Лишняя задача — самая ранняя в порядке отображения
+            tasks = tasks[-limit:] if has_more else tasks
+            has_prev, has_next = has_more, True
         else:
-            # Показываем только активные задачи
-            query = """
-            SELECT id, task_text, status, created_at, completed_at, is_hidden
-            FROM tasks
-            WHERE user_id = $1
-              AND status = FALSE
-              AND (is_hidden = FALSE OR is_hidden IS NULL)
-            ORDER BY created_at DESC
-            LIMIT $2 OFFSET $3
-            """
-
-        async with self.pool.acquire() as connection:
-            rows = await connection.fetch(query, user_id, limit, offset)
-            return [dict(row) for row in rows]
-
-    async def complete_task(self, task_id: int, user_id: int) -> bool:
-        """Отметить задачу как выполненную"""
-        query = """
-        UPDATE tasks
-        SET status = TRUE, completed_at = CURRENT_TIMESTAMP
-        WHERE id = $1 AND user_id = $2 AND status = FALSE
-        RETURNING id
+            tasks = tasks[:limit]
+            has_prev, has_next = cursor is not None, has_more
+
+        snapshot = {
+            'tasks': tasks,
+            'has_prev': has_prev,
+            'has_next': has_next,
+            'active_count': first['active_count'],
+            'completed_count': first['completed_count'],
+            'timezone': first['timezone']
+        }
+        self.tasks_cache.set(user_id, cache_key, snapshot)
+        return snapshot
+
+    async def complete_task(
+            self,
+            task_id: int,
+            user_id: int
+    ) -> Optional[Dict]:
         """
+        Отметить задачу как выполненную
 
-        async with self.pool.acquire() as connection:
-            result = await connection.fetchval(query, task_id, user_id)
-            success = result is not None
-            if success:
+        Returns:
+            Обновленная задача с часовым поясом пользователя
+            (ключ timezone) или None, если задача не найдена
+        """
+        pool = await self._pool_for(user_id)
+        async with acquire(pool) as connection:
+            row = await connection.fetchrow_statement(
+                'complete_task', task_id, user_id
+            )
+            if row:
+                self._mark_user_write(user_id)
                 logger.info(
                     (
                         f"Задача {task_id} отмечена как выполненная "
                         f"пользователем {user_id}"
                     )
                 )
-            return success
+                self.timezone_cache.set(user_id, row['timezone'])
+            return dict(row) if row else None
 
     async def delete_task(self, task_id: int, user_id: int) -> bool:
         """Удаление задачи"""
-        query = "DELETE FROM tasks WHERE id = $1 AND user_id = $2 RETURNING id"
-
-        async with self.pool.acquire() as connection:
-            result = await connection.fetchval(query, task_id, user_id)
+        pool = await self._pool_for(user_id)
+        async with acquire(pool) as connection:
+            result = await connection.fetchval_statement(
+                'delete_task', task_id, user_id
+            )
             success = result is not None
             if success:
+                self._mark_user_write(user_id)
                 logger.info(
                     f"Задача {task_id} удалена пользователем {user_id}"
                 )
@@ -161,14 +584,11 @@ class Database:
             user_id: int
     ) -> Optional[Dict]:
         """Получение задачи по ID"""
-        query = """
-        SELECT id, task_text, status, created_at, completed_at
-        FROM tasks
-        WHERE id = $1 AND user_id = $2
-        """
-
-        async with self.pool.acquire() as connection:
-            row = await connection.fetchrow(query, task_id, user_id)
+        pool = await self._pool_for(user_id, read=True)
+        async with acquire(pool) as connection:
+            row = await connection.fetchrow_statement(
+                'get_task_by_id', task_id, user_id
+            )
             return dict(row) if row else None
 
     async def update_task(
@@ -176,35 +596,31 @@ class Database:
             task_id: int,
             user_id: int,
             new_text: str
-    ) -> bool:
-        """Обновление текста задачи"""
-        # Валидация входных данных
-        if not new_text or not new_text.strip():
-            raise ValueError("Текст задачи не может быть пустым")
-
-        if len(new_text) > 1000:
-            raise ValueError("Текст задачи слишком длинный")
+    ) -> Optional[Dict]:
+        """
+        Обновление текста задачи
 
-        query = """
-        UPDATE tasks
-        SET task_text = $3
-        WHERE id = $1 AND user_id = $2 AND status = FALSE
-        RETURNING id
+        Returns:
+            Обновленная задача с часовым поясом пользователя
+            (ключ timezone) или None, если задача не найдена
         """
+        new_text = validate_task_text(new_text)
 
-        async with self.pool.acquire() as connection:
-            result = await connection.fetchval(
-                query,
+        pool = await self._pool_for(user_id)
+        async with acquire(pool) as connection:
+            row = await connection.fetchrow_statement(
+                'update_task',
                 task_id,
                 user_id,
-                new_text.strip()
+                new_text
             )
-            success = result is not None
-            if success:
+            if row:
+                self._mark_user_write(user_id)
                 logger.info(
                     f"Текст задачи {task_id} обновлен пользователем {user_id}"
                 )
-            return success
+                self.timezone_cache.set(user_id, row['timezone'])
+            return dict(row) if row else None
 
     async def get_user_tasks_count(
             self,
@@ -213,78 +629,448 @@ class Database:
     ) -> int:
         """Получение количества задач пользователя"""
         if include_completed:
-            query = "SELECT COUNT(*) FROM tasks WHERE user_id = $1"
+            statement = 'count_all_tasks'
         else:
-            query = """
-            SELECT COUNT(*) FROM tasks
-            WHERE user_id = $1 AND status = FALSE
-            """
+            statement = 'count_active_tasks'
 
-        async with self.pool.acquire() as connection:
-            return await connection.fetchval(query, user_id)
+        pool = await self._pool_for(user_id, read=True)
+        async with acquire(pool) as connection:
+            count = await connection.fetchval_statement(statement, user_id)
+            return count or 0
 
     async def get_completed_tasks_count(self, user_id: int) -> int:
         """Получение количества выполненных (но не скрытых) задач"""
-        query = """
-        SELECT COUNT(*) FROM tasks
-        WHERE user_id = $1
-          AND status = TRUE
-          AND (is_hidden = FALSE OR is_hidden IS NULL)
+        cached = self.tasks_cache.get(user_id, ('completed_count',))
+        if cached is not None:
+            return cached
+
+        pool = await self._pool_for(user_id, read=True)
+        async with acquire(pool) as connection:
+            count = await connection.fetchval_statement(
+                'count_completed_tasks', user_id
+            ) or 0
+
+        self.tasks_cache.set(user_id, ('completed_count',), count)
+        return count
+
+    async def reconcile_task_counters(self) -> int:
         """
+        Пересчет счетчиков задач всех пользователей по таблице tasks
 
-        async with self.pool.acquire() as connection:
-            return await connection.fetchval(query, user_id)
+        Счетчики поддерживаются триггером, пересчет нужен только для
+        исправления расхождений (например, после ручных правок данных).
+        Таблица счетчиков блокируется от изменений на время пересчета,
+        поэтому параллельные записи дождутся его окончания.
 
-    async def hide_task(self, task_id: int, user_id: int) -> bool:
-        """Скрытие задачи (пометка как скрытая)"""
+        Returns:
+            Количество пользователей, чьи счетчики были исправлены
+        """
         query = """
-        UPDATE tasks
-        SET is_hidden = TRUE
-        WHERE id = $1 AND user_id = $2 AND status = TRUE
-        RETURNING id
+        WITH actual AS (
+            SELECT
+                user_id,
+                COUNT(*) FILTER (
+                    WHERE NOT is_hidden AND status = FALSE
+                ) AS active_count,
+                COUNT(*) FILTER (
+                    WHERE NOT is_hidden AND status = TRUE
+                ) AS completed_count,
+                COUNT(*) FILTER (WHERE is_hidden) AS hidden_count
+            FROM tasks
+            GROUP BY user_id
+        ),
+        expected AS (
+            SELECT
+                COALESCE(actual.user_id, c.user_id) AS user_id,
+                COALESCE(actual.active_count, 0) AS active_count,
+                COALESCE(actual.completed_count, 0) AS completed_count,
+                COALESCE(actual.hidden_count, 0) AS hidden_count
+            FROM actual
+            FULL JOIN user_task_counters AS c ON c.user_id = actual.user_id
+        )
+        INSERT INTO user_task_counters AS c
+            (user_id, active_count, completed_count, hidden_count)
+        SELECT user_id, active_count, completed_count, hidden_count
+        FROM expected
+        ON CONFLICT (user_id) DO UPDATE SET
+            active_count = EXCLUDED.active_count,
+            completed_count = EXCLUDED.completed_count,
+            hidden_count = EXCLUDED.hidden_count
+        WHERE (c.active_count, c.completed_count, c.hidden_count)
+            IS DISTINCT FROM (
+                EXCLUDED.active_count,
+                EXCLUDED.completed_count,
+                EXCLUDED.hidden_count
+            )
+        RETURNING user_id
         """
 
-        async with self.pool.acquire() as connection:
-            result = await connection.fetchval(query, task_id, user_id)
+        rows = []
+        for pool in self.shard_pools:
+            async with acquire(pool) as connection:
+                async with connection.transaction():
+                    await connection.execute(
+                        "LOCK TABLE user_task_counters "
+                        "IN SHARE ROW EXCLUSIVE MODE"
+                    )
+                    with observe_query('reconcile_task_counters', query):
+                        rows.extend(await connection.fetch(query))
+
+        self.tasks_cache.clear()
+        logger.info(f"Счетчики задач исправлены для {len(rows)} пользователей")
+        return len(rows)
+
+    async def hide_task(self, task_id: int, user_id: int) -> bool:
+        """Скрытие задачи (пометка как скрытая)"""
+        pool = await self._pool_for(user_id)
+        async with acquire(pool) as connection:
+            result = await connection.fetchval_statement(
+                'hide_task', task_id, user_id
+            )
             success = result is not None
             if success:
+                self._mark_user_write(user_id)
                 logger.info(
                     f"Задача {task_id} скрыта пользователем {user_id}"
                 )
             return success
 
-    async def reactivate_task(self, task_id: int, user_id: int) -> bool:
-        """Реактивация задачи (отмена выполнения)"""
-        query = """
-        UPDATE tasks
-        SET status = FALSE, completed_at = NULL
-        WHERE id = $1 AND user_id = $2 AND status = TRUE
-        RETURNING id
+    async def reactivate_task(
+            self,
+            task_id: int,
+            user_id: int
+    ) -> Optional[Dict]:
         """
+        Реактивация задачи (отмена выполнения)
 
-        async with self.pool.acquire() as connection:
-            result = await connection.fetchval(query, task_id, user_id)
-            success = result is not None
-            if success:
+        Returns:
+            Обновленная задача с часовым поясом пользователя
+            (ключ timezone) или None, если задача не найдена
+        """
+        pool = await self._pool_for(user_id)
+        async with acquire(pool) as connection:
+            row = await connection.fetchrow_statement(
+                'reactivate_task', task_id, user_id
+            )
+            if row:
+                self._mark_user_write(user_id)
                 logger.info(
                     f"Задача {task_id} реактивирована пользователем {user_id}"
                 )
-            return success
+                self.timezone_cache.set(user_id, row['timezone'])
+            return dict(row) if row else None
 
-    async def set_user_timezone(self, user_id: int, timezone: str) -> bool:
-        """Установка часового пояса пользователя"""
+    async def complete_tasks(
+            self,
+            task_ids: List[int],
+            user_id: int
+    ) -> List[int]:
+        """
+        Отметить несколько задач выполненными одним запросом
+
+        Returns:
+            ID задач, которые были отмечены (уже выполненные
+            и чужие задачи пропускаются)
+        """
+        pool = await self._pool_for(user_id)
+        async with acquire(pool) as connection:
+            rows = await connection.fetch_statement(
+                'complete_tasks', task_ids, user_id
+            )
+
+        completed_ids = [row['id'] for row in rows]
+        if completed_ids:
+            self._mark_user_write(user_id)
+            logger.info(
+                f"Задачи {completed_ids} отмечены как выполненные "
+                f"пользователем {user_id}"
+            )
+        return completed_ids
+
+    async def hide_tasks(
+            self,
+            task_ids: List[int],
+            user_id: int
+    ) -> List[int]:
+        """
+        Скрытие нескольких выполненных задач одним запросом
+
+        Returns:
+            ID скрытых задач (активные задачи пропускаются)
+        """
+        pool = await self._pool_for(user_id)
+        async with acquire(pool) as connection:
+            rows = await connection.fetch_statement(
+                'hide_tasks', task_ids, user_id
+            )
+
+        hidden_ids = [row['id'] for row in rows]
+        if hidden_ids:
+            self._mark_user_write(user_id)
+            logger.info(
+                f"Задачи {hidden_ids} скрыты пользователем {user_id}"
+            )
+        return hidden_ids
+
+    async def delete_tasks(
+            self,
+            task_ids: List[int],
+            user_id: int
+    ) -> List[int]:
+        """
+        Удаление нескольких задач одним запросом
+
+        Returns:
+            ID удаленных задач
+        """
+        pool = await self._pool_for(user_id)
+        async with acquire(pool) as connection:
+            rows = await connection.fetch_statement(
+                'delete_tasks', task_ids, user_id
+            )
+
+        deleted_ids = [row['id'] for row in rows]
+        if deleted_ids:
+            self._mark_user_write(user_id)
+            logger.info(
+                f"Задачи {deleted_ids} удалены пользователем {user_id}"
+            )
+        return deleted_ids
+
+    async def archive_tasks_batch(
+            self,
+            completed_days: int,
+            batch_size: int
+    ) -> int:
+        """
+        Перенос пачки холодных задач из tasks в tasks_archive
+
+        Холодные задачи — выполненные скрытые и выполненные более
+        completed_days дней назад (скрытые активные остаются). Перенос
+        выполняется одним запросом (DELETE ... RETURNING в INSERT),
+        поэтому задача не может оказаться в обеих таблицах или пропасть.
+        Задачи пользователей, которых переносят между шардами (locked
+        в user_shards), не трогаются до конца переноса. Остальные
+        процессы бота получают список затронутых
+        пользователей через TASKS_CHANGED_CHANNEL и сбрасывают их кэш.
+
+        Returns:
+            Количество перенесенных задач
+        """
+        # Скрытые активные задачи DELETE не переносит, поэтому они
+        # не должны занимать места в пачке кандидатов.
+        # Условие повторяется в DELETE: если задачу успели реактивировать
+        # между выбором кандидатов и удалением, она не будет перенесена.
+        # Удаление идет по (id, user_id), чтобы в секционированной
+        # таблице затрагивалась только секция пользователя
         query = """
-        INSERT INTO users (user_id, timezone, updated_at)
-        VALUES ($1, $2, CURRENT_TIMESTAMP)
-        ON CONFLICT (user_id)
-        DO UPDATE SET
-            timezone = EXCLUDED.timezone,
-            updated_at = CURRENT_TIMESTAMP
+        WITH candidates AS (
+            (
+                SELECT id, user_id FROM tasks
+                WHERE is_hidden = TRUE
+                  AND status = TRUE
+                  AND user_id <> ALL($3::BIGINT[])
+                LIMIT $2
+            )
+            UNION ALL
+            (
+                SELECT id, user_id FROM tasks
+                WHERE status = TRUE
+                  AND is_hidden = FALSE
+                  AND completed_at < CURRENT_TIMESTAMP
+                      - make_interval(days => $1)
+                  AND user_id <> ALL($3::BIGINT[])
+                ORDER BY completed_at
+                LIMIT $2
+            )
+        ),
+        moved AS (
+            DELETE FROM tasks
+            WHERE (id, user_id) IN (SELECT id, user_id FROM candidates)
+              AND status = TRUE
+              AND (
+                  is_hidden = TRUE
+                  OR completed_at < CURRENT_TIMESTAMP
+                      - make_interval(days => $1)
+              )
+            RETURNING
+                id, user_id, task_text, status, is_hidden,
+                created_at, completed_at
+        ),
+        archived AS (
+            INSERT INTO tasks_archive (
+                id, user_id, task_text, status, is_hidden,
+                created_at, completed_at
+            )
+            SELECT
+                id, user_id, task_text, status, is_hidden,
+                created_at, completed_at
+            FROM moved
+            RETURNING user_id
+        )
+        SELECT user_id FROM archived
+        """
+
+        # Карта шардов читается перед каждой пачкой: перенос ждет
+        # SHARD_MAP_TTL после блокировки, пачка успевает завершиться
+        async with acquire(self.pool) as connection:
+            locked = await connection.fetch_statement(
+                'get_locked_shard_users'
+            )
+        locked_ids = [row['user_id'] for row in locked]
+
+        rows = []
+        for pool in self.shard_pools:
+            args = (completed_days, batch_size, locked_ids)
+            async with acquire(pool) as connection:
+                with observe_query('archive_tasks_batch', query, args):
+                    rows.extend(await connection.fetch(query, *args))
+
+        user_ids = {row['user_id'] for row in rows}
+        for user_id in user_ids:
+            self._mark_user_write(user_id)
+        if user_ids:
+            await self._notify_tasks_changed(user_ids)
+
+        if rows:
+            logger.info(
+                f"В архив перенесено задач: {len(rows)} "
+                f"(пользователей: {len(user_ids)})"
+            )
+        return len(rows)
+
+    async def get_archived_tasks(
+            self,
+            user_id: int,
+            limit: int = 20
+    ) -> Dict:
         """
+        Получение последних задач из архива пользователя
 
-        async with self.pool.acquire() as connection:
+        Возвращает словарь с ключами:
+            tasks: последние архивные задачи
+            total: общее количество задач в архиве
+        """
+        pool = await self._pool_for(user_id, read=True)
+        async with acquire(pool) as connection:
+            rows = await connection.fetch_statement(
+                'get_archived_tasks', user_id, limit
+            )
+
+        return {
+            'tasks': [
+                {key: row[key] for key in row.keys() if key != 'total'}
+                for row in rows
+            ],
+            'total': rows[0]['total'] if rows else 0
+        }
+
+    async def search_tasks(
+            self,
+            user_id: int,
+            query: str,
+            limit: int = 10,
+            cursor: Optional[SearchCursor] = None,
+            backward: bool = False
+    ) -> Dict:
+        """
+        Поиск по тексту видимых задач пользователя
+
+        Совпадения ищутся полнотекстово (с учетом словоформ), нечетко
+        и по подстроке; результаты упорядочены по релевантности.
+
+        Args:
+            cursor: ключ (rank, id) задачи, после которой (или перед
+                которой при backward=True) начинается страница
+
+        Возвращает словарь с ключами:
+            tasks: страница найденных задач (с ключом rank)
+            has_prev: есть ли результаты перед страницей
+            has_next: есть ли результаты после страницы
+        """
+        query = query.strip()
+        if not query:
+            raise ValueError("Поисковый запрос не может быть пустым")
+
+        statement = search_statement(cursor is not None, backward)
+        params = list(cursor) if cursor is not None else []
+
+        pool = await self._pool_for(user_id, read=True)
+        async with acquire(pool) as connection:
+            rows = await connection.fetch_statement(
+                statement,
+                user_id,
+                query,
+                contains_pattern(query),
+                limit + 1,
+                *params
+            )
+
+        tasks = [dict(row) for row in rows]
+        has_more = len(tasks) > limit
+        tasks = tasks[:limit]
+
+        # Страница "назад" выбрана в обратном порядке
+        if backward:
+            tasks.reverse()
+            has_prev, has_next = has_more, True
+        else:
+            has_prev, has_next = cursor is not None, has_more
+
+        return {'tasks': tasks, 'has_prev': has_prev, 'has_next': has_next}
+
+    async def iter_user_tasks_for_export(
+            self,
+            user_id: int,
+            batch_size: int = 1000
+    ) -> AsyncIterator[List[asyncpg.Record]]:
+        """
+        Потоковое чтение всей истории задач пользователя
+
+        Активные, выполненные, скрытые и архивные задачи читаются
+        серверным курсором пачками по batch_size строк, поэтому
+        память не зависит от количества задач. Чтение идет в одной
+        транзакции REPEATABLE READ — выгрузка согласована.
+
+        Yields:
+            Пачки строк с колонками utils.export.EXPORT_COLUMNS
+        """
+        query = """
+        SELECT
+            id, task_text, status, is_hidden, FALSE AS archived,
+            created_at, completed_at
+        FROM tasks
+        WHERE user_id = $1
+        UNION ALL
+        SELECT
+            id, task_text, status, is_hidden, TRUE AS archived,
+            created_at, completed_at
+        FROM tasks_archive
+        WHERE user_id = $1
+        ORDER BY created_at, id
+        """
+
+        pool = await self._pool_for(user_id, read=True)
+        async with acquire(pool) as connection:
+            async with connection.transaction(
+                isolation='repeatable_read',
+                readonly=True
+            ):
+                cursor = await connection.cursor(query, user_id)
+                while batch := await cursor.fetch(batch_size):
+                    yield batch
+
+    async def set_user_timezone(self, user_id: int, timezone: str) -> bool:
+        """Установка часового пояса пользователя"""
+        pool = await self._pool_for(user_id)
+        async with acquire(pool) as connection:
             try:
-                await connection.execute(query, user_id, timezone)
+                await connection.fetch_statement(
+                    'set_user_timezone', user_id, timezone
+                )
+                self.timezone_cache.invalidate(user_id)
+                # Часовой пояс входит в кэшированный снимок списка
+                self._mark_user_write(user_id)
                 logger.info(
                     f"Часовой пояс {timezone} установлен "
                     f"для пользователя {user_id}"
@@ -298,13 +1084,54 @@ class Database:
                 return False
 
     async def get_user_timezone(self, user_id: int) -> str:
-        """Получение часового пояса пользователя"""
-        query = "SELECT timezone FROM users WHERE user_id = $1"
+        """Получение часового пояса пользователя (через кэш)"""
+        timezone = self.timezone_cache.get(user_id)
+        if timezone is not None:
+            return timezone
+
+        pool = await self._pool_for(user_id, read=True)
+        async with acquire(pool) as connection:
+            timezone = await connection.fetchval_statement(
+                'get_user_timezone', user_id
+            )
+
+        timezone = timezone if timezone else 'UTC'
+        self.timezone_cache.set(user_id, timezone)
+        return timezone
+
+    def get_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Статистика in-process кэшей"""
+        return {
+            'timezone': self.timezone_cache.stats(),
+            'tasks': self.tasks_cache.stats()
+        }
+
+    def get_query_stats(self) -> Dict[str, Dict]:
+        """
+        Задержки запросов (мс) по имени запроса и ожидание пула
+
+        Имена запросов совпадают с методами Database (варианты страниц
+        списка — tasks_page:* и tasks_snapshot:*)
+        """
+        stats = {
+            'queries': QUERY_LATENCY.stats(),
+            'pool_acquire': POOL_ACQUIRE_WAIT.stats()
+        }
+        if self.add_task_batcher:
+            stats['add_task_batches'] = self.add_task_batcher.stats()
+        return stats
+
 
-        async with self.pool.acquire() as connection:
-            timezone = await connection.fetchval(query, user_id)
-            return timezone if timezone else 'UTC'
+def create_repository(backend: str = DB_BACKEND) -> TaskRepository:
+    """Создание хранилища задач по имени (см. DB_BACKEND)"""
+    if backend == 'memory':
+        from repositories.memory import InMemoryTaskRepository
+        return InMemoryTaskRepository()
+    if backend == 'sqlite':
+        from repositories.sqlite import SqliteTaskRepository
+        return SqliteTaskRepository(SQLITE_PATH)
+    return Database()
 
 
 # Глобальный экземпляр базы данных
-db = Database()
+db = create_repository()
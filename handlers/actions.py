@@ -9,6 +9,7 @@ from keyboards.inline import (
     get_tasks_list_keyboard
 )
 from handlers.tasks_list import show_tasks_list
+from services.outbound import edit_in_background
 from states import TaskStates
 from utils.logging_config import get_logger
 from utils.task_formatting import format_task_detail_text
@@ -22,13 +23,19 @@ async def update_tasks_list_message(
         callback: CallbackQuery,
         show_completed: bool = False
 ):
-    """Обновление сообщения со списком задач"""
-    user_id = callback.from_user.id
-    tasks = await db.get_user_tasks(user_id, include_completed=show_completed)
-    completed_count = await db.get_completed_tasks_count(user_id)
+    """
+    Обновление сообщения со списком задач
 
-    # Получаем часовой пояс пользователя
-    user_timezone = await db.get_user_timezone(user_id)
+    Правка уходит через edit_in_background: обработчики вызывают ее
+    перед ответом на callback, а результат правки им не нужен
+    """
+    user_id = callback.from_user.id
+    snapshot = await db.get_tasks_list_snapshot(
+        user_id, include_completed=show_completed
+    )
+    tasks = snapshot['tasks']
+    completed_count = snapshot['completed_count']
+    user_timezone = snapshot['timezone']
 
     if not tasks:
         if show_completed:
@@ -44,25 +51,35 @@ async def update_tasks_list_message(
 
 Создай свою первую задачу с помощью кнопки ниже или команды /new_task"""
 
-        await callback.message.edit_text(
+        await edit_in_background(callback.message.edit_text(
             no_tasks_text,
             parse_mode="HTML",
             reply_markup=get_tasks_list_keyboard(
                 [], show_completed, completed_count
             )
-        )
+        ))
         return
 
     from utils.task_formatting import format_tasks_list_text
-    tasks_text = format_tasks_list_text(tasks, user_timezone, show_completed)
+    tasks_text = format_tasks_list_text(
+        tasks,
+        user_timezone,
+        show_completed,
+        active_count=snapshot['active_count'],
+        completed_count=completed_count
+    )
 
-    await callback.message.edit_text(
+    await edit_in_background(callback.message.edit_text(
         tasks_text,
         parse_mode="HTML",
         reply_markup=get_tasks_list_keyboard(
-            tasks, show_completed, completed_count
+            tasks,
+            show_completed,
+            completed_count,
+            has_prev=snapshot['has_prev'],
+            has_next=snapshot['has_next']
         )
-    )
+    ))
 
 
 @router.callback_query(F.data.startswith("edit_task:"))
@@ -73,8 +90,7 @@ async def edit_task_callback(callback: CallbackQuery, state: FSMContext):
     try:
         task_id = int(callback.data.split(":")[1])
     except (ValueError, IndexError):
-        await callback.answer("❌ Неверный формат данных", show_alert=True)
-        return
+        return callback.answer("❌ Неверный формат данных", show_alert=True)
 
     user_id = callback.from_user.id
 
@@ -82,15 +98,13 @@ async def edit_task_callback(callback: CallbackQuery, state: FSMContext):
         task = await db.get_task_by_id(task_id, user_id)
 
         if not task:
-            await callback.answer("❌ Задача не найдена", show_alert=True)
-            return
+            return callback.answer("❌ Задача не найдена", show_alert=True)
 
         if task['status']:
-            await callback.answer(
+            return callback.answer(
                 "❌ Невозможно редактировать выполненную задачу",
                 show_alert=True
             )
-            return
 
         # Сохраняем ID задачи в состоянии
         await state.update_data(editing_task_id=task_id)
@@ -129,37 +143,32 @@ async def complete_task_callback(callback: CallbackQuery):
     try:
         task_id = int(callback.data.split(":")[1])
     except (ValueError, IndexError):
-        await callback.answer("❌ Неверный формат данных", show_alert=True)
-        return
+        return callback.answer("❌ Неверный формат данных", show_alert=True)
 
     user_id = callback.from_user.id
 
     try:
-        success = await db.complete_task(task_id, user_id)
+        # Получаем обновленную задачу вместе с часовым поясом пользователя
+        task = await db.complete_task(task_id, user_id)
 
-        if success:
+        if task:
             await callback.answer(
                 "✅ Задача отмечена как выполненная! "
                 "Теперь она видна в разделе выполненных задач.",
                 show_alert=True
             )
 
-            # Получаем часовой пояс пользователя
-            user_timezone = await db.get_user_timezone(user_id)
-
             # Обновляем сообщение с деталями задачи
-            task = await db.get_task_by_id(task_id, user_id)
-            if task:
-                updated_text = await format_task_detail_text(
-                    task, user_timezone
-                )
-                await callback.message.edit_text(
-                    updated_text,
-                    parse_mode="HTML",
-                    reply_markup=get_task_detail_keyboard(
-                        task_id, task['status']
-                    )
+            updated_text = await format_task_detail_text(
+                task, task['timezone']
+            )
+            await callback.message.edit_text(
+                updated_text,
+                parse_mode="HTML",
+                reply_markup=get_task_detail_keyboard(
+                    task_id, task['status']
                 )
+            )
         else:
             await callback.answer(
                 "❌ Не удалось отметить задачу как выполненную",
@@ -182,8 +191,7 @@ async def delete_task_callback(callback: CallbackQuery):
     try:
         task_id = int(callback.data.split(":")[1])
     except (ValueError, IndexError):
-        await callback.answer("❌ Неверный формат данных", show_alert=True)
-        return
+        return callback.answer("❌ Неверный формат данных", show_alert=True)
 
     user_id = callback.from_user.id
 
@@ -191,8 +199,7 @@ async def delete_task_callback(callback: CallbackQuery):
         task = await db.get_task_by_id(task_id, user_id)
 
         if not task:
-            await callback.answer("❌ Задача не найдена", show_alert=True)
-            return
+            return callback.answer("❌ Задача не найдена", show_alert=True)
 
         task_text = task['task_text']
         if len(task_text) > 100:
@@ -230,8 +237,7 @@ async def confirm_delete_task(callback: CallbackQuery):
     try:
         task_id = int(callback.data.split(":")[1])
     except (ValueError, IndexError):
-        await callback.answer("❌ Неверный формат данных", show_alert=True)
-        return
+        return callback.answer("❌ Неверный формат данных", show_alert=True)
 
     user_id = callback.from_user.id
 
@@ -264,8 +270,7 @@ async def cancel_edit_callback(callback: CallbackQuery, state: FSMContext):
     try:
         task_id = int(callback.data.split(":")[1])
     except (ValueError, IndexError):
-        await callback.answer("❌ Неверный формат данных", show_alert=True)
-        return
+        return callback.answer("❌ Неверный формат данных", show_alert=True)
 
     user_id = callback.from_user.id
 
@@ -295,35 +300,30 @@ async def reactivate_task_callback(callback: CallbackQuery):
     try:
         task_id = int(callback.data.split(":")[1])
     except (ValueError, IndexError):
-        await callback.answer("❌ Неверный формат данных", show_alert=True)
-        return
+        return callback.answer("❌ Неверный формат данных", show_alert=True)
 
     user_id = callback.from_user.id
 
     try:
-        success = await db.reactivate_task(task_id, user_id)
+        # Получаем обновленную задачу вместе с часовым поясом пользователя
+        task = await db.reactivate_task(task_id, user_id)
 
-        if success:
+        if task:
             await callback.answer(
                 "⏳ Задача снова активна!", show_alert=True
             )
 
-            # Получаем часовой пояс пользователя
-            user_timezone = await db.get_user_timezone(user_id)
-
             # Обновляем сообщение с деталями задачи
-            task = await db.get_task_by_id(task_id, user_id)
-            if task:
-                updated_text = await format_task_detail_text(
-                    task, user_timezone
-                )
-                await callback.message.edit_text(
-                    updated_text,
-                    parse_mode="HTML",
-                    reply_markup=get_task_detail_keyboard(
-                        task_id, task['status']
-                    )
+            updated_text = await format_task_detail_text(
+                task, task['timezone']
+            )
+            await callback.message.edit_text(
+                updated_text,
+                parse_mode="HTML",
+                reply_markup=get_task_detail_keyboard(
+                    task_id, task['status']
                 )
+            )
         else:
             await callback.answer(
                 "❌ Не удалось реактивировать задачу",
@@ -346,8 +346,7 @@ async def hide_task_callback(callback: CallbackQuery):
     try:
         task_id = int(callback.data.split(":")[1])
     except (ValueError, IndexError):
-        await callback.answer("❌ Неверный формат данных", show_alert=True)
-        return
+        return callback.answer("❌ Неверный формат данных", show_alert=True)
 
     user_id = callback.from_user.id
 
@@ -355,15 +354,13 @@ async def hide_task_callback(callback: CallbackQuery):
         task = await db.get_task_by_id(task_id, user_id)
 
         if not task:
-            await callback.answer("❌ Задача не найдена", show_alert=True)
-            return
+            return callback.answer("❌ Задача не найдена", show_alert=True)
 
         if not task['status']:
-            await callback.answer(
+            return callback.answer(
                 "❌ Можно скрыть только выполненную задачу",
                 show_alert=True
             )
-            return
 
         task_text = task['task_text']
         if len(task_text) > 100:
@@ -398,8 +395,7 @@ async def confirm_hide_task(callback: CallbackQuery):
     try:
         task_id = int(callback.data.split(":")[1])
     except (ValueError, IndexError):
-        await callback.answer("❌ Неверный формат данных", show_alert=True)
-        return
+        return callback.answer("❌ Неверный формат данных", show_alert=True)
 
     user_id = callback.from_user.id
 
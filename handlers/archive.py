@@ -0,0 +1,38 @@
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.types import Message
+
+from database import db
+from utils.logging_config import get_logger
+from utils.task_formatting import format_archive_text
+
+logger = get_logger(__name__)
+router = Router()
+
+# Сколько последних архивных задач показывать
+ARCHIVE_PAGE_SIZE = 20
+
+
+@router.message(Command("archive"))
+async def show_archive(message: Message):
+    """Показать архив задач пользователя (читается из холодной таблицы)"""
+    user_id = message.from_user.id
+
+    try:
+        archive = await db.get_archived_tasks(
+            user_id, limit=ARCHIVE_PAGE_SIZE
+        )
+        user_timezone = await db.get_user_timezone(user_id)
+
+        await message.answer(
+            format_archive_text(
+                archive['tasks'], archive['total'], user_timezone
+            ),
+            parse_mode="HTML"
+        )
+
+    except Exception as e:
+        logger.error(f"Ошибка загрузки архива пользователя {user_id}: {e}")
+        await message.answer(
+            "❌ Произошла ошибка при загрузке архива. Попробуй еще раз."
+        )
@@ -0,0 +1,249 @@
+from aiogram import Router, F
+from aiogram.types import CallbackQuery
+from aiogram.fsm.context import FSMContext
+
+from database import db
+from keyboards.inline import (
+    get_bulk_confirmation_keyboard,
+    get_tasks_select_keyboard
+)
+from handlers.actions import update_tasks_list_message
+from services.outbound import edit_in_background
+from utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+router = Router()
+
+# Сколько задач доступно для выбора на одном экране
+SELECT_PAGE_SIZE = 30
+
+# Действия над выбранными задачами: метод БД, текст результата
+# и текст подтверждения (None — выполняется без подтверждения)
+BULK_ACTIONS = {
+    'complete': (
+        db.complete_tasks,
+        "✅ Отмечено выполненными: {count}",
+        None
+    ),
+    'hide': (
+        db.hide_tasks,
+        "🫥 Скрыто задач: {count}",
+        "🫥 <b>Скрытие задач</b>\n\n"
+        "<b>Скрыть выбранные задачи ({count})?</b>\n\n"
+        "ℹ️ Скрываются только выполненные задачи"
+    ),
+    'delete': (
+        db.delete_tasks,
+        "🗑 Удалено задач: {count}",
+        "🗑 <b>Удаление задач</b>\n\n"
+        "<b>Удалить выбранные задачи ({count})?</b>\n\n"
+        "⚠️ <b>Это действие нельзя отменить!</b>"
+    )
+}
+
+
+async def get_selection(state: FSMContext):
+    """Получение выбранных задач и режима просмотра из FSM"""
+    data = await state.get_data()
+    return (
+        data.get('selected_task_ids', []),
+        data.get('select_show_completed', False)
+    )
+
+
+async def clear_selection(state: FSMContext):
+    """Удаление данных режима выбора из FSM"""
+    data = await state.get_data()
+    data.pop('selected_task_ids', None)
+    data.pop('select_show_completed', None)
+    await state.set_data(data)
+
+
+async def show_select_screen(callback: CallbackQuery, state: FSMContext):
+    """Отрисовка экрана множественного выбора"""
+    selected_ids, show_completed = await get_selection(state)
+
+    snapshot = await db.get_tasks_list_snapshot(
+        callback.from_user.id,
+        include_completed=show_completed,
+        limit=SELECT_PAGE_SIZE
+    )
+    tasks = snapshot['tasks']
+
+    text = f"""☑️ <b>Выбор задач</b>
+
+Выбрано: <b>{len(selected_ids)}</b>
+
+<i>Отметь задачи и выбери действие</i>"""
+
+    if snapshot['has_next']:
+        text += (
+            f"\n<i>Показаны первые {SELECT_PAGE_SIZE} задач</i>"
+        )
+
+    # Обработчики выбора возвращают ответ на callback после отрисовки:
+    # правка не должна задерживать его в очереди отправки
+    await edit_in_background(callback.message.edit_text(
+        text,
+        parse_mode="HTML",
+        reply_markup=get_tasks_select_keyboard(tasks, selected_ids)
+    ))
+
+
+@router.callback_query(F.data.startswith("select_mode:"))
+async def select_mode_callback(callback: CallbackQuery, state: FSMContext):
+    """Включение режима множественного выбора"""
+    await state.update_data(
+        selected_task_ids=[],
+        select_show_completed=callback.data.split(":")[1] == "1"
+    )
+
+    try:
+        await show_select_screen(callback, state)
+    except Exception as e:
+        logger.error(
+            "Ошибка включения режима выбора "
+            f"для пользователя {callback.from_user.id}: {e}"
+        )
+        return callback.answer("❌ Произошла ошибка", show_alert=True)
+
+    return callback.answer()
+
+
+@router.callback_query(F.data.startswith("select_task:"))
+async def toggle_task_callback(callback: CallbackQuery, state: FSMContext):
+    """Отметка/снятие отметки с задачи"""
+    try:
+        task_id = int(callback.data.split(":")[1])
+    except (ValueError, IndexError):
+        return callback.answer("❌ Неверный формат данных", show_alert=True)
+
+    selected_ids, _ = await get_selection(state)
+    if task_id in selected_ids:
+        selected_ids.remove(task_id)
+    else:
+        selected_ids.append(task_id)
+    await state.update_data(selected_task_ids=selected_ids)
+
+    try:
+        await show_select_screen(callback, state)
+    except Exception as e:
+        logger.error(f"Ошибка отметки задачи {task_id}: {e}")
+
+    # Ответ на нажатие возвращается из обработчика: в режиме webhook
+    # он уходит в ответе Telegram без отдельного запроса к Bot API
+    return callback.answer()
+
+
+@router.callback_query(F.data == "select_all")
+@router.callback_query(F.data == "select_none")
+async def select_all_callback(callback: CallbackQuery, state: FSMContext):
+    """Выбор всех задач на экране или снятие выбора"""
+    selected_ids = []
+    if callback.data == "select_all":
+        _, show_completed = await get_selection(state)
+        snapshot = await db.get_tasks_list_snapshot(
+            callback.from_user.id,
+            include_completed=show_completed,
+            limit=SELECT_PAGE_SIZE
+        )
+        selected_ids = [task['id'] for task in snapshot['tasks']]
+
+    await state.update_data(selected_task_ids=selected_ids)
+
+    try:
+        await show_select_screen(callback, state)
+    except Exception as e:
+        logger.error(f"Ошибка выбора всех задач: {e}")
+
+    return callback.answer()
+
+
+@router.callback_query(F.data == "select_back")
+async def select_back_callback(callback: CallbackQuery, state: FSMContext):
+    """Возврат к экрану выбора из подтверждения"""
+    try:
+        await show_select_screen(callback, state)
+    except Exception as e:
+        logger.error(
+            "Ошибка возврата к выбору задач "
+            f"для пользователя {callback.from_user.id}: {e}"
+        )
+        return callback.answer("❌ Произошла ошибка", show_alert=True)
+
+    return callback.answer()
+
+
+@router.callback_query(F.data == "select_cancel")
+async def select_cancel_callback(callback: CallbackQuery, state: FSMContext):
+    """Выход из режима выбора"""
+    await callback.answer()
+
+    _, show_completed = await get_selection(state)
+    await clear_selection(state)
+    await update_tasks_list_message(callback, show_completed)
+
+
+async def run_bulk_action(
+        callback: CallbackQuery,
+        state: FSMContext,
+        action: str
+):
+    """Выполнение действия над выбранными задачами одним запросом"""
+    method, result_text, _ = BULK_ACTIONS[action]
+    selected_ids, show_completed = await get_selection(state)
+    user_id = callback.from_user.id
+
+    try:
+        affected_ids = await method(selected_ids, user_id)
+    except Exception as e:
+        await callback.answer("❌ Произошла ошибка", show_alert=True)
+        logger.error(
+            f"Ошибка группового действия {action} "
+            f"пользователя {user_id}: {e}"
+        )
+        return
+
+    await callback.answer(
+        result_text.format(count=len(affected_ids)),
+        show_alert=True
+    )
+    await clear_selection(state)
+    await update_tasks_list_message(callback, show_completed)
+
+
+@router.callback_query(F.data.startswith("bulk:"))
+async def bulk_action_callback(callback: CallbackQuery, state: FSMContext):
+    """Действие над выбранными задачами"""
+    action = callback.data.split(":")[1]
+    if action not in BULK_ACTIONS:
+        return callback.answer("❌ Неверный формат данных", show_alert=True)
+
+    selected_ids, _ = await get_selection(state)
+    if not selected_ids:
+        return callback.answer(
+            "❌ Не выбрано ни одной задачи", show_alert=True
+        )
+
+    _, _, confirmation_text = BULK_ACTIONS[action]
+    if confirmation_text is None:
+        await run_bulk_action(callback, state, action)
+        return
+
+    await callback.answer()
+    await callback.message.edit_text(
+        confirmation_text.format(count=len(selected_ids)),
+        parse_mode="HTML",
+        reply_markup=get_bulk_confirmation_keyboard(action)
+    )
+
+
+@router.callback_query(F.data.startswith("bulk_confirm:"))
+async def bulk_confirm_callback(callback: CallbackQuery, state: FSMContext):
+    """Подтверждение действия над выбранными задачами"""
+    action = callback.data.split(":")[1]
+    if action not in BULK_ACTIONS:
+        return callback.answer("❌ Неверный формат данных", show_alert=True)
+
+    await run_bulk_action(callback, state, action)
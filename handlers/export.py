@@ -0,0 +1,118 @@
+import asyncio
+import tempfile
+from contextlib import aclosing
+from datetime import datetime
+
+from aiogram import Router, F
+from aiogram.filters import Command, CommandObject
+from aiogram.types import CallbackQuery, Message
+
+from config import EXPORT_BATCH_SIZE, EXPORT_MAX_CONCURRENT, EXPORT_SPOOL_SIZE
+from database import db
+from keyboards.inline import get_export_format_keyboard
+from utils.export import EXPORT_FORMATS, EXPORT_WRITERS, SpooledInputFile
+from utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+router = Router()
+
+# Ограничение Telegram на размер файла, отправляемого ботом
+MAX_FILE_SIZE = 50 * 1024 * 1024
+
+# Выгрузка держит соединение с БД до конца чтения,
+# поэтому одновременных выгрузок немного
+export_semaphore = asyncio.Semaphore(EXPORT_MAX_CONCURRENT)
+# Пользователи, чья выгрузка уже выполняется
+exporting_users = set()
+
+
+async def send_export(message: Message, user_id: int, export_format: str):
+    """Выгрузка всех задач пользователя в файл и отправка документа"""
+    if user_id in exporting_users:
+        await message.answer("⏳ Выгрузка уже готовится, подожди немного")
+        return
+
+    if export_semaphore.locked():
+        await message.answer(
+            "⏳ Сейчас выполняется много выгрузок. Попробуй через минуту"
+        )
+        return
+
+    exporting_users.add(user_id)
+    try:
+        async with export_semaphore:
+            await message.answer("⏳ Готовлю файл с задачами...")
+
+            # Файл держится в памяти до EXPORT_SPOOL_SIZE байт,
+            # дальше автоматически переносится на диск
+            with tempfile.SpooledTemporaryFile(
+                max_size=EXPORT_SPOOL_SIZE
+            ) as file:
+                batches = db.iter_user_tasks_for_export(
+                    user_id, batch_size=EXPORT_BATCH_SIZE
+                )
+                async with aclosing(batches):
+                    count = await EXPORT_WRITERS[export_format](
+                        batches, file
+                    )
+
+                if file.tell() > MAX_FILE_SIZE:
+                    await message.answer(
+                        "❌ Файл получился больше 50 МБ и не может быть "
+                        "отправлен в Telegram"
+                    )
+                    return
+
+                filename = (
+                    f"tasks_{datetime.now():%Y%m%d}.{export_format}"
+                )
+                await message.answer_document(
+                    SpooledInputFile(file, filename=filename),
+                    caption=f"📦 Выгружено задач: {count}"
+                )
+
+        logger.info(
+            f"Пользователь {user_id} выгрузил {count} задач "
+            f"в формате {export_format}"
+        )
+
+    except Exception as e:
+        logger.error(f"Ошибка выгрузки задач пользователя {user_id}: {e}")
+        await message.answer(
+            "❌ Произошла ошибка при выгрузке задач. Попробуй еще раз."
+        )
+    finally:
+        exporting_users.discard(user_id)
+
+
+@router.message(Command("export"))
+async def export_command(message: Message, command: CommandObject):
+    """Выгрузка задач: /export [csv|json]"""
+    export_format = (command.args or "").strip().lower()
+
+    if export_format in EXPORT_FORMATS:
+        await send_export(message, message.from_user.id, export_format)
+        return
+
+    await message.answer(
+        "📦 <b>Выгрузка задач</b>\n\n"
+        "В файл попадут все задачи: активные, выполненные, "
+        "скрытые и архивные.\n\n"
+        "Выбери формат:",
+        parse_mode="HTML",
+        reply_markup=get_export_format_keyboard()
+    )
+
+
+@router.callback_query(F.data.startswith("export:"))
+async def export_format_callback(callback: CallbackQuery):
+    """Выбор формата выгрузки"""
+    export_format = callback.data.split(":")[1]
+    if export_format not in EXPORT_FORMATS:
+        return callback.answer("❌ Неверный формат данных", show_alert=True)
+
+    await callback.answer()
+    await callback.message.edit_reply_markup(reply_markup=None)
+    await send_export(
+        callback.message, callback.from_user.id, export_format
+    )
@@ -17,7 +17,12 @@ async def help_handler(message: Message):
 /start - Запустить бота и получить приветствие
 /help - Показать эту справку
 /new_task - Добавить новую задачу
+/new_tasks - Добавить несколько задач (по одной на строку)
 /my_tasks - Показать все ваши задачи
+/search - Найти задачи по тексту (например, /search молоко)
+/archive - Показать архив старых и скрытых задач
+/export - Выгрузить все задачи в файл CSV или JSON
+/import - Загрузить задачи из файла .txt или .csv
 /set_timezone - Установить свой часовой пояс
 
 <b>Быстрые кнопки:</b>
@@ -42,6 +47,8 @@ async def help_handler(message: Message):
    • ✅ Отметить выполненной - задача останется в истории
    • 🗑 Удалить - задача будет полностью удалена
    • 🔄 Обновить - обновить список задач
+   • ☑️ Выбрать несколько - выполнить, скрыть или удалить
+     сразу несколько задач
 
 <b>Удобные функции:</b>
 • Все действия выполняются через удобные кнопки
@@ -8,7 +8,10 @@ from database import db
 from keyboards.reply import get_cancel_keyboard, get_main_keyboard
 from keyboards.inline import get_task_detail_keyboard
 from utils.logging_config import get_logger
-from utils.task_formatting import format_task_detail_text
+from utils.task_formatting import (
+    format_added_tasks_text,
+    format_task_detail_text
+)
 
 logger = get_logger(__name__)
 
@@ -60,7 +63,29 @@ async def new_task_command(update, state: FSMContext):
         )
 
 
+@router.message(Command("new_tasks"))
+async def new_tasks_command(message: Message, state: FSMContext):
+    """Начало добавления нескольких задач одним сообщением"""
+    await state.set_state(TaskStates.waiting_for_new_tasks)
+
+    await message.answer(
+        """📝 <b>Добавление нескольких задач</b>
+
+Напиши задачи одним сообщением, <b>каждую с новой строки</b>.
+
+<i>Например:</i>
+Купить молоко
+Позвонить маме
+Записаться к врачу
+
+Для отмены нажми кнопку "❌ Отмена" """,
+        parse_mode="HTML",
+        reply_markup=get_cancel_keyboard()
+    )
+
+
 @router.message(TaskStates.waiting_for_new_task, F.text == "❌ Отмена")
+@router.message(TaskStates.waiting_for_new_tasks, F.text == "❌ Отмена")
 async def cancel_new_task(message: Message, state: FSMContext):
     """Отмена добавления новой задачи"""
     await state.clear()
@@ -121,6 +146,75 @@ ID задачи: {task_id}"""
         logger.error(f"Error saving task for user {message.from_user.id}: {e}")
 
 
+@router.message(TaskStates.waiting_for_new_tasks, F.text)
+async def save_new_tasks(message: Message, state: FSMContext):
+    """Сохранение нескольких задач: одна строка — одна задача"""
+    user_id = message.from_user.id
+    task_texts = [
+        line.strip() for line in message.text.splitlines() if line.strip()
+    ]
+
+    if not task_texts:
+        await message.answer(
+            "❌ Список задач пуст. Напиши задачи, каждую с новой строки:",
+            reply_markup=get_cancel_keyboard()
+        )
+        return
+
+    too_long = [
+        number for number, task_text in enumerate(task_texts, 1)
+        if len(task_text) > 1000
+    ]
+    if too_long:
+        await message.answer(
+            "❌ Слишком длинные строки (максимум 1000 символов): "
+            f"{', '.join(map(str, too_long))}. Попробуй сократить:",
+            reply_markup=get_cancel_keyboard()
+        )
+        return
+
+    try:
+        # Все задачи записываются одним INSERT
+        task_ids = await db.add_tasks(user_id, task_texts)
+    except Exception as e:
+        await message.answer(
+            "❌ Произошла ошибка при сохранении задач. Попробуй еще раз.",
+            reply_markup=get_main_keyboard()
+        )
+        await state.clear()
+        logger.error(
+            f"Ошибка сохранения задач для пользователя {user_id}: {e}"
+        )
+        return
+
+    # Задачи уже сохранены: ошибка отправки подтверждения не должна
+    # выглядеть как ошибка сохранения, иначе повтор создаст дубликаты
+    await state.clear()
+    try:
+        await message.answer(
+            format_added_tasks_text(task_texts),
+            parse_mode="HTML",
+            reply_markup=get_main_keyboard()
+        )
+    except Exception as e:
+        logger.error(
+            f"Задачи {task_ids} пользователя {user_id} сохранены, "
+            f"но подтверждение не отправлено: {e}"
+        )
+        # Короткое подтверждение; если и оно не уходит (сеть, лимит
+        # Telegram), задачи все равно сохранены — только пишем в лог
+        try:
+            await message.answer(
+                f"✅ Добавлено задач: {len(task_ids)}",
+                reply_markup=get_main_keyboard()
+            )
+        except Exception as e:
+            logger.error(
+                f"Короткое подтверждение пользователю {user_id} "
+                f"не отправлено: {e}"
+            )
+
+
 @router.message(TaskStates.waiting_for_task_edit)
 async def save_edited_task(message: Message, state: FSMContext):
     """Сохранение отредактированной задачи"""
@@ -152,41 +246,28 @@ async def save_edited_task(message: Message, state: FSMContext):
             await state.clear()
             return
 
-        success = await db.update_task(task_id, message.from_user.id, new_text)
+        # Получаем обновленную задачу вместе с часовым поясом пользователя
+        task = await db.update_task(task_id, message.from_user.id, new_text)
 
-        if success:
+        if task:
             await state.clear()
 
-            # Получаем обновленную задачу и показываем детали
-            task = await db.get_task_by_id(task_id, message.from_user.id)
-            if task:
-
-                # Получаем часовой пояс пользователя
-                user_timezone = await db.get_user_timezone(
-                    message.from_user.id
-                )
-
-                task_detail_text = await format_task_detail_text(
-                    task, user_timezone
-                )
+            task_detail_text = await format_task_detail_text(
+                task, task['timezone']
+            )
 
-                await message.answer(
-                    "✅ Задача обновлена!",
-                    reply_markup=get_main_keyboard()
-                )
+            await message.answer(
+                "✅ Задача обновлена!",
+                reply_markup=get_main_keyboard()
+            )
 
-                await message.answer(
-                    task_detail_text,
-                    parse_mode="HTML",
-                    reply_markup=get_task_detail_keyboard(
-                        task_id, task['status']
-                    )
-                )
-            else:
-                await message.answer(
-                    "✅ Задача обновлена!",
-                    reply_markup=get_main_keyboard()
+            await message.answer(
+                task_detail_text,
+                parse_mode="HTML",
+                reply_markup=get_task_detail_keyboard(
+                    task_id, task['status']
                 )
+            )
         else:
             await message.answer(
                 "❌ Не удалось обновить задачу. Попробуй еще раз."
@@ -207,6 +288,7 @@ async def save_edited_task(message: Message, state: FSMContext):
 
 
 @router.message(TaskStates.waiting_for_new_task, ~F.text)
+@router.message(TaskStates.waiting_for_new_tasks, ~F.text)
 @router.message(TaskStates.waiting_for_task_edit, ~F.text)
 async def invalid_task_input(message: Message):
     """Обработка некорректного ввода при работе с задачами"""
@@ -0,0 +1,133 @@
+from typing import Optional
+
+from aiogram import Router, F
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery, Message
+
+from database import db
+from keyboards.inline import get_tasks_list_keyboard
+from utils.logging_config import get_logger
+from utils.pagination import (
+    SearchCursor,
+    decode_search_cursor,
+    encode_search_cursor,
+    search_cursor_from_task
+)
+from utils.task_formatting import format_search_results_text
+
+logger = get_logger(__name__)
+router = Router()
+
+# Ограничение длины поискового запроса
+MAX_QUERY_LENGTH = 100
+
+
+async def show_search_results(
+        update,
+        query: str,
+        cursor: Optional[SearchCursor] = None,
+        backward: bool = False
+):
+    """Показать страницу результатов поиска"""
+    if isinstance(update, CallbackQuery):
+        message = update.message
+        await update.answer()
+        edit_message = True
+    else:
+        message = update
+        edit_message = False
+
+    user_id = update.from_user.id
+
+    try:
+        results = await db.search_tasks(
+            user_id, query, cursor=cursor, backward=backward
+        )
+        tasks = results['tasks']
+        user_timezone = await db.get_user_timezone(user_id)
+
+        prev_data = next_data = None
+        if tasks:
+            first = encode_search_cursor(search_cursor_from_task(tasks[0]))
+            last = encode_search_cursor(search_cursor_from_task(tasks[-1]))
+            prev_data = f"search_prev:{first}"
+            next_data = f"search_next:{last}"
+
+        keyboard = get_tasks_list_keyboard(
+            tasks,
+            has_prev=results['has_prev'],
+            has_next=results['has_next'],
+            prev_data=prev_data,
+            next_data=next_data,
+            selectable=False
+        )
+        text = format_search_results_text(tasks, query, user_timezone)
+
+        if edit_message:
+            await message.edit_text(
+                text, parse_mode="HTML", reply_markup=keyboard
+            )
+        else:
+            await message.answer(
+                text, parse_mode="HTML", reply_markup=keyboard
+            )
+
+    except Exception as e:
+        error_text = "❌ Произошла ошибка при поиске. Попробуй еще раз."
+        logger.error(f"Ошибка поиска задач пользователя {user_id}: {e}")
+
+        if edit_message:
+            await message.edit_text(error_text)
+        else:
+            await message.answer(error_text)
+
+
+@router.message(Command("search"))
+async def search_command(
+        message: Message,
+        command: CommandObject,
+        state: FSMContext
+):
+    """Поиск по тексту задач: /search <запрос>"""
+    query = (command.args or "").strip()
+
+    if not query:
+        await message.answer(
+            "🔍 <b>Поиск задач</b>\n\n"
+            "Напиши запрос после команды, например:\n"
+            "<code>/search молоко</code>",
+            parse_mode="HTML"
+        )
+        return
+
+    query = query[:MAX_QUERY_LENGTH]
+    # Запрос сохраняется для листания результатов: в callback_data
+    # он может не поместиться
+    await state.update_data(search_query=query)
+    await show_search_results(message, query)
+
+
+@router.callback_query(F.data.startswith("search_next:"))
+@router.callback_query(F.data.startswith("search_prev:"))
+async def search_page_callback(callback: CallbackQuery, state: FSMContext):
+    """Переход на следующую/предыдущую страницу результатов поиска"""
+    try:
+        direction, raw_cursor = callback.data.split(":", 1)
+        cursor = decode_search_cursor(raw_cursor)
+    except ValueError:
+        return callback.answer("❌ Неверный формат данных", show_alert=True)
+
+    data = await state.get_data()
+    query = data.get('search_query')
+    if not query:
+        return callback.answer(
+            "❌ Поиск устарел, повтори команду /search", show_alert=True
+        )
+
+    await show_search_results(
+        callback,
+        query,
+        cursor=cursor,
+        backward=direction == "search_prev"
+    )
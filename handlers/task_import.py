@@ -0,0 +1,137 @@
+import csv
+
+from aiogram import Router, F
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message
+
+from config import IMPORT_MAX_FILE_SIZE, IMPORT_MAX_TASKS
+from database import db
+from keyboards.reply import get_cancel_keyboard, get_main_keyboard
+from states import ImportStates
+from utils.logging_config import get_logger
+from utils.task_import import parse_tasks_file
+
+logger = get_logger(__name__)
+router = Router()
+
+
+@router.message(Command("import"))
+async def import_command(message: Message, state: FSMContext):
+    """Начало импорта задач из файла"""
+    await state.set_state(ImportStates.waiting_for_file)
+
+    await message.answer(
+        f"""📥 <b>Импорт задач из файла</b>
+
+Отправь файл <b>.txt</b> (одна задача на строку) или <b>.csv</b>
+(колонка task_text или первая колонка).
+
+<i>Не больше {IMPORT_MAX_TASKS} задач, до 1000 символов каждая</i>
+
+Для отмены нажми кнопку "❌ Отмена" """,
+        parse_mode="HTML",
+        reply_markup=get_cancel_keyboard()
+    )
+
+
+@router.message(ImportStates.waiting_for_file, F.text == "❌ Отмена")
+async def cancel_import(message: Message, state: FSMContext):
+    """Отмена импорта"""
+    await state.clear()
+    await message.answer(
+        "❌ Импорт отменен.",
+        reply_markup=get_main_keyboard()
+    )
+
+
+@router.message(ImportStates.waiting_for_file, F.document)
+async def import_file(message: Message, state: FSMContext):
+    """Загрузка задач из присланного файла одной командой COPY"""
+    document = message.document
+    user_id = message.from_user.id
+
+    if document.file_size and document.file_size > IMPORT_MAX_FILE_SIZE:
+        await message.answer(
+            f"❌ Файл слишком большой (максимум "
+            f"{IMPORT_MAX_FILE_SIZE // (1024 * 1024)} МБ)",
+            reply_markup=get_cancel_keyboard()
+        )
+        return
+
+    try:
+        file = await message.bot.download(document)
+    except Exception as e:
+        await state.clear()
+        await message.answer(
+            "❌ Не удалось загрузить файл. Попробуй еще раз.",
+            reply_markup=get_main_keyboard()
+        )
+        logger.error(
+            f"Ошибка загрузки файла импорта пользователя {user_id}: {e}"
+        )
+        return
+
+    try:
+        task_texts = parse_tasks_file(
+            file.getvalue(), document.file_name or ""
+        )
+    except UnicodeDecodeError:
+        await message.answer(
+            "❌ Не удалось прочитать файл. Сохрани его в кодировке UTF-8",
+            reply_markup=get_cancel_keyboard()
+        )
+        return
+    except csv.Error as e:
+        await state.clear()
+        await message.answer(
+            "❌ Не удалось разобрать CSV-файл. Проверь его формат.",
+            reply_markup=get_main_keyboard()
+        )
+        logger.warning(f"Некорректный CSV от пользователя {user_id}: {e}")
+        return
+
+    if len(task_texts) > IMPORT_MAX_TASKS:
+        await message.answer(
+            f"❌ В файле {len(task_texts)} задач, "
+            f"максимум — {IMPORT_MAX_TASKS}",
+            reply_markup=get_cancel_keyboard()
+        )
+        return
+
+    try:
+        result = await db.import_tasks(user_id, task_texts)
+        await state.clear()
+
+        text = f"""📥 <b>Импорт завершен</b>
+
+✅ Добавлено задач: {result['accepted']}"""
+        if result['rejected']:
+            text += (
+                f"\n⚠️ Пропущено: {result['rejected']} "
+                "(пустые или длиннее 1000 символов)"
+            )
+
+        await message.answer(
+            text,
+            parse_mode="HTML",
+            reply_markup=get_main_keyboard()
+        )
+
+    except Exception as e:
+        await state.clear()
+        await message.answer(
+            "❌ Произошла ошибка при импорте задач. Попробуй еще раз.",
+            reply_markup=get_main_keyboard()
+        )
+        logger.error(f"Ошибка импорта задач пользователя {user_id}: {e}")
+
+
+@router.message(ImportStates.waiting_for_file)
+async def invalid_import_input(message: Message):
+    """Обработка некорректного ввода при импорте"""
+    await message.answer(
+        "❌ Отправь файл .txt или .csv с задачами "
+        "или нажми \"❌ Отмена\"",
+        reply_markup=get_cancel_keyboard()
+    )
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.types import CallbackQuery
@@ -5,6 +7,7 @@ from aiogram.types import CallbackQuery
 from database import db
 from keyboards.inline import get_tasks_list_keyboard, get_task_detail_keyboard
 from utils.logging_config import get_logger
+from utils.pagination import Cursor, decode_cursor
 from utils.task_formatting import (
     format_tasks_list_text,
     format_task_detail_text
@@ -19,8 +22,19 @@ router = Router()
 @router.callback_query(F.data == "my_tasks")
 @router.callback_query(F.data == "refresh_tasks")
 @router.callback_query(F.data == "hide_completed")
-async def show_tasks_list(update, show_completed: bool = False):
-    """Показать список задач пользователя"""
+async def show_tasks_list(
+        update,
+        show_completed: bool = False,
+        cursor: Optional[Cursor] = None,
+        backward: bool = False,
+        offset: int = 0
+):
+    """
+    Показать список задач пользователя
+
+    offset — сколько задач в списке перед курсором: при переходе вперед
+    с него начинается страница, при переходе назад на нем заканчивается
+    """
 
     # Определяем тип события
     if isinstance(update, CallbackQuery):
@@ -34,26 +48,42 @@ async def show_tasks_list(update, show_completed: bool = False):
         edit_message = False
 
     try:
-        # Получаем задачи в зависимости от режима
-        tasks = await db.get_user_tasks(
+        # Получаем задачи, счетчики и часовой пояс одним запросом
+        snapshot = await db.get_tasks_list_snapshot(
             user_id,
-            include_completed=show_completed
+            include_completed=show_completed,
+            cursor=cursor,
+            backward=backward
         )
+        tasks = snapshot['tasks']
+        completed_count = snapshot['completed_count']
+        user_timezone = snapshot['timezone']
 
-        # Получаем количество выполненных задач для кнопки
-        completed_count = await db.get_completed_tasks_count(user_id)
-
-        # Получаем часовой пояс пользователя
-        user_timezone = await db.get_user_timezone(user_id)
+        # Номер первой задачи страницы в списке
+        if backward:
+            offset -= len(tasks)
+        if not snapshot['has_prev']:
+            offset = 0
+        offset = max(offset, 0)
 
         # Форматируем текст списка задач с учетом режима просмотра
         tasks_text = format_tasks_list_text(
-            tasks, user_timezone, show_completed
+            tasks,
+            user_timezone,
+            show_completed,
+            active_count=snapshot['active_count'],
+            completed_count=completed_count,
+            offset=offset
         )
 
         # Создаем клавиатуру с учетом режима и количества выполненных
         keyboard = get_tasks_list_keyboard(
-            tasks, show_completed, completed_count
+            tasks,
+            show_completed,
+            completed_count,
+            has_prev=snapshot['has_prev'],
+            has_next=snapshot['has_next'],
+            offset=offset
         )
 
         # Обновляем сообщение
@@ -86,6 +116,26 @@ async def show_completed_tasks(callback: CallbackQuery):
     await show_tasks_list(callback, show_completed=True)
 
 
+@router.callback_query(F.data.startswith("tasks_next:"))
+@router.callback_query(F.data.startswith("tasks_prev:"))
+async def show_tasks_page(callback: CallbackQuery):
+    """Переход на следующую/предыдущую страницу списка задач"""
+    try:
+        direction, mode, raw_offset, raw_cursor = callback.data.split(":", 3)
+        offset = int(raw_offset)
+        cursor = decode_cursor(raw_cursor)
+    except ValueError:
+        return callback.answer("❌ Неверный формат данных", show_alert=True)
+
+    await show_tasks_list(
+        callback,
+        show_completed=mode == "1",
+        cursor=cursor,
+        backward=direction == "tasks_prev",
+        offset=offset
+    )
+
+
 @router.callback_query(F.data.startswith("show_task:"))
 async def show_task_detail(callback: CallbackQuery):
     """Показать детали конкретной задачи"""
@@ -94,8 +144,7 @@ async def show_task_detail(callback: CallbackQuery):
     try:
         task_id = int(callback.data.split(":")[1])
     except (ValueError, IndexError):
-        await callback.answer("❌ Неверный формат данных", show_alert=True)
-        return
+        return callback.answer("❌ Неверный формат данных", show_alert=True)
 
     user_id = callback.from_user.id
 
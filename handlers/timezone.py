@@ -51,15 +51,13 @@ async def set_timezone_callback(callback: CallbackQuery):
     try:
         timezone = callback.data.split(":", 1)[1]
     except (IndexError, ValueError):
-        await callback.answer("❌ Неверный формат данных", show_alert=True)
-        return
+        return callback.answer("❌ Неверный формат данных", show_alert=True)
 
     user_id = callback.from_user.id
 
     # Валидируем часовой пояс
     if not validate_timezone(timezone):
-        await callback.answer("❌ Неверный часовой пояс", show_alert=True)
-        return
+        return callback.answer("❌ Неверный часовой пояс", show_alert=True)
 
     try:
         # Сохраняем часовой пояс в БД
@@ -1,6 +1,5 @@
 import asyncpg
 import asyncio
-from pathlib import Path
 from config import (
     INIT_DB_USER,
     INIT_DB_PASS,
@@ -9,24 +8,15 @@ from config import (
     INIT_DB_NAME,
     validate_init_config
 )
+from utils.migrations import apply_migrations
 
 
 async def run_init_sql():
-    """Инициализация базы данных из SQL-скрипта"""
+    """Инициализация базы данных применением миграций"""
     try:
         # Валидируем конфигурацию
         validate_init_config()
 
-        # Проверяем наличие SQL-файла
-        sql_file = Path("init_db.sql")
-        if not sql_file.exists():
-            print("❌ Файл init_db.sql не найден")
-            return False
-
-        # Читаем SQL-скрипт
-        with open(sql_file, "r", encoding="utf-8") as f:
-            sql_script = f.read()
-
         # Подключение к базе данных
         print(
             f"🔗 Подключение к БД {INIT_DB_NAME} "
@@ -41,25 +31,20 @@ async def run_init_sql():
         )
 
         try:
-            # Проверка существования таблицы
-            table_exists = await conn.fetchval("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables
-                    WHERE table_schema = 'public' AND table_name = 'tasks'
-                );
-            """)
+            # Применяем все неприменённые миграции (под advisory-блокировкой)
+            applied = await apply_migrations(conn)
 
-            if table_exists:
+            if applied:
                 print(
-                    "ℹ️ Таблица 'tasks' уже существует. "
-                    "Инициализация не требуется."
+                    "✅ База данных успешно инициализирована. "
+                    f"Применены миграции: {', '.join(applied)}"
                 )
-                return True
             else:
-                # Выполняем скрипт инициализации
-                await conn.execute(sql_script)
-                print("✅ База данных успешно инициализирована.")
-                return True
+                print(
+                    "ℹ️ Все миграции уже применены. "
+                    "Инициализация не требуется."
+                )
+            return True
 
         finally:
             await conn.close()
@@ -14,8 +14,8 @@ CREATE TABLE IF NOT EXISTS tasks (
     task_text TEXT NOT NULL,
     status BOOLEAN DEFAULT FALSE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    completed_at TIMESTAMP NULL
-    is_hidden BOOLEAN DEFAULT FALSE
+    completed_at TIMESTAMP NULL,
+    is_hidden BOOLEAN NOT NULL DEFAULT FALSE
 );
 
 -- Создание таблицы для пользователей
@@ -28,11 +28,14 @@ CREATE TABLE IF NOT EXISTS users (
 
 -- Создание индексов для оптимизации запросов
 CREATE INDEX IF NOT EXISTS idx_tasks_user_id ON tasks(user_id);
-CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
-CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks(created_at);
-CREATE INDEX IF NOT EXISTS idx_tasks_completed_at ON tasks(completed_at);
-CREATE INDEX IF NOT EXISTS idx_users_timezone ON users(timezone);
-CREATE INDEX IF NOT EXISTS idx_tasks_is_hidden ON tasks(is_hidden);
+-- Список активных задач
+CREATE INDEX IF NOT EXISTS idx_tasks_user_active
+ON tasks(user_id, created_at DESC, id DESC)
+WHERE status = FALSE AND is_hidden = FALSE;
+-- Список с выполненными задачами и счетчики
+CREATE INDEX IF NOT EXISTS idx_tasks_user_visible
+ON tasks(user_id, status, created_at DESC, id DESC)
+WHERE is_hidden = FALSE;
 
 COMMENT ON COLUMN tasks.is_hidden IS 'Флаг скрытия задачи. TRUE - задача скрыта из списков, FALSE - видима';
 COMMENT ON COLUMN tasks.created_at IS 'Дата и время создания задачи';
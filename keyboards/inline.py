@@ -1,16 +1,32 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
+from utils.pagination import cursor_from_task, encode_cursor
 from utils.timezone_utils import get_timezone_keyboard_data
 
 
 def get_tasks_list_keyboard(
     tasks: List[Dict],
     show_completed: bool = False,
-    completed_count: int = 0
+    completed_count: int = 0,
+    has_prev: bool = False,
+    has_next: bool = False,
+    prev_data: Optional[str] = None,
+    next_data: Optional[str] = None,
+    selectable: bool = True,
+    offset: int = 0
 ) -> InlineKeyboardMarkup:
-    """Создание клавиатуры для списка задач"""
+    """
+    Создание клавиатуры для списка задач
+
+    Args:
+        prev_data, next_data: callback_data кнопок навигации, если
+            страницы листаются не по курсору списка (например, поиск)
+        selectable: показывать ли кнопку множественного выбора
+        offset: сколько задач в списке перед страницей (для нумерации
+            на соседних страницах)
+    """
     buttons = []
 
     # Добавляем кнопки для каждой задачи
@@ -34,6 +50,29 @@ def get_tasks_list_keyboard(
             )
         ])
 
+    # Кнопки навигации по страницам: курсор — первая/последняя задача,
+    # offset — сколько задач в списке перед курсором
+    nav_buttons = []
+    mode = int(show_completed)
+    if tasks and has_prev:
+        if prev_data is None:
+            cursor = encode_cursor(cursor_from_task(tasks[0]))
+            prev_data = f"tasks_prev:{mode}:{offset}:{cursor}"
+        nav_buttons.append(
+            InlineKeyboardButton(text="◀️", callback_data=prev_data)
+        )
+    if tasks and has_next:
+        if next_data is None:
+            cursor = encode_cursor(cursor_from_task(tasks[-1]))
+            next_offset = offset + len(tasks)
+            next_data = f"tasks_next:{mode}:{next_offset}:{cursor}"
+        nav_buttons.append(
+            InlineKeyboardButton(text="▶️", callback_data=next_data)
+        )
+
+    if nav_buttons:
+        buttons.append(nav_buttons)
+
     # Кнопка переключения режима просмотра
     if show_completed:
         # Если показываем выполненные, добавляем кнопку скрытия
@@ -51,6 +90,15 @@ def get_tasks_list_keyboard(
         else:
             toggle_button = None
 
+    # Режим множественного выбора
+    if tasks and selectable:
+        buttons.append([
+            InlineKeyboardButton(
+                text="☑️ Выбрать несколько",
+                callback_data=f"select_mode:{mode}"
+            )
+        ])
+
     # Добавляем кнопки управления
     control_buttons = [
         InlineKeyboardButton(text="📝 Новая задача", callback_data="new_task"),
@@ -65,6 +113,87 @@ def get_tasks_list_keyboard(
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+def get_tasks_select_keyboard(
+    tasks: List[Dict],
+    selected_ids: List[int]
+) -> InlineKeyboardMarkup:
+    """Клавиатура режима множественного выбора задач"""
+    buttons = []
+    selected = set(selected_ids)
+
+    # Кнопки-переключатели для каждой задачи
+    for task in tasks:
+        task_id = task['id']
+        check_emoji = "☑️" if task_id in selected else "⬜️"
+        status_emoji = "✅" if task['status'] else "⏳"
+
+        task_text = task['task_text']
+        if len(task_text) > 30:
+            task_text = task_text[:27] + "..."
+
+        buttons.append([
+            InlineKeyboardButton(
+                text=f"{check_emoji} {status_emoji} {task_text}",
+                callback_data=f"select_task:{task_id}"
+            )
+        ])
+
+    if tasks:
+        buttons.append([
+            InlineKeyboardButton(
+                text="☑️ Выбрать все",
+                callback_data="select_all"
+            ),
+            InlineKeyboardButton(
+                text="⬜️ Снять выбор",
+                callback_data="select_none"
+            )
+        ])
+
+    # Действия над выбранными задачами
+    buttons.append([
+        InlineKeyboardButton(
+            text="✅ Выполнить",
+            callback_data="bulk:complete"
+        ),
+        InlineKeyboardButton(
+            text="🫥 Скрыть",
+            callback_data="bulk:hide"
+        ),
+        InlineKeyboardButton(
+            text="🗑 Удалить",
+            callback_data="bulk:delete"
+        )
+    ])
+
+    buttons.append([
+        InlineKeyboardButton(
+            text="⬅️ Назад к списку",
+            callback_data="select_cancel"
+        )
+    ])
+
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def get_bulk_confirmation_keyboard(action: str) -> InlineKeyboardMarkup:
+    """Клавиатура подтверждения действия над выбранными задачами"""
+    buttons = [
+        [
+            InlineKeyboardButton(
+                text="✅ Да",
+                callback_data=f"bulk_confirm:{action}"
+            ),
+            InlineKeyboardButton(
+                text="❌ Нет",
+                callback_data="select_back"
+            )
+        ]
+    ]
+
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
 def get_task_detail_keyboard(
     task_id: int,
     is_completed: bool = False,
@@ -179,3 +308,13 @@ def get_timezone_keyboard() -> InlineKeyboardMarkup:
     ])
 
     return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def get_export_format_keyboard() -> InlineKeyboardMarkup:
+    """Клавиатура выбора формата выгрузки задач"""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="📊 CSV", callback_data="export:csv"),
+            InlineKeyboardButton(text="🧾 JSON", callback_data="export:json")
+        ]
+    ])
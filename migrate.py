@@ -0,0 +1,53 @@
+import asyncio
+
+import asyncpg
+
+from config import DB_CONFIG, DB_SHARD_DSNS
+from utils.migrations import apply_migrations, get_latest_version
+
+
+async def migrate_shard(shard: int, connect_kwargs: dict):
+    """Применение миграций к одному шарду"""
+    print(f"🔗 Подключение к шарду {shard}")
+    conn = await asyncpg.connect(**connect_kwargs)
+
+    try:
+        applied = await apply_migrations(conn)
+
+        if applied:
+            for version in applied:
+                print(f"✅ Применена миграция {version}")
+        else:
+            print("ℹ️ Новых миграций нет.")
+
+    finally:
+        await conn.close()
+        print("🔒 Соединение с БД закрыто")
+
+
+async def run_migrations():
+    """Применение миграций схемы из каталога migrations/ ко всем шардам"""
+    try:
+        print(
+            f"🔗 Основная БД {DB_CONFIG['database']} "
+            f"на {DB_CONFIG['host']}:{DB_CONFIG['port']}"
+        )
+        shards = [DB_CONFIG] + [{'dsn': dsn} for dsn in DB_SHARD_DSNS]
+
+        for shard, connect_kwargs in enumerate(shards):
+            await migrate_shard(shard, connect_kwargs)
+
+        print(f"📌 Версия схемы: {get_latest_version()}")
+        return True
+
+    except asyncpg.PostgresError as e:
+        print(f"❌ Ошибка PostgreSQL: {e}")
+        return False
+    except Exception as e:
+        print(f"❌ Неожиданная ошибка: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    success = asyncio.run(run_migrations())
+    exit(0 if success else 1)
@@ -0,0 +1,33 @@
+-- Миграция индексов под реальные запросы списка задач
+-- Выполните этот скрипт для обновления существующей базы данных
+
+-- is_hidden больше не допускает NULL: запросы используют условие
+-- is_hidden = FALSE, которое должно совпадать с предикатом частичных индексов
+UPDATE tasks SET is_hidden = FALSE WHERE is_hidden IS NULL;
+ALTER TABLE tasks ALTER COLUMN is_hidden SET DEFAULT FALSE;
+ALTER TABLE tasks ALTER COLUMN is_hidden SET NOT NULL;
+
+-- Удаляем одноколоночные индексы: булевы индексы имеют низкую
+-- селективность, а индексы по датам и часовому поясу не используются
+-- ни одним запросом, но замедляют каждую запись
+DROP INDEX IF EXISTS idx_tasks_status;
+DROP INDEX IF EXISTS idx_tasks_is_hidden;
+DROP INDEX IF EXISTS idx_tasks_created_at;
+DROP INDEX IF EXISTS idx_tasks_completed_at;
+DROP INDEX IF EXISTS idx_users_timezone;
+
+-- Список активных задач: WHERE user_id = $1 AND status = FALSE
+-- AND is_hidden = FALSE ORDER BY created_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_tasks_user_active
+ON tasks(user_id, created_at DESC, id DESC)
+WHERE status = FALSE AND is_hidden = FALSE;
+
+-- Список с выполненными задачами и счетчики:
+-- WHERE user_id = $1 AND is_hidden = FALSE
+-- ORDER BY status ASC, created_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_tasks_user_visible
+ON tasks(user_id, status, created_at DESC, id DESC)
+WHERE is_hidden = FALSE;
+
+-- Обновляем статистику для планировщика
+ANALYZE tasks;
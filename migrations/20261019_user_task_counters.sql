@@ -0,0 +1,94 @@
+-- Счетчики задач пользователя вместо COUNT(*) по всей истории
+-- Выполните этот скрипт для обновления существующей базы данных
+
+CREATE TABLE IF NOT EXISTS user_task_counters (
+    user_id BIGINT PRIMARY KEY,
+    active_count INTEGER NOT NULL DEFAULT 0,
+    completed_count INTEGER NOT NULL DEFAULT 0,
+    hidden_count INTEGER NOT NULL DEFAULT 0
+);
+
+COMMENT ON TABLE user_task_counters IS 'Количество задач пользователя, поддерживается триггером trg_tasks_counters';
+COMMENT ON COLUMN user_task_counters.active_count IS 'Активные видимые задачи';
+COMMENT ON COLUMN user_task_counters.completed_count IS 'Выполненные видимые задачи';
+COMMENT ON COLUMN user_task_counters.hidden_count IS 'Скрытые задачи';
+
+-- Применяет изменение счетчиков при вставке, обновлении и удалении задачи.
+-- Задача попадает ровно в один из счетчиков: hidden, completed или active
+CREATE OR REPLACE FUNCTION tasks_counters_trigger() RETURNS TRIGGER AS $$
+DECLARE
+    old_bucket TEXT;
+    new_bucket TEXT;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        old_bucket := CASE
+            WHEN OLD.is_hidden THEN 'hidden'
+            WHEN OLD.status THEN 'completed'
+            ELSE 'active'
+        END;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        new_bucket := CASE
+            WHEN NEW.is_hidden THEN 'hidden'
+            WHEN NEW.status THEN 'completed'
+            ELSE 'active'
+        END;
+    END IF;
+
+    IF TG_OP = 'UPDATE'
+       AND OLD.user_id = NEW.user_id
+       AND old_bucket = new_bucket THEN
+        RETURN NULL;
+    END IF;
+
+    IF old_bucket IS NOT NULL THEN
+        UPDATE user_task_counters
+        SET active_count = active_count
+                - (old_bucket = 'active')::INTEGER,
+            completed_count = completed_count
+                - (old_bucket = 'completed')::INTEGER,
+            hidden_count = hidden_count
+                - (old_bucket = 'hidden')::INTEGER
+        WHERE user_id = OLD.user_id;
+    END IF;
+
+    IF new_bucket IS NOT NULL THEN
+        INSERT INTO user_task_counters AS c
+            (user_id, active_count, completed_count, hidden_count)
+        VALUES (
+            NEW.user_id,
+            (new_bucket = 'active')::INTEGER,
+            (new_bucket = 'completed')::INTEGER,
+            (new_bucket = 'hidden')::INTEGER
+        )
+        ON CONFLICT (user_id) DO UPDATE SET
+            active_count = c.active_count + EXCLUDED.active_count,
+            completed_count = c.completed_count + EXCLUDED.completed_count,
+            hidden_count = c.hidden_count + EXCLUDED.hidden_count;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_tasks_counters ON tasks;
+CREATE TRIGGER trg_tasks_counters
+AFTER INSERT OR DELETE OR UPDATE OF user_id, status, is_hidden ON tasks
+FOR EACH ROW EXECUTE FUNCTION tasks_counters_trigger();
+
+-- Начальное заполнение счетчиков. Выполняется в той же транзакции,
+-- что и создание триггера, поэтому параллельные записи не теряются
+INSERT INTO user_task_counters
+    (user_id, active_count, completed_count, hidden_count)
+SELECT
+    user_id,
+    COUNT(*) FILTER (WHERE NOT is_hidden AND status = FALSE),
+    COUNT(*) FILTER (WHERE NOT is_hidden AND status = TRUE),
+    COUNT(*) FILTER (WHERE is_hidden)
+FROM tasks
+GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET
+    active_count = EXCLUDED.active_count,
+    completed_count = EXCLUDED.completed_count,
+    hidden_count = EXCLUDED.hidden_count;
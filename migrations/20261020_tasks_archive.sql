@@ -0,0 +1,30 @@
+-- Архив холодных задач: скрытые и давно выполненные задачи
+-- переносятся фоновой задачей из tasks в tasks_archive
+-- Выполните этот скрипт для обновления существующей базы данных
+
+CREATE TABLE IF NOT EXISTS tasks_archive (
+    id INTEGER PRIMARY KEY,
+    user_id BIGINT NOT NULL,
+    task_text TEXT NOT NULL,
+    status BOOLEAN NOT NULL,
+    is_hidden BOOLEAN NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE,
+    completed_at TIMESTAMP WITH TIME ZONE NULL,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE tasks_archive IS 'Задачи, перенесенные из tasks фоновой архивацией';
+
+-- Просмотр архива: WHERE user_id = $1 ORDER BY completed_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_tasks_archive_user
+ON tasks_archive(user_id, completed_at DESC NULLS LAST, id DESC);
+
+-- Поиск кандидатов на архивацию. Индексы частичные и маленькие:
+-- архивируемые строки регулярно удаляются из tasks
+CREATE INDEX IF NOT EXISTS idx_tasks_hidden
+ON tasks(id)
+WHERE is_hidden = TRUE;
+
+CREATE INDEX IF NOT EXISTS idx_tasks_completed_at_visible
+ON tasks(completed_at)
+WHERE status = TRUE AND is_hidden = FALSE;
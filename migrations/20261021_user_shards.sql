@@ -0,0 +1,13 @@
+-- Карта шардов: пользователи, чьи данные лежат не на шарде по хэшу
+-- (перенесенные reshard.py или закрепленные при включении шардирования)
+-- Используется только на шарде 0, на остальных шардах остается пустой
+
+CREATE TABLE IF NOT EXISTS user_shards (
+    user_id BIGINT PRIMARY KEY,
+    shard INTEGER NOT NULL,
+    locked BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON COLUMN user_shards.shard IS 'Номер шарда с данными пользователя';
+COMMENT ON COLUMN user_shards.locked IS 'TRUE - данные переносятся, запись запрещена';
@@ -0,0 +1,29 @@
+-- migrate: no-transaction
+-- Поиск по тексту задач: полнотекстовый (tsvector) и нечеткий (pg_trgm)
+--
+-- Индексы строятся с CONCURRENTLY, без блокировки записи в tasks, поэтому
+-- миграция выполняется вне транзакции, по одной команде. Вместо
+-- хранимого вычисляемого столбца используется индекс по выражению:
+-- ADD COLUMN ... GENERATED STORED переписал бы всю таблицу под
+-- эксклюзивной блокировкой. Если построение индекса прервалось,
+-- недостроенный (INVALID) индекс нужно удалить командой
+-- DROP INDEX CONCURRENTLY и повторить python migrate.py
+--
+-- CREATE INDEX CONCURRENTLY невозможен на секционированной таблице,
+-- поэтому миграция применяется до partition_tasks.py (скрипт это
+-- проверяет); секционированная tasks получает эти индексы
+-- из partition_tasks.TASKS_INDEXES
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+-- btree_gin позволяет включить user_id в GIN-индекс:
+-- поиск всегда идет в пределах задач одного пользователя
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
+-- Полнотекстовый поиск: to_tsvector('russian', task_text) @@ tsquery
+-- (выражение в запросе должно совпадать с выражением индекса)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tasks_user_search
+ON tasks USING GIN (user_id, to_tsvector('russian', task_text));
+
+-- Нечеткий поиск и поиск по подстроке: <%, ILIKE
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tasks_user_text_trgm
+ON tasks USING GIN (user_id, task_text gin_trgm_ops);
@@ -0,0 +1,27 @@
+-- Хранилище FSM-состояний (FSM_STORAGE=postgres): состояние и данные
+-- диалога переживают перезапуск бота и общие для всех его процессов
+-- Используется только на шарде 0
+--
+-- Таблица UNLOGGED: запись не идет в WAL, поэтому быстрее, но после
+-- аварийной остановки PostgreSQL таблица очищается, а на реплики
+-- не передается. Для состояний диалогов это допустимо
+
+CREATE UNLOGGED TABLE IF NOT EXISTS fsm_states (
+    bot_id BIGINT NOT NULL,
+    chat_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    -- 0 — сообщение не из темы форума
+    thread_id BIGINT NOT NULL DEFAULT 0,
+    destiny VARCHAR(64) NOT NULL DEFAULT 'default',
+    state VARCHAR(255),
+    data JSONB NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (bot_id, chat_id, user_id, thread_id, destiny)
+);
+
+COMMENT ON COLUMN fsm_states.state IS 'Текущее состояние (NULL - без состояния)';
+COMMENT ON COLUMN fsm_states.updated_at IS 'Время последнего изменения, по нему удаляются устаревшие состояния';
+
+-- Удаление устаревших состояний (FSM_STATE_TTL)
+CREATE INDEX IF NOT EXISTS idx_fsm_states_updated_at
+ON fsm_states (updated_at);
@@ -0,0 +1,276 @@
+"""
+Перевод таблицы tasks на hash-секционирование по user_id без остановки бота
+
+Этапы (скрипт можно перезапускать, каждый этап идемпотентен):
+    1. Создание секционированной таблицы tasks_partitioned и триггера,
+       зеркалирующего изменения tasks в новую таблицу
+    2. Копирование существующих строк пачками по id
+    3. Подмена таблиц в короткой транзакции: tasks переименовывается
+       в tasks_unpartitioned (остается для отката), новая таблица
+       становится tasks
+
+Перед запуском должны быть применены все миграции (python migrate.py):
+индексы tasks копируются в новую таблицу из TASKS_INDEXES, а миграции
+с CREATE INDEX CONCURRENTLY на секционированной tasks не выполнятся.
+
+Использование:
+    python partition_tasks.py [--partitions N] [--batch-size N]
+"""
+import argparse
+import asyncio
+
+import asyncpg
+
+from config import DB_CONFIG, TASKS_PARTITIONS
+from utils.migrations import get_pending_migrations
+
+# Индексы tasks: имя -> определение (без имени таблицы)
+TASKS_INDEXES = {
+    'idx_tasks_user_id': "(user_id)",
+    'idx_tasks_user_active': (
+        "(user_id, created_at DESC, id DESC) "
+        "WHERE status = FALSE AND is_hidden = FALSE"
+    ),
+    'idx_tasks_user_visible': (
+        "(user_id, status, created_at DESC, id DESC) "
+        "WHERE is_hidden = FALSE"
+    ),
+    'idx_tasks_hidden': "(id) WHERE is_hidden = TRUE",
+    'idx_tasks_completed_at_visible': (
+        "(completed_at) WHERE status = TRUE AND is_hidden = FALSE"
+    ),
+    'idx_tasks_user_search': (
+        "USING GIN (user_id, to_tsvector('russian', task_text))"
+    ),
+    'idx_tasks_user_text_trgm': "USING GIN (user_id, task_text gin_trgm_ops)"
+}
+
+TASKS_COLUMNS = (
+    "id, user_id, task_text, status, is_hidden, created_at, completed_at"
+)
+
+# Зеркалирование изменений tasks в tasks_partitioned на время копирования.
+# UPDATE выполняется как upsert: строка могла еще не быть скопирована
+MIRROR_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION tasks_mirror_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM tasks_partitioned
+        WHERE id = OLD.id AND user_id = OLD.user_id;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'UPDATE' AND OLD.user_id <> NEW.user_id THEN
+        DELETE FROM tasks_partitioned
+        WHERE id = OLD.id AND user_id = OLD.user_id;
+    END IF;
+
+    INSERT INTO tasks_partitioned ({TASKS_COLUMNS})
+    VALUES (
+        NEW.id, NEW.user_id, NEW.task_text, NEW.status, NEW.is_hidden,
+        NEW.created_at, NEW.completed_at
+    )
+    ON CONFLICT (id, user_id) DO UPDATE SET
+        task_text = EXCLUDED.task_text,
+        status = EXCLUDED.status,
+        is_hidden = EXCLUDED.is_hidden,
+        created_at = EXCLUDED.created_at,
+        completed_at = EXCLUDED.completed_at;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# Строки читаются с FOR SHARE: параллельное удаление дождется конца
+# пачки (и будет отзеркалировано), а уже удаленные строки не попадут
+# в новую таблицу. Уже отзеркалированные строки не перезаписываются
+COPY_BATCH = f"""
+WITH batch AS (
+    SELECT {TASKS_COLUMNS}
+    FROM tasks
+    WHERE id > $1
+    ORDER BY id
+    LIMIT $2
+    FOR SHARE
+),
+copied AS (
+    INSERT INTO tasks_partitioned ({TASKS_COLUMNS})
+    SELECT {TASKS_COLUMNS} FROM batch
+    ON CONFLICT (id, user_id) DO NOTHING
+)
+SELECT MAX(id) FROM batch
+"""
+
+
+async def table_exists(conn: asyncpg.Connection, name: str) -> bool:
+    """Проверка существования таблицы"""
+    return await conn.fetchval(
+        "SELECT to_regclass($1) IS NOT NULL", f"public.{name}"
+    )
+
+
+async def prepare(conn: asyncpg.Connection, partitions: int):
+    """Этап 1: секционированная таблица, индексы и триггер зеркалирования"""
+    async with conn.transaction():
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks_partitioned (
+                id INTEGER NOT NULL DEFAULT nextval('tasks_id_seq'),
+                user_id BIGINT NOT NULL,
+                task_text TEXT NOT NULL,
+                status BOOLEAN DEFAULT FALSE,
+                is_hidden BOOLEAN NOT NULL DEFAULT FALSE,
+                created_at TIMESTAMP WITH TIME ZONE
+                    DEFAULT CURRENT_TIMESTAMP,
+                completed_at TIMESTAMP WITH TIME ZONE NULL,
+                PRIMARY KEY (id, user_id)
+            ) PARTITION BY HASH (user_id)
+        """)
+
+        for remainder in range(partitions):
+            await conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS tasks_p{remainder}
+                PARTITION OF tasks_partitioned
+                FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})
+            """)
+
+        for name, definition in TASKS_INDEXES.items():
+            await conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {name}_p "
+                f"ON tasks_partitioned {definition}"
+            )
+
+        await conn.execute(MIRROR_FUNCTION)
+        await conn.execute("DROP TRIGGER IF EXISTS trg_tasks_mirror ON tasks")
+        await conn.execute("""
+            CREATE TRIGGER trg_tasks_mirror
+            AFTER INSERT OR UPDATE OR DELETE ON tasks
+            FOR EACH ROW EXECUTE FUNCTION tasks_mirror_trigger()
+        """)
+
+    print(f"✅ Создана таблица tasks_partitioned ({partitions} секций)")
+
+
+async def copy_rows(conn: asyncpg.Connection, batch_size: int):
+    """Этап 2: копирование существующих строк пачками"""
+    # Прогресс хранится в комментарии к таблице, чтобы продолжить
+    # с места остановки при перезапуске
+    marker = await conn.fetchval(
+        "SELECT obj_description('tasks_partitioned'::regclass, 'pg_class')"
+    )
+    last_id = 0
+    if marker and marker.startswith("copied:"):
+        last_id = int(marker.split(":")[1])
+
+    batches = 0
+    while True:
+        async with conn.transaction():
+            max_id = await conn.fetchval(COPY_BATCH, last_id, batch_size)
+            if max_id is None:
+                break
+            await conn.execute(
+                f"COMMENT ON TABLE tasks_partitioned IS 'copied:{max_id}'"
+            )
+
+        last_id = max_id
+        batches += 1
+        if batches % 100 == 0:
+            print(f"📦 Скопировано до id {last_id}")
+
+    print(f"✅ Копирование завершено (последний id {last_id})")
+
+
+async def swap(conn: asyncpg.Connection):
+    """Этап 3: подмена таблиц в одной короткой транзакции"""
+    async with conn.transaction():
+        await conn.execute("LOCK TABLE tasks IN ACCESS EXCLUSIVE MODE")
+
+        await conn.execute("DROP TRIGGER IF EXISTS trg_tasks_mirror ON tasks")
+        await conn.execute(
+            "DROP TRIGGER IF EXISTS trg_tasks_counters ON tasks"
+        )
+        await conn.execute("ALTER TABLE tasks RENAME TO tasks_unpartitioned")
+
+        for name in TASKS_INDEXES:
+            await conn.execute(
+                f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_unpartitioned"
+            )
+            await conn.execute(f"ALTER INDEX {name}_p RENAME TO {name}")
+
+        await conn.execute("ALTER TABLE tasks_partitioned RENAME TO tasks")
+        await conn.execute("COMMENT ON TABLE tasks IS NULL")
+        await conn.execute("ALTER SEQUENCE tasks_id_seq OWNED BY tasks.id")
+        await conn.execute("""
+            CREATE TRIGGER trg_tasks_counters
+            AFTER INSERT OR DELETE OR UPDATE OF user_id, status, is_hidden
+            ON tasks
+            FOR EACH ROW EXECUTE FUNCTION tasks_counters_trigger()
+        """)
+
+    print(
+        "✅ Таблица tasks секционирована. "
+        "Старые данные сохранены в tasks_unpartitioned"
+    )
+
+
+async def run_partitioning(partitions: int, batch_size: int):
+    """Перевод tasks на секционированную схему"""
+    try:
+        conn = await asyncpg.connect(**DB_CONFIG)
+
+        try:
+            is_partitioned = await conn.fetchval("""
+                SELECT EXISTS (
+                    SELECT FROM pg_partitioned_table
+                    WHERE partrelid = 'tasks'::regclass
+                )
+            """)
+            if is_partitioned:
+                print("ℹ️ Таблица tasks уже секционирована.")
+                return True
+
+            pending = await get_pending_migrations(conn)
+            if pending:
+                print(
+                    "❌ Не применены миграции: "
+                    f"{', '.join(version for version, _ in pending)}. "
+                    "Сначала выполни python migrate.py"
+                )
+                return False
+
+            if await table_exists(conn, "tasks_unpartitioned"):
+                print("❌ Таблица tasks_unpartitioned уже существует")
+                return False
+
+            await prepare(conn, partitions)
+            await copy_rows(conn, batch_size)
+            await swap(conn)
+            return True
+
+        finally:
+            await conn.close()
+            print("🔒 Соединение с БД закрыто")
+
+    except asyncpg.PostgresError as e:
+        print(f"❌ Ошибка PostgreSQL: {e}")
+        return False
+    except Exception as e:
+        print(f"❌ Неожиданная ошибка: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Hash-секционирование таблицы tasks по user_id"
+    )
+    parser.add_argument(
+        "--partitions", type=int, default=TASKS_PARTITIONS,
+        help="количество секций (по умолчанию TASKS_PARTITIONS)"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=5000,
+        help="размер пачки при копировании"
+    )
+    args = parser.parse_args()
+
+    success = asyncio.run(run_partitioning(args.partitions, args.batch_size))
+    exit(0 if success else 1)
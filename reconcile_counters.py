@@ -0,0 +1,29 @@
+import asyncio
+
+from database import db
+
+
+async def run_reconcile():
+    """Пересчет счетчиков задач пользователей (user_task_counters)"""
+    try:
+        await db.create_pool()
+
+        try:
+            fixed = await db.reconcile_task_counters()
+            if fixed:
+                print(f"✅ Счетчики исправлены для {fixed} пользователей")
+            else:
+                print("ℹ️ Расхождений в счетчиках не найдено.")
+            return True
+
+        finally:
+            await db.close_pool()
+
+    except Exception as e:
+        print(f"❌ Ошибка пересчета счетчиков: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    success = asyncio.run(run_reconcile())
+    exit(0 if success else 1)
@@ -0,0 +1,205 @@
+from typing import (
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Protocol,
+    runtime_checkable
+)
+
+from utils.pagination import Cursor, SearchCursor
+
+# Максимальная длина текста задачи
+MAX_TASK_LENGTH = 1000
+
+
+def validate_task_text(task_text: str) -> str:
+    """
+    Проверка текста задачи
+
+    Returns:
+        Текст без пробелов по краям
+
+    Raises:
+        ValueError: если текст пустой или длиннее MAX_TASK_LENGTH
+    """
+    if not task_text or not task_text.strip():
+        raise ValueError("Текст задачи не может быть пустым")
+
+    task_text = task_text.strip()
+    if len(task_text) > MAX_TASK_LENGTH:
+        raise ValueError("Текст задачи слишком длинный")
+
+    return task_text
+
+
+def text_match_rank(query: str, task_text: str) -> float:
+    """
+    Упрощенная релевантность для хранилищ без полнотекстового поиска
+
+    Вхождение всего запроса — 1.0 (плюс доля совпавших слов),
+    иначе доля слов запроса, с которых начинается какое-либо
+    слово задачи; 0.0 — не найдено.
+    """
+    query = query.lower().strip()
+    text = task_text.lower()
+    words = query.split()
+    if not words:
+        return 0.0
+
+    text_words = text.split()
+    matched = sum(
+        1 for word in words
+        if any(text_word.startswith(word) for text_word in text_words)
+    )
+    rank = matched / len(words)
+    if query in text:
+        rank += 1.0
+    return rank
+
+
+@runtime_checkable
+class TaskRepository(Protocol):
+    """
+    Хранилище задач и настроек пользователей
+
+    Обработчики работают с глобальным database.db через этот
+    интерфейс. Реализации:
+        database.Database — PostgreSQL (asyncpg), основная
+        repositories.memory.InMemoryTaskRepository — в памяти процесса
+        repositories.sqlite.SqliteTaskRepository — SQLite (aiosqlite)
+
+    Задачи возвращаются словарями с ключами id, task_text, status,
+    created_at, completed_at (и is_hidden в списках); смысл остальных
+    значений описан в docstring методов Database.
+    """
+
+    async def create_pool(self): ...
+
+    async def close_pool(self): ...
+
+    async def add_task(self, user_id: int, task_text: str) -> int: ...
+
+    async def add_tasks(
+            self,
+            user_id: int,
+            task_texts: List[str]
+    ) -> List[int]: ...
+
+    async def import_tasks(
+            self,
+            user_id: int,
+            task_texts: Iterable[str]
+    ) -> Dict[str, int]: ...
+
+    async def get_user_tasks(
+            self,
+            user_id: int,
+            include_completed: bool = False,
+            only_active: bool = True,
+            limit: int = 10,
+            cursor: Optional[Cursor] = None,
+            backward: bool = False
+    ) -> List[Dict]: ...
+
+    async def get_tasks_list_snapshot(
+            self,
+            user_id: int,
+            include_completed: bool = False,
+            limit: int = 10,
+            cursor: Optional[Cursor] = None,
+            backward: bool = False
+    ) -> Dict: ...
+
+    async def get_task_by_id(
+            self,
+            task_id: int,
+            user_id: int
+    ) -> Optional[Dict]: ...
+
+    async def complete_task(
+            self,
+            task_id: int,
+            user_id: int
+    ) -> Optional[Dict]: ...
+
+    async def reactivate_task(
+            self,
+            task_id: int,
+            user_id: int
+    ) -> Optional[Dict]: ...
+
+    async def update_task(
+            self,
+            task_id: int,
+            user_id: int,
+            new_text: str
+    ) -> Optional[Dict]: ...
+
+    async def delete_task(self, task_id: int, user_id: int) -> bool: ...
+
+    async def hide_task(self, task_id: int, user_id: int) -> bool: ...
+
+    async def complete_tasks(
+            self,
+            task_ids: List[int],
+            user_id: int
+    ) -> List[int]: ...
+
+    async def hide_tasks(
+            self,
+            task_ids: List[int],
+            user_id: int
+    ) -> List[int]: ...
+
+    async def delete_tasks(
+            self,
+            task_ids: List[int],
+            user_id: int
+    ) -> List[int]: ...
+
+    async def get_user_tasks_count(
+            self,
+            user_id: int,
+            include_completed: bool = False
+    ) -> int: ...
+
+    async def get_completed_tasks_count(self, user_id: int) -> int: ...
+
+    async def reconcile_task_counters(self) -> int: ...
+
+    async def archive_tasks_batch(
+            self,
+            completed_days: int,
+            batch_size: int
+    ) -> int: ...
+
+    async def get_archived_tasks(
+            self,
+            user_id: int,
+            limit: int = 20
+    ) -> Dict: ...
+
+    async def search_tasks(
+            self,
+            user_id: int,
+            query: str,
+            limit: int = 10,
+            cursor: Optional[SearchCursor] = None,
+            backward: bool = False
+    ) -> Dict: ...
+
+    def iter_user_tasks_for_export(
+            self,
+            user_id: int,
+            batch_size: int = 1000
+    ) -> AsyncIterator[List]: ...
+
+    async def set_user_timezone(self, user_id: int, timezone: str) -> bool: ...
+
+    async def get_user_timezone(self, user_id: int) -> str: ...
+
+    def get_cache_stats(self) -> Dict[str, Dict[str, int]]: ...
+
+    def get_query_stats(self) -> Dict[str, Dict]: ...
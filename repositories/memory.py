@@ -0,0 +1,545 @@
+import bisect
+import logging
+from datetime import datetime, timedelta, timezone
+from itertools import count
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from repositories.base import text_match_rank, validate_task_text
+from utils.metrics import POOL_ACQUIRE_WAIT, QUERY_LATENCY
+from utils.pagination import Cursor, SearchCursor
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Ключ сортировки видимой задачи: (status, -created_at, -id) — порядок
+# страницы списка "status ASC, created_at DESC, id DESC"
+TaskKey = Tuple[bool, int, int]
+
+# Все ключи выполненных задач больше этого, все активные — меньше
+_FIRST_COMPLETED = (True,)
+
+
+def _utcnow() -> datetime:
+    """Текущее время UTC без часового пояса (как TIMESTAMP в tasks)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _micros(value: datetime) -> int:
+    """Микросекунды от начала эпохи (naive datetime считается UTC)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def _task_key(task: Dict) -> TaskKey:
+    """Ключ задачи в отсортированном списке видимых задач"""
+    return task['status'], -_micros(task['created_at']), -task['id']
+
+
+def _cursor_key(cursor: Cursor) -> TaskKey:
+    """Ключ сортировки для курсора страницы"""
+    status, created_at, task_id = cursor
+    return bool(status), -_micros(created_at), -task_id
+
+
+def _public(task: Dict) -> Dict:
+    """Копия задачи в формате строки списка"""
+    return {
+        'id': task['id'],
+        'task_text': task['task_text'],
+        'status': task['status'],
+        'created_at': task['created_at'],
+        'completed_at': task['completed_at'],
+        'is_hidden': task['is_hidden']
+    }
+
+
+class _UserTasks:
+    """
+    Задачи одного пользователя
+
+    tasks — все задачи по id, visible — отсортированные ключи видимых
+    задач. Активные задачи образуют начало visible, поэтому страницы
+    и счетчики вычисляются бинарным поиском.
+    """
+
+    def __init__(self):
+        self.tasks: Dict[int, Dict] = {}
+        self.visible: List[TaskKey] = []
+
+    def add(self, task: Dict):
+        self.tasks[task['id']] = task
+        if not task['is_hidden']:
+            bisect.insort(self.visible, _task_key(task))
+
+    def remove(self, task_id: int) -> Optional[Dict]:
+        task = self.tasks.pop(task_id, None)
+        if task is not None and not task['is_hidden']:
+            self._unindex(task)
+        return task
+
+    def update(self, task: Dict, **changes):
+        """Изменение полей задачи с сохранением порядка visible"""
+        if not task['is_hidden']:
+            self._unindex(task)
+        task.update(changes)
+        if not task['is_hidden']:
+            bisect.insort(self.visible, _task_key(task))
+
+    def _unindex(self, task: Dict):
+        key = _task_key(task)
+        index = bisect.bisect_left(self.visible, key)
+        del self.visible[index]
+
+    def active_count(self) -> int:
+        return bisect.bisect_left(self.visible, _FIRST_COMPLETED)
+
+    def completed_count(self) -> int:
+        return len(self.visible) - self.active_count()
+
+    def task_for(self, key: TaskKey) -> Dict:
+        return self.tasks[-key[2]]
+
+
+class InMemoryTaskRepository:
+    """
+    Хранилище задач в памяти процесса (DB_BACKEND=memory)
+
+    Повторяет поведение Database без PostgreSQL: для нагрузочных
+    прогонов обработчиков и замера их накладных расходов отдельно
+    от стоимости запросов. Данные теряются при перезапуске.
+    """
+
+    def __init__(self):
+        self.users: Dict[int, _UserTasks] = {}
+        self.archive: Dict[int, Dict[int, Dict]] = {}
+        self.timezones: Dict[int, str] = {}
+        self._ids = count(1)
+
+    async def create_pool(self):
+        """Хранилище в памяти не требует подключения"""
+        logger.info("Используется хранилище задач в памяти")
+
+    async def close_pool(self):
+        """Закрытие хранилища (данные не сохраняются)"""
+        logger.info(
+            f"Хранилище в памяти закрыто, задач: "
+            f"{sum(len(user.tasks) for user in self.users.values())}"
+        )
+
+    def _user(self, user_id: int) -> _UserTasks:
+        user = self.users.get(user_id)
+        if user is None:
+            user = self.users[user_id] = _UserTasks()
+        return user
+
+    def _new_task(self, user_id: int, task_text: str) -> int:
+        task_id = next(self._ids)
+        self._user(user_id).add({
+            'id': task_id,
+            'user_id': user_id,
+            'task_text': task_text,
+            'status': False,
+            'is_hidden': False,
+            'created_at': _utcnow(),
+            'completed_at': None
+        })
+        return task_id
+
+    def _with_timezone(self, user_id: int, task: Dict) -> Dict:
+        """Задача в формате ответа complete_task/update_task"""
+        return {
+            'id': task['id'],
+            'task_text': task['task_text'],
+            'status': task['status'],
+            'created_at': task['created_at'],
+            'completed_at': task['completed_at'],
+            'timezone': self.timezones.get(user_id, 'UTC')
+        }
+
+    async def add_task(self, user_id: int, task_text: str) -> int:
+        """Добавление новой задачи"""
+        task_id = self._new_task(user_id, validate_task_text(task_text))
+        logger.info(
+            f"Добавлена задача {task_id} для пользователя {user_id}"
+        )
+        return task_id
+
+    async def add_tasks(
+            self,
+            user_id: int,
+            task_texts: List[str]
+    ) -> List[int]:
+        """Добавление нескольких задач (все или ничего)"""
+        texts = [validate_task_text(task_text) for task_text in task_texts]
+        return [self._new_task(user_id, text) for text in texts]
+
+    async def import_tasks(
+            self,
+            user_id: int,
+            task_texts: Iterable[str]
+    ) -> Dict[str, int]:
+        """Массовое добавление задач с пропуском некорректных"""
+        accepted = rejected = 0
+        for task_text in task_texts:
+            try:
+                self._new_task(user_id, validate_task_text(task_text))
+                accepted += 1
+            except ValueError:
+                rejected += 1
+        return {'accepted': accepted, 'rejected': rejected}
+
+    def _select(
+            self,
+            user_id: int,
+            include_completed: bool,
+            limit: int,
+            cursor: Optional[Cursor],
+            backward: bool
+    ) -> List[Dict]:
+        """Страница задач в порядке отображения (как tasks_page_clause)"""
+        user = self.users.get(user_id)
+        if user is None:
+            return []
+
+        visible = user.visible
+        start = 0
+        end = len(visible) if include_completed else user.active_count()
+
+        if cursor is not None:
+            key = _cursor_key(cursor)
+            if backward:
+                end = min(end, bisect.bisect_left(visible, key))
+            else:
+                start = bisect.bisect_right(visible, key)
+
+        if backward:
+            keys = visible[max(start, end - limit):end]
+        else:
+            keys = visible[start:min(end, start + limit)]
+
+        return [_public(user.task_for(key)) for key in keys]
+
+    async def get_user_tasks(
+            self,
+            user_id: int,
+            include_completed: bool = False,
+            only_active: bool = True,
+            limit: int = 10,
+            cursor: Optional[Cursor] = None,
+            backward: bool = False
+    ) -> List[Dict]:
+        """Получение задач пользователя с keyset-пагинацией"""
+        return self._select(
+            user_id, include_completed, limit, cursor, backward
+        )
+
+    async def get_tasks_list_snapshot(
+            self,
+            user_id: int,
+            include_completed: bool = False,
+            limit: int = 10,
+            cursor: Optional[Cursor] = None,
+            backward: bool = False
+    ) -> Dict:
+        """Страница, счетчики и часовой пояс для экрана списка"""
+        tasks = self._select(
+            user_id, include_completed, limit + 1, cursor, backward
+        )
+
+        has_more = len(tasks) > limit
+        if backward:
+            tasks = tasks[-limit:] if has_more else tasks
+            has_prev, has_next = has_more, True
+        else:
+            tasks = tasks[:limit]
+            has_prev, has_next = cursor is not None, has_more
+
+        user = self._user(user_id)
+        return {
+            'tasks': tasks,
+            'has_prev': has_prev,
+            'has_next': has_next,
+            'active_count': user.active_count(),
+            'completed_count': user.completed_count(),
+            'timezone': self.timezones.get(user_id, 'UTC')
+        }
+
+    async def get_task_by_id(
+            self,
+            task_id: int,
+            user_id: int
+    ) -> Optional[Dict]:
+        """Получение задачи по ID"""
+        task = self._user(user_id).tasks.get(task_id)
+        if task is None:
+            return None
+        return {
+            key: task[key]
+            for key in (
+                'id', 'task_text', 'status', 'created_at', 'completed_at'
+            )
+        }
+
+    def _change(
+            self,
+            task_id: int,
+            user_id: int,
+            condition,
+            **changes
+    ) -> Optional[Dict]:
+        """Изменение задачи, если она есть и удовлетворяет condition"""
+        user = self._user(user_id)
+        task = user.tasks.get(task_id)
+        if task is None or not condition(task):
+            return None
+        user.update(task, **changes)
+        return task
+
+    async def complete_task(
+            self,
+            task_id: int,
+            user_id: int
+    ) -> Optional[Dict]:
+        """Отметить задачу как выполненную"""
+        task = self._change(
+            task_id, user_id, lambda task: not task['status'],
+            status=True, completed_at=_utcnow()
+        )
+        return self._with_timezone(user_id, task) if task else None
+
+    async def reactivate_task(
+            self,
+            task_id: int,
+            user_id: int
+    ) -> Optional[Dict]:
+        """Реактивация задачи (отмена выполнения)"""
+        task = self._change(
+            task_id, user_id, lambda task: task['status'],
+            status=False, completed_at=None
+        )
+        return self._with_timezone(user_id, task) if task else None
+
+    async def update_task(
+            self,
+            task_id: int,
+            user_id: int,
+            new_text: str
+    ) -> Optional[Dict]:
+        """Обновление текста активной задачи"""
+        new_text = validate_task_text(new_text)
+        task = self._change(
+            task_id, user_id, lambda task: not task['status'],
+            task_text=new_text
+        )
+        return self._with_timezone(user_id, task) if task else None
+
+    async def delete_task(self, task_id: int, user_id: int) -> bool:
+        """Удаление задачи"""
+        return self._user(user_id).remove(task_id) is not None
+
+    async def hide_task(self, task_id: int, user_id: int) -> bool:
+        """Скрытие выполненной задачи"""
+        task = self._change(
+            task_id, user_id, lambda task: task['status'],
+            is_hidden=True
+        )
+        return task is not None
+
+    async def complete_tasks(
+            self,
+            task_ids: List[int],
+            user_id: int
+    ) -> List[int]:
+        """Отметить несколько задач выполненными"""
+        completed_at = _utcnow()
+        return [
+            task_id for task_id in dict.fromkeys(task_ids)
+            if self._change(
+                task_id, user_id, lambda task: not task['status'],
+                status=True, completed_at=completed_at
+            )
+        ]
+
+    async def hide_tasks(
+            self,
+            task_ids: List[int],
+            user_id: int
+    ) -> List[int]:
+        """Скрытие нескольких выполненных задач"""
+        return [
+            task_id for task_id in dict.fromkeys(task_ids)
+            if self._change(
+                task_id, user_id,
+                lambda task: task['status'] and not task['is_hidden'],
+                is_hidden=True
+            )
+        ]
+
+    async def delete_tasks(
+            self,
+            task_ids: List[int],
+            user_id: int
+    ) -> List[int]:
+        """Удаление нескольких задач"""
+        user = self._user(user_id)
+        return [
+            task_id for task_id in dict.fromkeys(task_ids)
+            if user.remove(task_id) is not None
+        ]
+
+    async def get_user_tasks_count(
+            self,
+            user_id: int,
+            include_completed: bool = False
+    ) -> int:
+        """Получение количества задач пользователя"""
+        user = self._user(user_id)
+        if include_completed:
+            return len(user.tasks)
+        return user.active_count()
+
+    async def get_completed_tasks_count(self, user_id: int) -> int:
+        """Получение количества выполненных (но не скрытых) задач"""
+        return self._user(user_id).completed_count()
+
+    async def reconcile_task_counters(self) -> int:
+        """Счетчики вычисляются по индексу и не расходятся с задачами"""
+        return 0
+
+    async def archive_tasks_batch(
+            self,
+            completed_days: int,
+            batch_size: int
+    ) -> int:
+        """Перенос пачки скрытых и давно выполненных задач в архив"""
+        threshold = _utcnow() - timedelta(days=completed_days)
+        hidden, completed = [], []
+
+        # Скрытые активные задачи остаются в списке, как и в PostgreSQL
+        for user in self.users.values():
+            for task in user.tasks.values():
+                if not task['status']:
+                    continue
+                if task['is_hidden']:
+                    hidden.append(task)
+                elif task['completed_at'] < threshold:
+                    completed.append(task)
+
+        completed.sort(key=lambda task: task['completed_at'])
+        moved = hidden[:batch_size] + completed[:batch_size]
+
+        for task in moved:
+            self.users[task['user_id']].remove(task['id'])
+            self.archive.setdefault(task['user_id'], {})[task['id']] = task
+
+        if moved:
+            logger.info(f"В архив перенесено задач: {len(moved)}")
+        return len(moved)
+
+    async def get_archived_tasks(
+            self,
+            user_id: int,
+            limit: int = 20
+    ) -> Dict:
+        """Последние задачи из архива и их общее количество"""
+        archived = self.archive.get(user_id, {})
+        tasks = sorted(
+            archived.values(),
+            key=lambda task: (
+                task['completed_at'] is not None,
+                task['completed_at'] or _EPOCH,
+                task['id']
+            ),
+            reverse=True
+        )
+        return {
+            'tasks': [_public(task) for task in tasks[:limit]],
+            'total': len(archived)
+        }
+
+    async def search_tasks(
+            self,
+            user_id: int,
+            query: str,
+            limit: int = 10,
+            cursor: Optional[SearchCursor] = None,
+            backward: bool = False
+    ) -> Dict:
+        """
+        Поиск по тексту видимых задач пользователя
+
+        Релевантность упрощенная (repositories.base.text_match_rank):
+        словоформы и опечатки не учитываются.
+        """
+        query = query.strip()
+        if not query:
+            raise ValueError("Поисковый запрос не может быть пустым")
+
+        found = []
+        for task in self._user(user_id).tasks.values():
+            if task['is_hidden']:
+                continue
+            rank = text_match_rank(query, task['task_text'])
+            if rank > 0:
+                found.append({**_public(task), 'rank': rank})
+
+        # found по возрастанию (rank, id), отображение — по убыванию
+        found.sort(key=lambda task: (task['rank'], task['id']))
+        if cursor is not None:
+            key = tuple(cursor)
+            keys = [(task['rank'], task['id']) for task in found]
+            if backward:
+                found = found[bisect.bisect_right(keys, key):]
+            else:
+                found = found[:bisect.bisect_left(keys, key)]
+
+        if backward:
+            tasks = found[:limit]
+            has_prev, has_next = len(found) > limit, True
+        else:
+            tasks = found[max(0, len(found) - limit):]
+            has_prev, has_next = cursor is not None, len(found) > limit
+        tasks.reverse()
+
+        return {'tasks': tasks, 'has_prev': has_prev, 'has_next': has_next}
+
+    async def iter_user_tasks_for_export(
+            self,
+            user_id: int,
+            batch_size: int = 1000
+    ) -> AsyncIterator[List[Dict]]:
+        """Все задачи пользователя, включая архив, пачками"""
+        rows = [
+            {**_public(task), 'archived': archived}
+            for archived, tasks in (
+                (False, self._user(user_id).tasks),
+                (True, self.archive.get(user_id, {}))
+            )
+            for task in tasks.values()
+        ]
+        rows.sort(key=lambda row: (row['created_at'], row['id']))
+
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+    async def set_user_timezone(self, user_id: int, timezone: str) -> bool:
+        """Установка часового пояса пользователя"""
+        self.timezones[user_id] = timezone
+        return True
+
+    async def get_user_timezone(self, user_id: int) -> str:
+        """Получение часового пояса пользователя"""
+        return self.timezones.get(user_id, 'UTC')
+
+    def get_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Кэши не используются"""
+        return {}
+
+    def get_query_stats(self) -> Dict[str, Dict]:
+        """Задержки запросов (пусто: запросов к БД нет)"""
+        return {
+            'queries': QUERY_LATENCY.stats(),
+            'pool_acquire': POOL_ACQUIRE_WAIT.stats()
+        }
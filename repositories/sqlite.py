@@ -0,0 +1,652 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence
+
+import aiosqlite
+
+from repositories.base import text_match_rank, validate_task_text
+from utils.metrics import POOL_ACQUIRE_WAIT, QUERY_LATENCY, observe_query
+from utils.pagination import Cursor, SearchCursor
+from utils.statements import tasks_page_clause, tasks_page_params
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    task_text TEXT NOT NULL,
+    status BOOLEAN NOT NULL DEFAULT FALSE,
+    is_hidden BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TEXT NOT NULL,
+    completed_at TEXT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_tasks_user_list
+    ON tasks (user_id, is_hidden, status, created_at, id);
+
+CREATE TABLE IF NOT EXISTS tasks_archive (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    task_text TEXT NOT NULL,
+    status BOOLEAN NOT NULL,
+    is_hidden BOOLEAN NOT NULL,
+    created_at TEXT NOT NULL,
+    completed_at TEXT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_tasks_archive_user
+    ON tasks_archive (user_id, completed_at, id);
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    timezone TEXT NOT NULL DEFAULT 'UTC',
+    updated_at TEXT NOT NULL
+);
+"""
+
+TASK_COLUMNS = "id, task_text, status, created_at, completed_at, is_hidden"
+
+# Поиск: релевантность считает функция text_rank (text_match_rank),
+# зарегистрированная в соединении; ?2 — запрос, ?3 — LIMIT
+SEARCH_TASKS = f"""
+WITH found AS (
+    SELECT {TASK_COLUMNS}, text_rank(?2, task_text) AS rank
+    FROM tasks
+    WHERE user_id = ?1 AND is_hidden = FALSE
+)
+SELECT {TASK_COLUMNS}, rank
+FROM found
+WHERE rank > 0 {{condition}}
+ORDER BY {{order}}
+LIMIT ?3
+"""
+
+
+def _to_text(value: datetime) -> str:
+    """datetime в строку UTC, сортируемую как время"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(sep=' ', timespec='microseconds')
+
+
+def _now_text() -> str:
+    return _to_text(datetime.now(timezone.utc))
+
+
+def _from_row(row: aiosqlite.Row) -> Dict:
+    """Строка SQLite в словарь с bool и datetime, как у asyncpg"""
+    task = dict(row)
+    for key in ('status', 'is_hidden', 'archived'):
+        if key in task:
+            task[key] = bool(task[key])
+    for key in ('created_at', 'completed_at'):
+        if task.get(key) is not None:
+            task[key] = datetime.fromisoformat(task[key])
+    return task
+
+
+def _sqlite_params(params: Sequence) -> list:
+    """Параметры курсора с датами в формате колонок SQLite"""
+    return [
+        _to_text(value) if isinstance(value, datetime) else value
+        for value in params
+    ]
+
+
+class SqliteTaskRepository:
+    """
+    Хранилище задач в файле SQLite (DB_BACKEND=sqlite)
+
+    Одно соединение aiosqlite; схема создается при подключении.
+    Страницы списка строятся тем же tasks_page_clause, что и в
+    PostgreSQL, поэтому порядок и курсоры совпадают. Поиск — по
+    подстроке и началу слов, без словоформ.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.connection: Optional[aiosqlite.Connection] = None
+        # Изменения из нескольких запросов не должны перемежаться
+        # с чужими COMMIT в общем соединении
+        self._write_lock = asyncio.Lock()
+
+    async def create_pool(self):
+        """Подключение к файлу БД и создание схемы"""
+        self.connection = await aiosqlite.connect(self.path)
+        self.connection.row_factory = aiosqlite.Row
+        await self.connection.execute("PRAGMA journal_mode = WAL")
+        await self.connection.create_function(
+            'text_rank', 2, text_match_rank, deterministic=True
+        )
+        await self.connection.executescript(SCHEMA)
+        await self.connection.commit()
+        logger.info(f"Подключено хранилище SQLite: {self.path}")
+
+    async def close_pool(self):
+        """Закрытие соединения"""
+        if self.connection:
+            await self.connection.close()
+            logger.info("Соединение с SQLite закрыто")
+
+    async def _fetchall(
+            self,
+            label: str,
+            query: str,
+            args: Sequence = ()
+    ) -> List[Dict]:
+        with observe_query(label, query, args):
+            rows = await self.connection.execute_fetchall(query, args)
+        return [_from_row(row) for row in rows]
+
+    async def _fetchone(
+            self,
+            label: str,
+            query: str,
+            args: Sequence = ()
+    ) -> Optional[Dict]:
+        rows = await self._fetchall(label, query, args)
+        return rows[0] if rows else None
+
+    async def _write(
+            self,
+            label: str,
+            query: str,
+            args: Sequence = ()
+    ) -> List[Dict]:
+        """Изменяющий запрос (с RETURNING) с фиксацией транзакции"""
+        async with self._write_lock:
+            rows = await self._fetchall(label, query, args)
+            await self.connection.commit()
+        return rows
+
+    async def _insert_tasks(self, user_id: int, texts: List[str]) -> List[int]:
+        query = """
+        INSERT INTO tasks (user_id, task_text, created_at)
+        VALUES (?, ?, ?)
+        RETURNING id
+        """
+        created_at = _now_text()
+        task_ids = []
+        async with self._write_lock:
+            try:
+                for text in texts:
+                    row = await self._fetchone(
+                        'add_task', query, (user_id, text, created_at)
+                    )
+                    task_ids.append(row['id'])
+                await self.connection.commit()
+            except Exception:
+                await self.connection.rollback()
+                raise
+        return task_ids
+
+    async def _with_timezone(
+            self,
+            label: str,
+            update: str,
+            args: Sequence
+    ) -> Optional[Dict]:
+        """UPDATE задачи (?1 — id, ?2 — user_id) и часовой пояс"""
+        rows = await self._write(label, f"""
+        {update}
+        RETURNING id, task_text, status, created_at, completed_at
+        """, args)
+        if not rows:
+            return None
+        task = rows[0]
+        task['timezone'] = await self.get_user_timezone(args[1])
+        return task
+
+    async def add_task(self, user_id: int, task_text: str) -> int:
+        """Добавление новой задачи"""
+        task_text = validate_task_text(task_text)
+        task_id, = await self._insert_tasks(user_id, [task_text])
+        logger.info(
+            f"Добавлена задача {task_id} для пользователя {user_id}"
+        )
+        return task_id
+
+    async def add_tasks(
+            self,
+            user_id: int,
+            task_texts: List[str]
+    ) -> List[int]:
+        """Добавление нескольких задач в одной транзакции"""
+        texts = [validate_task_text(task_text) for task_text in task_texts]
+        if not texts:
+            return []
+        return await self._insert_tasks(user_id, texts)
+
+    async def import_tasks(
+            self,
+            user_id: int,
+            task_texts: Iterable[str]
+    ) -> Dict[str, int]:
+        """Массовое добавление задач одним executemany"""
+        created_at = _now_text()
+        records = []
+        rejected = 0
+        for task_text in task_texts:
+            try:
+                records.append(
+                    (user_id, validate_task_text(task_text), created_at)
+                )
+            except ValueError:
+                rejected += 1
+
+        if records:
+            query = """
+            INSERT INTO tasks (user_id, task_text, created_at)
+            VALUES (?, ?, ?)
+            """
+            async with self._write_lock:
+                with observe_query('import_tasks', query):
+                    await self.connection.executemany(query, records)
+                await self.connection.commit()
+
+        return {'accepted': len(records), 'rejected': rejected}
+
+    async def get_user_tasks(
+            self,
+            user_id: int,
+            include_completed: bool = False,
+            only_active: bool = True,
+            limit: int = 10,
+            cursor: Optional[Cursor] = None,
+            backward: bool = False
+    ) -> List[Dict]:
+        """Получение задач пользователя с keyset-пагинацией"""
+        condition, order = tasks_page_clause(
+            include_completed, cursor is not None, backward, first_param=3
+        )
+        query = f"""
+        SELECT {TASK_COLUMNS}
+        FROM tasks
+        WHERE user_id = ?1 AND {condition.replace('$', '?')}
+        ORDER BY {order}
+        LIMIT ?2
+        """
+        params = _sqlite_params(tasks_page_params(include_completed, cursor))
+
+        tasks = await self._fetchall(
+            'tasks_page', query, (user_id, limit, *params)
+        )
+        # Страница "назад" выбрана в обратном порядке
+        if backward:
+            tasks.reverse()
+        return tasks
+
+    async def _counts(self, user_id: int) -> Dict[str, int]:
+        row = await self._fetchone('count_tasks', """
+        SELECT
+            COUNT(*) AS total_count,
+            COALESCE(SUM(NOT is_hidden AND NOT status), 0) AS active_count,
+            COALESCE(SUM(NOT is_hidden AND status), 0) AS completed_count
+        FROM tasks
+        WHERE user_id = ?
+        """, (user_id,))
+        return row
+
+    async def get_tasks_list_snapshot(
+            self,
+            user_id: int,
+            include_completed: bool = False,
+            limit: int = 10,
+            cursor: Optional[Cursor] = None,
+            backward: bool = False
+    ) -> Dict:
+        """Страница, счетчики и часовой пояс для экрана списка"""
+        tasks = await self.get_user_tasks(
+            user_id, include_completed, limit=limit + 1,
+            cursor=cursor, backward=backward
+        )
+
+        has_more = len(tasks) > limit
+        if backward:
+            tasks = tasks[-limit:] if has_more else tasks
+            has_prev, has_next = has_more, True
+        else:
+            tasks = tasks[:limit]
+            has_prev, has_next = cursor is not None, has_more
+
+        counts = await self._counts(user_id)
+        return {
+            'tasks': tasks,
+            'has_prev': has_prev,
+            'has_next': has_next,
+            'active_count': counts['active_count'],
+            'completed_count': counts['completed_count'],
+            'timezone': await self.get_user_timezone(user_id)
+        }
+
+    async def get_task_by_id(
+            self,
+            task_id: int,
+            user_id: int
+    ) -> Optional[Dict]:
+        """Получение задачи по ID"""
+        return await self._fetchone('get_task_by_id', """
+        SELECT id, task_text, status, created_at, completed_at
+        FROM tasks
+        WHERE id = ? AND user_id = ?
+        """, (task_id, user_id))
+
+    async def complete_task(
+            self,
+            task_id: int,
+            user_id: int
+    ) -> Optional[Dict]:
+        """Отметить задачу как выполненную"""
+        return await self._with_timezone('complete_task', """
+        UPDATE tasks
+        SET status = TRUE, completed_at = ?3
+        WHERE id = ?1 AND user_id = ?2 AND status = FALSE
+        """, (task_id, user_id, _now_text()))
+
+    async def reactivate_task(
+            self,
+            task_id: int,
+            user_id: int
+    ) -> Optional[Dict]:
+        """Реактивация задачи (отмена выполнения)"""
+        return await self._with_timezone('reactivate_task', """
+        UPDATE tasks
+        SET status = FALSE, completed_at = NULL
+        WHERE id = ?1 AND user_id = ?2 AND status = TRUE
+        """, (task_id, user_id))
+
+    async def update_task(
+            self,
+            task_id: int,
+            user_id: int,
+            new_text: str
+    ) -> Optional[Dict]:
+        """Обновление текста активной задачи"""
+        new_text = validate_task_text(new_text)
+        return await self._with_timezone('update_task', """
+        UPDATE tasks
+        SET task_text = ?3
+        WHERE id = ?1 AND user_id = ?2 AND status = FALSE
+        """, (task_id, user_id, new_text))
+
+    async def delete_task(self, task_id: int, user_id: int) -> bool:
+        """Удаление задачи"""
+        return bool(await self.delete_tasks([task_id], user_id))
+
+    async def hide_task(self, task_id: int, user_id: int) -> bool:
+        """Скрытие выполненной задачи"""
+        rows = await self._write('hide_task', """
+        UPDATE tasks
+        SET is_hidden = TRUE
+        WHERE id = ? AND user_id = ? AND status = TRUE
+        RETURNING id
+        """, (task_id, user_id))
+        return bool(rows)
+
+    async def _update_many(
+            self,
+            label: str,
+            query: str,
+            task_ids: List[int],
+            user_id: int,
+            *args
+    ) -> List[int]:
+        """Запрос по списку ID ({ids} — плейсхолдеры) с RETURNING id"""
+        if not task_ids:
+            return []
+        placeholders = ", ".join("?" * len(task_ids))
+        rows = await self._write(
+            label,
+            query.format(ids=placeholders),
+            (*args, user_id, *task_ids)
+        )
+        return [row['id'] for row in rows]
+
+    async def complete_tasks(
+            self,
+            task_ids: List[int],
+            user_id: int
+    ) -> List[int]:
+        """Отметить несколько задач выполненными"""
+        return await self._update_many('complete_tasks', """
+        UPDATE tasks
+        SET status = TRUE, completed_at = ?
+        WHERE user_id = ? AND id IN ({ids}) AND status = FALSE
+        RETURNING id
+        """, task_ids, user_id, _now_text())
+
+    async def hide_tasks(
+            self,
+            task_ids: List[int],
+            user_id: int
+    ) -> List[int]:
+        """Скрытие нескольких выполненных задач"""
+        return await self._update_many('hide_tasks', """
+        UPDATE tasks
+        SET is_hidden = TRUE
+        WHERE user_id = ? AND id IN ({ids})
+          AND status = TRUE AND is_hidden = FALSE
+        RETURNING id
+        """, task_ids, user_id)
+
+    async def delete_tasks(
+            self,
+            task_ids: List[int],
+            user_id: int
+    ) -> List[int]:
+        """Удаление нескольких задач"""
+        return await self._update_many('delete_tasks', """
+        DELETE FROM tasks
+        WHERE user_id = ? AND id IN ({ids})
+        RETURNING id
+        """, task_ids, user_id)
+
+    async def get_user_tasks_count(
+            self,
+            user_id: int,
+            include_completed: bool = False
+    ) -> int:
+        """Получение количества задач пользователя"""
+        counts = await self._counts(user_id)
+        if include_completed:
+            return counts['total_count']
+        return counts['active_count']
+
+    async def get_completed_tasks_count(self, user_id: int) -> int:
+        """Получение количества выполненных (но не скрытых) задач"""
+        return (await self._counts(user_id))['completed_count']
+
+    async def reconcile_task_counters(self) -> int:
+        """Счетчики считаются запросом и не расходятся с задачами"""
+        return 0
+
+    async def archive_tasks_batch(
+            self,
+            completed_days: int,
+            batch_size: int
+    ) -> int:
+        """Перенос пачки скрытых и давно выполненных задач в архив"""
+        threshold = _to_text(
+            datetime.now(timezone.utc) - timedelta(days=completed_days)
+        )
+        candidates = """
+        SELECT id FROM (
+            SELECT id FROM tasks
+            WHERE is_hidden = TRUE AND status = TRUE
+            LIMIT ?2
+        )
+        UNION ALL
+        SELECT id FROM (
+            SELECT id FROM tasks
+            WHERE status = TRUE
+              AND is_hidden = FALSE
+              AND completed_at < ?1
+            ORDER BY completed_at
+            LIMIT ?2
+        )
+        """
+        columns = (
+            "id, user_id, task_text, status, is_hidden, "
+            "created_at, completed_at"
+        )
+        args = (threshold, batch_size)
+
+        async with self._write_lock:
+            try:
+                with observe_query('archive_tasks_batch', candidates, args):
+                    task_ids = [
+                        row['id'] for row in
+                        await self.connection.execute_fetchall(
+                            candidates, args
+                        )
+                    ]
+                    placeholders = ", ".join("?" * len(task_ids))
+                    await self.connection.execute(f"""
+                    INSERT INTO tasks_archive ({columns})
+                    SELECT {columns} FROM tasks
+                    WHERE id IN ({placeholders})
+                    """, task_ids)
+                    rows = await self.connection.execute_fetchall(f"""
+                    DELETE FROM tasks
+                    WHERE id IN ({placeholders})
+                    RETURNING user_id
+                    """, task_ids)
+                await self.connection.commit()
+            except Exception:
+                await self.connection.rollback()
+                raise
+
+        if rows:
+            logger.info(f"В архив перенесено задач: {len(rows)}")
+        return len(rows)
+
+    async def get_archived_tasks(
+            self,
+            user_id: int,
+            limit: int = 20
+    ) -> Dict:
+        """Последние задачи из архива и их общее количество"""
+        rows = await self._fetchall('get_archived_tasks', """
+        SELECT
+            id, task_text, status, is_hidden, created_at, completed_at,
+            COUNT(*) OVER () AS total
+        FROM tasks_archive
+        WHERE user_id = ?
+        ORDER BY completed_at IS NULL, completed_at DESC, id DESC
+        LIMIT ?
+        """, (user_id, limit))
+
+        return {
+            'tasks': [
+                {key: value for key, value in row.items() if key != 'total'}
+                for row in rows
+            ],
+            'total': rows[0]['total'] if rows else 0
+        }
+
+    async def search_tasks(
+            self,
+            user_id: int,
+            query: str,
+            limit: int = 10,
+            cursor: Optional[SearchCursor] = None,
+            backward: bool = False
+    ) -> Dict:
+        """
+        Поиск по тексту видимых задач пользователя
+
+        Релевантность упрощенная (repositories.base.text_match_rank):
+        словоформы и опечатки не учитываются.
+        """
+        query = query.strip()
+        if not query:
+            raise ValueError("Поисковый запрос не может быть пустым")
+
+        condition = ""
+        params = []
+        if cursor is not None:
+            key_op = ">" if backward else "<"
+            condition = f"AND (rank, id) {key_op} (?4, ?5)"
+            params = list(cursor)
+        order = "rank ASC, id ASC" if backward else "rank DESC, id DESC"
+
+        tasks = await self._fetchall(
+            'search_tasks',
+            SEARCH_TASKS.format(condition=condition, order=order),
+            (user_id, query, limit + 1, *params)
+        )
+        has_more = len(tasks) > limit
+        tasks = tasks[:limit]
+
+        # Страница "назад" выбрана в обратном порядке
+        if backward:
+            tasks.reverse()
+            has_prev, has_next = has_more, True
+        else:
+            has_prev, has_next = cursor is not None, has_more
+
+        return {'tasks': tasks, 'has_prev': has_prev, 'has_next': has_next}
+
+    async def iter_user_tasks_for_export(
+            self,
+            user_id: int,
+            batch_size: int = 1000
+    ) -> AsyncIterator[List[Dict]]:
+        """Все задачи пользователя, включая архив, пачками"""
+        query = """
+        SELECT
+            id, task_text, status, is_hidden, FALSE AS archived,
+            created_at, completed_at
+        FROM tasks
+        WHERE user_id = ?1
+        UNION ALL
+        SELECT
+            id, task_text, status, is_hidden, TRUE AS archived,
+            created_at, completed_at
+        FROM tasks_archive
+        WHERE user_id = ?1
+        ORDER BY created_at, id
+        """
+        async with self.connection.execute(query, (user_id,)) as cursor:
+            while batch := await cursor.fetchmany(batch_size):
+                yield [_from_row(row) for row in batch]
+
+    async def set_user_timezone(self, user_id: int, timezone: str) -> bool:
+        """Установка часового пояса пользователя"""
+        try:
+            await self._write('set_user_timezone', """
+            INSERT INTO users (user_id, timezone, updated_at)
+            VALUES (?1, ?2, ?3)
+            ON CONFLICT (user_id) DO UPDATE SET
+                timezone = excluded.timezone,
+                updated_at = excluded.updated_at
+            """, (user_id, timezone, _now_text()))
+            return True
+        except Exception as e:
+            logger.error(
+                "Ошибка установки часового пояса "
+                f"для пользователя {user_id}: {e}"
+            )
+            return False
+
+    async def get_user_timezone(self, user_id: int) -> str:
+        """Получение часового пояса пользователя"""
+        row = await self._fetchone(
+            'get_user_timezone',
+            "SELECT timezone FROM users WHERE user_id = ?",
+            (user_id,)
+        )
+        return row['timezone'] if row else 'UTC'
+
+    def get_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Кэши не используются"""
+        return {}
+
+    def get_query_stats(self) -> Dict[str, Dict]:
+        """Задержки запросов (мс) по имени запроса"""
+        return {
+            'queries': QUERY_LATENCY.stats(),
+            'pool_acquire': POOL_ACQUIRE_WAIT.stats()
+        }
@@ -0,0 +1,302 @@
+"""
+Обслуживание шардирования по user_id
+
+Команды:
+    init-sequences      настроить tasks_id_seq на всех шардах так,
+                        чтобы id задач не пересекались между шардами
+    pin-existing        закрепить существующих пользователей за шардами,
+                        на которых лежат их данные (перед включением
+                        DB_SHARD_DSNS на базе с данными и перед каждым
+                        добавлением шардов)
+    move USER_ID SHARD  перенести данные пользователя на другой шард
+
+Шард по умолчанию — crc32(user_id) % число шардов, поэтому при изменении
+числа шардов он меняется почти у всех пользователей, не записанных
+в карте шардов. Добавление шардов к работающей схеме:
+    1. остановить бота
+    2. дописать новые DSN в конец DB_SHARD_DSNS (порядок старых
+       не менять), применить миграции и init-sequences
+    3. python reshard.py pin-existing --previous-shards N, где N —
+       число шардов до изменения (вместе с основной БД)
+    4. запустить бота
+Уменьшение числа шардов не поддерживается: сначала перенесите
+пользователей с лишних шардов командой move.
+
+Использование:
+    python reshard.py init-sequences
+    python reshard.py pin-existing [--previous-shards N]
+    python reshard.py move 123456789 2
+"""
+import argparse
+import asyncio
+
+import asyncpg
+
+from config import DB_CONFIG, DB_SHARD_DSNS, SHARD_MAP_TTL
+from utils.sharding import MAX_SHARDS, shard_for_user
+
+TASKS_COLUMNS = [
+    'id', 'user_id', 'task_text', 'status', 'is_hidden',
+    'created_at', 'completed_at'
+]
+ARCHIVE_COLUMNS = TASKS_COLUMNS + ['archived_at']
+USERS_COLUMNS = ['user_id', 'timezone', 'created_at', 'updated_at']
+
+
+async def connect_shards():
+    """Подключение ко всем шардам, шард 0 — основная БД"""
+    connections = [await asyncpg.connect(**DB_CONFIG)]
+    for dsn in DB_SHARD_DSNS:
+        connections.append(await asyncpg.connect(dsn=dsn))
+    return connections
+
+
+async def init_sequences(shards):
+    """Настройка последовательностей: шард k выдает id = k + 1 (mod шаг)"""
+    if len(shards) > MAX_SHARDS:
+        raise ValueError(f"Поддерживается не более {MAX_SHARDS} шардов")
+
+    max_id = 0
+    for conn in shards:
+        shard_max = await conn.fetchval("""
+            SELECT GREATEST(
+                (SELECT MAX(id) FROM tasks),
+                (SELECT MAX(id) FROM tasks_archive)
+            )
+        """)
+        max_id = max(max_id, shard_max or 0)
+
+    base = max_id + 1
+    for shard, conn in enumerate(shards):
+        start = base + (shard - (base - 1)) % MAX_SHARDS
+        await conn.execute(
+            f"ALTER SEQUENCE tasks_id_seq "
+            f"INCREMENT BY {MAX_SHARDS} RESTART WITH {start}"
+        )
+        print(f"✅ Шард {shard}: id начиная с {start}, шаг {MAX_SHARDS}")
+
+
+async def pin_existing(shards, previous: int = 1):
+    """
+    Закрепление существующих пользователей за их текущими шардами
+
+    previous — сколько шардов было до изменения (1 — шардирование
+    включается впервые). Пользователь, которого нет в карте шардов,
+    лежит на шарде crc32 % previous; если при новом числе шардов хэш
+    указывает на другой шард, он записывается в карту с текущим.
+    """
+    if not 1 <= previous <= len(shards):
+        raise ValueError(
+            f"Число шардов до изменения должно быть от 1 до {len(shards)}"
+        )
+
+    mapped = {
+        row['user_id'] for row in
+        await shards[0].fetch("SELECT user_id FROM user_shards")
+    }
+
+    user_ids, user_shards = [], []
+    for shard in range(previous):
+        rows = await shards[shard].fetch("""
+            SELECT user_id FROM tasks
+            UNION
+            SELECT user_id FROM tasks_archive
+            UNION
+            SELECT user_id FROM users
+        """)
+        for row in rows:
+            user_id = row['user_id']
+            if user_id in mapped:
+                continue
+            if shard_for_user(user_id, previous) != shard:
+                # Остатки данных не своего шарда не закрепляем
+                continue
+            if shard_for_user(user_id, len(shards)) != shard:
+                user_ids.append(user_id)
+                user_shards.append(shard)
+
+    await shards[0].execute("""
+        INSERT INTO user_shards (user_id, shard)
+        SELECT * FROM unnest($1::BIGINT[], $2::INTEGER[])
+        ON CONFLICT (user_id) DO NOTHING
+    """, user_ids, user_shards)
+    print(
+        f"✅ Закреплено пользователей за текущими шардами: {len(user_ids)} "
+        f"(шардов было {previous}, стало {len(shards)})"
+    )
+
+
+async def get_user_shard(shards, user_id: int) -> int:
+    """Текущий шард пользователя по карте шардов или по хэшу"""
+    shard = await shards[0].fetchval(
+        "SELECT shard FROM user_shards WHERE user_id = $1", user_id
+    )
+    if shard is None:
+        return shard_for_user(user_id, len(shards))
+    return shard
+
+
+async def copy_rows(source, target, table: str, columns, user_id: int):
+    """Копирование строк пользователя из таблицы одного шарда в другой"""
+    column_list = ', '.join(columns)
+    rows = await source.fetch(
+        f"SELECT {column_list} FROM {table} WHERE user_id = $1", user_id
+    )
+    if rows:
+        await target.copy_records_to_table(
+            table, records=[tuple(row) for row in rows], columns=columns
+        )
+    return len(rows)
+
+
+async def upsert_user(source, target, user_id: int):
+    """
+    Копирование строки users пользователя
+
+    Строка на целевом шарде может уже быть (например, часовой пояс
+    сохранялся до закрепления за шардом), поэтому она перезаписывается
+    данными исходного шарда.
+    """
+    row = await source.fetchrow(
+        f"SELECT {', '.join(USERS_COLUMNS)} FROM users WHERE user_id = $1",
+        user_id
+    )
+    if row is None:
+        return
+    await target.execute("""
+        INSERT INTO users (user_id, timezone, created_at, updated_at)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (user_id) DO UPDATE SET
+            timezone = EXCLUDED.timezone,
+            created_at = EXCLUDED.created_at,
+            updated_at = EXCLUDED.updated_at
+    """, *row)
+
+
+async def move_user(shards, user_id: int, target_shard: int):
+    """
+    Перенос данных пользователя на другой шард
+
+    1. Пользователь помечается в карте шардов как переносимый:
+       бот перестает принимать его изменения, архиватор — переносить
+       его задачи в архив
+    2. После истечения кэша карты в процессах бота данные копируются
+       на новый шард в одной транзакции (счетчики строит триггер)
+    3. Карта переключается на новый шард, а после повторного
+       истечения кэша данные удаляются со старого шарда
+    """
+    source_shard = await get_user_shard(shards, user_id)
+    if source_shard == target_shard:
+        print(f"ℹ️ Пользователь {user_id} уже на шарде {target_shard}")
+        return
+
+    source, target = shards[source_shard], shards[target_shard]
+    wait = SHARD_MAP_TTL + 1
+
+    await shards[0].execute("""
+        INSERT INTO user_shards (user_id, shard, locked, updated_at)
+        VALUES ($1, $2, TRUE, CURRENT_TIMESTAMP)
+        ON CONFLICT (user_id) DO UPDATE SET
+            locked = TRUE,
+            updated_at = CURRENT_TIMESTAMP
+    """, user_id, source_shard)
+    print(f"🔒 Запись заблокирована, ожидание {wait} с")
+    await asyncio.sleep(wait)
+
+    try:
+        # Исходные таблицы читаются из одного снимка: задача, которую
+        # архиватор перенес между чтением tasks и tasks_archive,
+        # иначе попала бы на новый шард дважды
+        async with target.transaction(), source.transaction(
+                isolation='repeatable_read', readonly=True
+        ):
+            # Строки пользователя на целевом шарде — остатки прерванного
+            # переноса (карта указывает на исходный шард), они не нужны
+            for table in ('tasks', 'tasks_archive', 'user_task_counters'):
+                await target.execute(
+                    f"DELETE FROM {table} WHERE user_id = $1", user_id
+                )
+            tasks = await copy_rows(
+                source, target, 'tasks', TASKS_COLUMNS, user_id
+            )
+            archived = await copy_rows(
+                source, target, 'tasks_archive', ARCHIVE_COLUMNS, user_id
+            )
+            await upsert_user(source, target, user_id)
+    except Exception:
+        # Снимаем блокировку, данные остаются на исходном шарде
+        await shards[0].execute(
+            "UPDATE user_shards SET locked = FALSE WHERE user_id = $1",
+            user_id
+        )
+        raise
+
+    print(f"📦 Скопировано задач: {tasks}, архивных: {archived}")
+
+    await shards[0].execute("""
+        UPDATE user_shards
+        SET shard = $2, locked = FALSE, updated_at = CURRENT_TIMESTAMP
+        WHERE user_id = $1
+    """, user_id, target_shard)
+    print(f"🔀 Карта шардов обновлена, ожидание {wait} с")
+    await asyncio.sleep(wait)
+
+    async with source.transaction():
+        for table in ('tasks', 'tasks_archive', 'users', 'user_task_counters'):
+            await source.execute(
+                f"DELETE FROM {table} WHERE user_id = $1", user_id
+            )
+
+    print(
+        f"✅ Пользователь {user_id} перенесен "
+        f"с шарда {source_shard} на шард {target_shard}"
+    )
+
+
+async def run_reshard(args):
+    """Выполнение команды обслуживания шардов"""
+    try:
+        shards = await connect_shards()
+
+        try:
+            if args.command == "init-sequences":
+                await init_sequences(shards)
+            elif args.command == "pin-existing":
+                await pin_existing(shards, args.previous_shards)
+            elif args.command == "move":
+                if not 0 <= args.shard < len(shards):
+                    print(f"❌ Нет шарда {args.shard}")
+                    return False
+                await move_user(shards, args.user_id, args.shard)
+            return True
+
+        finally:
+            for conn in shards:
+                await conn.close()
+            print("🔒 Соединения с БД закрыты")
+
+    except asyncpg.PostgresError as e:
+        print(f"❌ Ошибка PostgreSQL: {e}")
+        return False
+    except Exception as e:
+        print(f"❌ Неожиданная ошибка: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Обслуживание шардирования по user_id"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("init-sequences")
+    pin_parser = subparsers.add_parser("pin-existing")
+    pin_parser.add_argument(
+        "--previous-shards", type=int, default=1,
+        help="число шардов до изменения (1 — включение шардирования)"
+    )
+    move_parser = subparsers.add_parser("move")
+    move_parser.add_argument("user_id", type=int)
+    move_parser.add_argument("shard", type=int)
+
+    success = asyncio.run(run_reshard(parser.parse_args()))
+    exit(0 if success else 1)
@@ -0,0 +1,53 @@
+"""
+Запуск бота в несколько процессов
+
+Фронт принимает обновления (поллинг или webhook) и раскладывает их
+по процессам-воркерам по user_id: у каждого воркера свой Dispatcher,
+хранилище FSM-состояний и пул БД, а обновления одного пользователя
+всегда обрабатывает один воркер.
+
+Перезапуск без потери обновлений:
+    kill -TERM <pid воркера>  — плавный перезапуск одного воркера
+    kill -HUP <pid фронта>    — поочередный перезапуск всех воркеров
+
+Использование:
+    python run_workers.py [--workers N] [--mode polling|webhook]
+"""
+import argparse
+import asyncio
+
+from config import BOT_MODE, WORKERS
+from services.worker_pool import run_front
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Запуск бота в несколько процессов"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WORKERS,
+        help="количество процессов-воркеров (по умолчанию WORKERS)"
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("polling", "webhook"),
+        default=BOT_MODE,
+        help="способ получения обновлений (по умолчанию BOT_MODE)"
+    )
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        print("❌ Количество воркеров должно быть больше 0")
+        exit(1)
+
+    success = True
+    try:
+        asyncio.run(run_front(args.mode, args.workers))
+    except KeyboardInterrupt:
+        print("👋 Остановлено пользователем")
+    except Exception as e:
+        print(f"❌ Ошибка: {e}")
+        success = False
+
+    exit(0 if success else 1)
@@ -0,0 +1,56 @@
+import asyncio
+
+from config import (
+    ARCHIVE_BATCH_SIZE,
+    ARCHIVE_COMPLETED_DAYS,
+    ARCHIVE_INTERVAL
+)
+from database import db
+from utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Пауза между пачками, чтобы архивация не мешала основной нагрузке
+BATCH_PAUSE = 0.5
+
+
+async def archive_cold_tasks() -> int:
+    """
+    Перенос всех холодных задач в архив пачками
+
+    Returns:
+        Общее количество перенесенных задач
+    """
+    total = 0
+
+    while True:
+        moved = await db.archive_tasks_batch(
+            ARCHIVE_COMPLETED_DAYS, ARCHIVE_BATCH_SIZE
+        )
+        total += moved
+
+        # Неполная пачка — кандидатов больше нет
+        if moved < ARCHIVE_BATCH_SIZE:
+            return total
+
+        await asyncio.sleep(BATCH_PAUSE)
+
+
+async def run_archiver():
+    """Фоновый цикл архивации, запускается вместе с ботом"""
+    logger.info(
+        f"Архивация запущена: интервал {ARCHIVE_INTERVAL} с, "
+        f"выполненные старше {ARCHIVE_COMPLETED_DAYS} дн."
+    )
+
+    while True:
+        try:
+            total = await archive_cold_tasks()
+            if total:
+                logger.info(f"Архивация завершена, перенесено: {total}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка архивации задач: {e}")
+
+        await asyncio.sleep(ARCHIVE_INTERVAL)
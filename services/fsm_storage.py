@@ -0,0 +1,351 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from config import (
+    FSM_CACHE_SIZE,
+    FSM_CACHE_TTL,
+    FSM_CLEANUP_INTERVAL,
+    FSM_MEMORY_MAX_ENTRIES,
+    FSM_STATE_TTL,
+    FSM_STORAGE
+)
+from database import db
+from utils.cache import TTLCache
+from utils.logging_config import get_logger
+from utils.metrics import acquire
+
+logger = get_logger(__name__)
+
+# Запись без состояния и данных (в таблице такой строки нет)
+EMPTY_RECORD: Tuple[Optional[str], Dict[str, Any]] = (None, {})
+
+
+class PostgresStorage(BaseStorage):
+    """
+    Хранилище FSM-состояний в таблице fsm_states (шард 0)
+
+    Состояния переживают перезапуск бота и видны всем его процессам.
+    Запись сквозная: сначала в БД, затем в кэш процесса, поэтому
+    повторные чтения состояния в пределах одного обновления и между
+    обновлениями пользователя не обращаются к БД. Запись, совпадающая
+    с закэшированным значением, в БД не отправляется. Прочитанная
+    из БД запись кэшируется не дольше, чем ей осталось до устаревания:
+    иначе пропущенная запись не продлила бы updated_at, и
+    delete_expired удалил бы состояние, которое кэш еще считает живым.
+
+    Кэш корректен, пока обновления пользователя обрабатывает один
+    процесс (один инстанс или run_workers.py). Если обновления одного
+    пользователя распределяются между инстансами без привязки,
+    кэш нужно выключить (cache_size=0).
+
+    Состояние, не менявшееся ttl секунд, считается отсутствующим
+    и удаляется delete_expired.
+    """
+
+    def __init__(
+            self,
+            database=db,
+            ttl: float = FSM_STATE_TTL,
+            cache_size: int = FSM_CACHE_SIZE,
+            cache_ttl: float = FSM_CACHE_TTL
+    ):
+        self.database = database
+        self.ttl = float(ttl)
+        # Кэш не должен пережить состояние в БД
+        self.cache = (
+            TTLCache(maxsize=cache_size, ttl=min(cache_ttl, ttl))
+            if cache_size > 0 else None
+        )
+        self.writes = 0
+        self.skipped_writes = 0
+
+    @staticmethod
+    def _key_args(key: StorageKey) -> tuple:
+        """Параметры ключа $1..$5 запросов fsm_*"""
+        return (
+            key.bot_id,
+            key.chat_id,
+            key.user_id,
+            key.thread_id or 0,
+            key.destiny
+        )
+
+    async def _fetch(self, name: str, key: StorageKey, *args):
+        """Выполнение запроса fsm_* для ключа на основном пуле"""
+        async with acquire(self.database.pool) as connection:
+            return await connection.fetchrow_statement(
+                name, *self._key_args(key), self.ttl, *args
+            )
+
+    async def _get_record(
+            self,
+            key: StorageKey
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Состояние и данные ключа (из кэша или БД)"""
+        if self.cache is not None:
+            record = self.cache.get(key)
+            if record is not None:
+                return record
+
+        row = await self._fetch('fsm_get_state', key)
+        if row is None:
+            self._cache_record(key, EMPTY_RECORD)
+            return EMPTY_RECORD
+
+        record = (row['state'], row['data'])
+        self._cache_record(key, record, row['expires_in'])
+        return record
+
+    def _cache_record(
+            self,
+            key: StorageKey,
+            record: Tuple[Optional[str], Dict[str, Any]],
+            expires_in: Optional[float] = None
+    ):
+        """Запись в кэш; expires_in — сколько жить записи в БД, с"""
+        if self.cache is None:
+            return
+        ttl = self.cache.ttl
+        if expires_in is not None:
+            ttl = min(ttl, expires_in)
+        if ttl > 0:
+            self.cache.set(key, record, ttl=ttl)
+
+    def _cached(self, key: StorageKey):
+        """Закэшированная запись (без учета в счетчиках кэша)"""
+        return self.cache.peek(key) if self.cache is not None else None
+
+    async def set_state(self, key: StorageKey, state: StateType = None):
+        state = state.state if isinstance(state, State) else state
+
+        cached = self._cached(key)
+        if cached is not None and cached[0] == state:
+            self.skipped_writes += 1
+            return
+
+        row = await self._fetch('fsm_set_state', key, state)
+        self.writes += 1
+        self._cache_record(key, (state, row['data']))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self._get_record(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]):
+        cached = self._cached(key)
+        if cached is not None and cached[1] == data:
+            self.skipped_writes += 1
+            return
+
+        row = await self._fetch('fsm_set_data', key, data)
+        self.writes += 1
+        self._cache_record(key, (row['state'], data.copy()))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self._get_record(key)
+        return data.copy()
+
+    async def update_data(
+            self,
+            key: StorageKey,
+            data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Слияние данных одним запросом, без чтения перед записью"""
+        row = await self._fetch('fsm_update_data', key, data)
+        self.writes += 1
+        self._cache_record(key, (row['state'], row['data']))
+        return row['data'].copy()
+
+    async def delete_expired(self) -> int:
+        """
+        Удаление устаревших и пустых записей
+
+        Returns:
+            Количество удаленных записей
+        """
+        async with acquire(self.database.pool) as connection:
+            return await connection.fetchval_statement(
+                'fsm_delete_expired', self.ttl
+            )
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики записей в БД и кэша"""
+        stats = {'writes': self.writes, 'skipped_writes': self.skipped_writes}
+        if self.cache is not None:
+            stats.update(
+                {f'cache_{name}': value
+                 for name, value in self.cache.stats().items()}
+            )
+        return stats
+
+    async def close(self):
+        # Пул принадлежит database и закрывается вместе с ним
+        logger.info(f"Статистика FSM-хранилища: {self.stats()}")
+        if self.cache is not None:
+            self.cache.clear()
+
+
+def data_size(data: Dict[str, Any]) -> int:
+    """Примерный объем данных состояния в байтах (по длине JSON)"""
+    return len(json.dumps(data, default=str)) if data else 0
+
+
+class BoundedMemoryStorage(BaseStorage):
+    """
+    Хранилище FSM-состояний в памяти с ограниченным размером
+
+    Замена MemoryStorage для долго работающего процесса: ключ,
+    к которому не обращались ttl секунд, удаляется, а сверх max_entries
+    вытесняется давно не использованный. Ключ без состояния и данных
+    (например, после state.clear()) не хранится, а чтение отсутствующего
+    ключа его не создает. Как и в MemoryStorage, состояния теряются
+    при перезапуске.
+    """
+
+    def __init__(
+            self,
+            max_entries: int = FSM_MEMORY_MAX_ENTRIES,
+            ttl: float = FSM_STATE_TTL
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # ключ -> [состояние, данные, объем данных, время обращения];
+        # порядок — от давно не использованных к недавним
+        self._records: "OrderedDict[StorageKey, list]" = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _size(record: list) -> int:
+        return (len(record[0]) if record[0] else 0) + record[2]
+
+    def _get(self, key: StorageKey) -> Optional[list]:
+        """Запись ключа с отметкой обращения (None — нет или устарела)"""
+        record = self._records.get(key)
+        if record is None:
+            return None
+
+        now = time.monotonic()
+        if record[3] <= now - self.ttl:
+            del self._records[key]
+            self.bytes -= self._size(record)
+            self.expirations += 1
+            return None
+
+        record[3] = now
+        self._records.move_to_end(key)
+        return record
+
+    def _put(
+            self,
+            key: StorageKey,
+            record: Optional[list],
+            state: Optional[str],
+            data: Dict[str, Any],
+            size: int
+    ):
+        """Запись состояния и данных ключа (record — из _get)"""
+        if record is not None:
+            self.bytes -= self._size(record)
+            if state is None and not data:
+                del self._records[key]
+                return
+            record[:3] = state, data, size
+            self.bytes += self._size(record)
+            return
+
+        if state is None and not data:
+            return
+        record = self._records[key] = [state, data, size, time.monotonic()]
+        self.bytes += self._size(record)
+
+        # Устаревшие записи — в начале порядка, как и кандидаты
+        # на вытеснение, поэтому просмотр останавливается на первой
+        # актуальной записи
+        deadline = time.monotonic() - self.ttl
+        while self._records:
+            oldest = next(iter(self._records.values()))
+            expired = oldest[3] <= deadline
+            if not expired and len(self._records) <= self.max_entries:
+                break
+
+            self._records.popitem(last=False)
+            self.bytes -= self._size(oldest)
+            if expired:
+                self.expirations += 1
+            else:
+                self.evictions += 1
+
+    async def set_state(self, key: StorageKey, state: StateType = None):
+        state = state.state if isinstance(state, State) else state
+        record = self._get(key)
+        if record is None:
+            self._put(key, None, state, {}, 0)
+        else:
+            self._put(key, record, state, record[1], record[2])
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = self._get(key)
+        return record[0] if record else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]):
+        record = self._get(key)
+        self._put(
+            key,
+            record,
+            record[0] if record else None,
+            data.copy(),
+            data_size(data)
+        )
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = self._get(key)
+        return record[1].copy() if record else {}
+
+    def stats(self) -> Dict[str, int]:
+        """Число записей, их примерный объем и счетчики удалений"""
+        return {
+            'entries': len(self._records),
+            'bytes': self.bytes,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+    async def close(self):
+        logger.info(f"Статистика FSM-хранилища: {self.stats()}")
+        self._records.clear()
+        self.bytes = 0
+
+
+def create_fsm_storage(backend: str = FSM_STORAGE) -> BaseStorage:
+    """Хранилище FSM-состояний по FSM_STORAGE"""
+    if backend == 'postgres':
+        return PostgresStorage()
+    return BoundedMemoryStorage()
+
+
+async def run_fsm_cleanup(storage: PostgresStorage):
+    """Фоновое удаление устаревших FSM-состояний"""
+    logger.info(
+        f"Очистка FSM-состояний запущена: интервал {FSM_CLEANUP_INTERVAL} с, "
+        f"время жизни {FSM_STATE_TTL} с"
+    )
+
+    while True:
+        try:
+            deleted = await storage.delete_expired()
+            if deleted:
+                logger.info(f"Удалено устаревших FSM-состояний: {deleted}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка очистки FSM-состояний: {e}")
+
+        await asyncio.sleep(FSM_CLEANUP_INTERVAL)
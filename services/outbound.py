@@ -0,0 +1,489 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextvars import ContextVar
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Set,
+    Tuple
+)
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AnswerCallbackQuery, Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from config import (
+    OUTBOUND_CHAT_BURST,
+    OUTBOUND_CHAT_RATE,
+    OUTBOUND_GLOBAL_RATE,
+    OUTBOUND_GROUP_RATE,
+    OUTBOUND_MAX_RETRIES
+)
+from utils.logging_config import get_logger
+from utils.metrics import Histogram, elapsed_ms
+
+logger = get_logger(__name__)
+
+# Приоритеты исходящих запросов: меньше — раньше. Ответ на нажатие
+# кнопки пользователь ждет (часики на кнопке), новое сообщение важнее
+# правки старого
+PRIORITY_CALLBACK = 0
+PRIORITY_SEND = 1
+PRIORITY_EDIT = 2
+
+# Правка отправлена через edit_in_background: ее результат не нужен,
+# и ее можно отправить в фоне
+_background_edit: ContextVar[bool] = ContextVar(
+    'background_edit', default=False
+)
+
+# Как часто забывать лимиты чатов, которые давно ничего не получали, с
+PRUNE_INTERVAL = 60
+
+
+class TokenBucket:
+    """
+    Ограничение частоты: rate запросов в секунду, подряд — до capacity
+
+    После pause(seconds) запросы не разрешаются до конца паузы,
+    а запас начинает копиться заново.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Сколько секунд ждать до разрешения запроса (0 — можно сейчас)"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        """Учет разрешенного запроса"""
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, seconds: float):
+        """Запрет запросов на seconds секунд (ответ 429 retry_after)"""
+        self.paused_until = max(
+            self.paused_until, time.monotonic() + seconds
+        )
+        self.tokens = 1
+        self.updated = self.paused_until
+
+    def is_full(self, now: float) -> bool:
+        """Запас полон: лимит в том же состоянии, что и новый"""
+        if now < self.paused_until:
+            return False
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class OutboundScheduler:
+    """
+    Очередь исходящих запросов с общим лимитом и лимитами чатов
+
+    Запрос ждет в acquire, пока не разрешат и общий лимит бота,
+    и лимит его чата (у ответов на callback чата нет). Из запросов,
+    которые можно отправить, первым уходит запрос с меньшим приоритетом,
+    при равном — пришедший раньше; запрос в чат, исчерпавший лимит,
+    не задерживает запросы в другие чаты. Пока очередь пуста и лимиты
+    не исчерпаны, запрос разрешается сразу, без очереди.
+
+    Правки из edit_in_background, которым пришлось бы ждать,
+    отправляются в фоне (defer): обработчик не ждет лимит чата
+    и успевает вернуть ответ на callback в ответе webhook. Из нескольких
+    ожидающих правок одного сообщения уходит только последняя.
+    """
+
+    def __init__(
+            self,
+            global_rate: float = OUTBOUND_GLOBAL_RATE,
+            chat_rate: float = OUTBOUND_CHAT_RATE,
+            group_rate: float = OUTBOUND_GROUP_RATE / 60,
+            chat_burst: float = OUTBOUND_CHAT_BURST
+    ):
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        # Без запаса: в любую секунду уходит не больше global_rate + 1
+        self.global_bucket = TokenBucket(global_rate, 1)
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+        # чат -> куча ожидающих (приоритет, номер, future)
+        self._waiting: Dict[Hashable, List[tuple]] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._pruned_at = time.monotonic()
+        # Последняя фоновая отправка по ключу (сообщению) и те из них,
+        # что уже получили разрешение
+        self._deferred: Dict[Hashable, asyncio.Task] = {}
+        self._deferred_granted: Set[asyncio.Task] = set()
+
+        self.queued = [0, 0, 0]
+        self.granted = 0
+        self.retry_after = 0
+        self.deferred = 0
+        self.superseded = 0
+        self.wait = Histogram()
+
+    def _bucket(self, chat: Hashable) -> Optional[TokenBucket]:
+        """Лимит чата (None — запрос без чата)"""
+        if chat is None:
+            return None
+        bucket = self._buckets.get(chat)
+        if bucket is None:
+            group = isinstance(chat, str) or chat < 0
+            rate = self.group_rate if group else self.chat_rate
+            bucket = self._buckets[chat] = TokenBucket(rate, self.chat_burst)
+        return bucket
+
+    def _delay(self, chat: Hashable, now: float) -> float:
+        bucket = self._bucket(chat)
+        return bucket.delay(now) if bucket else 0.0
+
+    def _grant(self, chat: Hashable, now: float):
+        self.global_bucket.take(now)
+        bucket = self._bucket(chat)
+        if bucket:
+            bucket.take(now)
+        self.granted += 1
+
+    def _is_free(self, chat: Hashable, now: float) -> bool:
+        return (
+            not self._waiting
+            and self.global_bucket.delay(now) == 0
+            and self._delay(chat, now) == 0
+        )
+
+    def is_free(self, chat: Hashable) -> bool:
+        """Разрешит ли acquire запрос в чат chat сразу, без очереди"""
+        return self._is_free(chat, time.monotonic())
+
+    async def acquire(self, chat: Hashable, priority: int):
+        """Ожидание разрешения на запрос в чат chat"""
+        now = time.monotonic()
+        if now - self._pruned_at > PRUNE_INTERVAL:
+            self._prune(now)
+
+        if self._is_free(chat, now):
+            self._grant(chat, now)
+            self.wait.observe(0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._waiting.setdefault(chat, []),
+            (priority, next(self._counter), future)
+        )
+        self.queued[priority] += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+        # Отмененный запрос _run выбросит из очереди, не тратя лимит
+        started = time.perf_counter()
+        try:
+            await future
+        finally:
+            self.wait.observe(elapsed_ms(started))
+
+    def defer(
+            self,
+            key: Hashable,
+            send: Callable[[Callable[[], None]], Awaitable]
+    ):
+        """
+        Отправка в фоне, без ожидания разрешения вызывающим
+
+        send(granted) ждет разрешения, вызывает granted() и выполняет
+        запрос. Новая отправка с тем же key заменяет еще не получившую
+        разрешение, а после уже разрешенной уходит следом за ней.
+        """
+        previous = self._deferred.get(key)
+        if previous is not None and previous not in self._deferred_granted:
+            previous.cancel()
+            self.superseded += 1
+            previous = None
+
+        self._deferred[key] = asyncio.create_task(
+            self._send_deferred(key, previous, send)
+        )
+        self.deferred += 1
+
+    async def _send_deferred(
+            self,
+            key: Hashable,
+            previous: Optional[asyncio.Task],
+            send: Callable[[Callable[[], None]], Awaitable]
+    ):
+        task = asyncio.current_task()
+        try:
+            if previous is not None:
+                await asyncio.wait({previous})
+            await send(lambda: self._deferred_granted.add(task))
+        except Exception as e:
+            logger.error(f"Ошибка фоновой отправки ({key}): {e}")
+        finally:
+            self._deferred_granted.discard(task)
+            if self._deferred.get(key) is task:
+                del self._deferred[key]
+
+    def pause(self, chat: Hashable, seconds: float):
+        """Пауза чата (для запроса без чата — общая) после ответа 429"""
+        self.retry_after += 1
+        bucket = self._bucket(chat) or self.global_bucket
+        bucket.pause(seconds)
+        self._wakeup.set()
+
+    def _next_ready(self, now: float) -> Tuple[bool, Hashable, float]:
+        """
+        Чат запроса, который можно отправить первым
+
+        Returns:
+            (True, чат, 0) или (False, None, сколько ждать до ближайшего
+            разрешения по лимитам чатов; inf — очередь пуста)
+        """
+        best_chat, best_head = None, None
+        next_delay = float('inf')
+
+        for chat in list(self._waiting):
+            waiters = self._waiting[chat]
+            # Отмененные запросы просто выбрасываются
+            while waiters and waiters[0][2].done():
+                priority = heapq.heappop(waiters)[0]
+                self.queued[priority] -= 1
+            if not waiters:
+                del self._waiting[chat]
+                continue
+
+            delay = self._delay(chat, now)
+            if delay > 0:
+                next_delay = min(next_delay, delay)
+            elif best_head is None or waiters[0][:2] < best_head:
+                best_chat, best_head = chat, waiters[0][:2]
+
+        if best_head is None:
+            return False, None, next_delay
+        return True, best_chat, 0.0
+
+    def _prune(self, now: float):
+        """Удаление лимитов чатов, вернувшихся в исходное состояние"""
+        self._pruned_at = now
+        for chat in list(self._buckets):
+            if chat not in self._waiting and self._buckets[chat].is_full(now):
+                del self._buckets[chat]
+
+    async def _wait(self, timeout: float):
+        """Сон до timeout секунд или до нового запроса в очереди"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        """Выдача разрешений запросам из очереди по приоритету"""
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            ready, chat, delay = self._next_ready(now)
+            if not ready:
+                if delay == float('inf'):
+                    # Очередь пуста: задача завершается до нового запроса
+                    self._task = None
+                    return
+                await self._wait(delay)
+                continue
+
+            # Пока ждем общий лимит, может прийти запрос важнее
+            delay = self.global_bucket.delay(now)
+            if delay > 0:
+                await self._wait(delay)
+                continue
+
+            priority, _, future = heapq.heappop(self._waiting[chat])
+            self.queued[priority] -= 1
+            self._grant(chat, now)
+            future.set_result(None)
+
+            # Даем разрешенным запросам уйти до следующего разрешения
+            await asyncio.sleep(0)
+
+    def stats(self) -> Dict:
+        """Глубина очереди по приоритетам, ожидание (мс) и счетчики"""
+        return {
+            'queued': {
+                'callback': self.queued[PRIORITY_CALLBACK],
+                'send': self.queued[PRIORITY_SEND],
+                'edit': self.queued[PRIORITY_EDIT]
+            },
+            'chats': len(self._buckets),
+            'granted': self.granted,
+            'retry_after': self.retry_after,
+            'deferred': self.deferred,
+            'superseded': self.superseded,
+            'wait_ms': self.wait.stats()
+        }
+
+    async def close(self):
+        """
+        Остановка выдачи разрешений
+
+        Ожидающие запросы и фоновые отправки отменяются
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for waiters in self._waiting.values():
+            for _, _, future in waiters:
+                future.cancel()
+        self._waiting.clear()
+
+        deferred = list(self._deferred.values())
+        self._deferred.clear()
+        for task in deferred:
+            task.cancel()
+        await asyncio.gather(*deferred, return_exceptions=True)
+
+
+def classify_method(
+        method: TelegramMethod
+) -> Optional[Tuple[Hashable, int]]:
+    """
+    Чат и приоритет запроса к Bot API
+
+    Returns:
+        (чат, приоритет) или None — запрос не ограничивается
+        (getUpdates, getMe, setWebhook и другие служебные)
+    """
+    if isinstance(method, AnswerCallbackQuery):
+        return None, PRIORITY_CALLBACK
+
+    chat_id = getattr(method, 'chat_id', None)
+    if chat_id is None:
+        return None
+
+    if method.__api_method__.startswith('edit'):
+        return chat_id, PRIORITY_EDIT
+    return chat_id, PRIORITY_SEND
+
+
+class OutboundLimiter(BaseRequestMiddleware):
+    """
+    Middleware сессии бота: все отправки через OutboundScheduler
+
+    Ставится на bot.session, поэтому охватывает message.answer,
+    edit_text, callback.answer и остальные вызовы обработчиков.
+    Ответ 429 ставит чат на паузу retry_after и повторяет запрос
+    (не больше max_retries раз), вместо ошибки в обработчике.
+
+    Правка из edit_in_background, которой пришлось бы ждать лимит,
+    уходит в фоне (OutboundScheduler.defer) с приоритетом новых
+    сообщений, чтобы не обогнать отправленное после нее сообщение
+    в тот же чат; ошибки такой правки только пишутся в лог. Остальные
+    правки, как и другие запросы, ждут разрешения: их результат
+    (Message) может быть нужен вызывающему.
+    """
+
+    def __init__(
+            self,
+            scheduler: Optional[OutboundScheduler] = None,
+            max_retries: int = OUTBOUND_MAX_RETRIES
+    ):
+        self.scheduler = scheduler or OutboundScheduler()
+        self.max_retries = max_retries
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        limit = classify_method(method)
+        if limit is None:
+            return await make_request(bot, method)
+
+        chat, priority = limit
+        if (priority == PRIORITY_EDIT and _background_edit.get()
+                and not self.scheduler.is_free(chat)):
+            self.scheduler.defer(
+                (chat, getattr(method, 'message_id', None)),
+                lambda granted: self._send(
+                    make_request, bot, method, chat, PRIORITY_SEND, granted
+                )
+            )
+            # Результат не нужен: edit_in_background его не возвращает
+            return True
+        return await self._send(make_request, bot, method, chat, priority)
+
+    async def _send(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+            chat: Hashable,
+            priority: int,
+            granted: Optional[Callable[[], None]] = None
+    ) -> Response[TelegramType]:
+        """Запрос после разрешения, с повторами после ответа 429"""
+        attempt = 0
+        while True:
+            await self.scheduler.acquire(chat, priority)
+            if granted is not None:
+                granted()
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                self.scheduler.pause(chat, e.retry_after)
+                if attempt > self.max_retries:
+                    raise
+                logger.warning(
+                    f"Лимит Telegram для {method.__api_method__} "
+                    f"(чат {chat}): повтор через {e.retry_after} с"
+                )
+
+
+async def edit_in_background(method: TelegramMethod):
+    """
+    Правка сообщения, результат которой обработчику не нужен
+
+    С очередью отправки правка, которой пришлось бы ждать лимит чата,
+    уходит в фоне, и обработчик сразу продолжает работу (например,
+    возвращает ответ на callback). Без очереди — обычный запрос.
+    Ошибки фоновой правки пишутся в лог, а не выбрасываются.
+
+    Пример:
+        await edit_in_background(callback.message.edit_text(...))
+    """
+    token = _background_edit.set(True)
+    try:
+        await method
+    finally:
+        _background_edit.reset(token)
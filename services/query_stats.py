@@ -0,0 +1,38 @@
+import asyncio
+from typing import Optional
+
+from aiogram.fsm.storage.base import BaseStorage
+
+from config import QUERY_STATS_LOG_INTERVAL
+from database import db
+from services.outbound import OutboundScheduler
+from utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+async def run_query_stats_logger(
+        fsm_storage: Optional[BaseStorage] = None,
+        outbound: Optional[OutboundScheduler] = None
+):
+    """
+    Периодическая запись задержек запросов и ожидания пула в лог
+
+    Вместе с ними пишется размер хранилища FSM-состояний, если оно
+    ведет статистику (stats()), и очередь исходящих запросов к Bot API.
+    """
+    while True:
+        await asyncio.sleep(QUERY_STATS_LOG_INTERVAL)
+
+        stats = db.get_query_stats()
+        logger.info(f"Ожидание соединения из пула: {stats['pool_acquire']}")
+        if 'add_task_batches' in stats:
+            logger.info(f"Пачки add_task: {stats['add_task_batches']}")
+        for name, latency in stats['queries'].items():
+            logger.info(f"Запрос {name}: {latency}")
+
+        if hasattr(fsm_storage, 'stats'):
+            logger.info(f"FSM-хранилище: {fsm_storage.stats()}")
+
+        if outbound is not None:
+            logger.info(f"Исходящие запросы: {outbound.stats()}")
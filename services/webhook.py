@@ -0,0 +1,178 @@
+import asyncio
+import secrets
+from typing import Any, Dict, List
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import (
+    SimpleRequestHandler,
+    setup_application
+)
+from aiohttp import web
+
+from config import (
+    WEBHOOK_HOST,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_REPLY_TIMEOUT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL
+)
+from utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Сколько секунд при остановке ждать обновления, уже принятые в обработку
+SHUTDOWN_TIMEOUT = 30
+
+# Заголовок запроса: метод из ответа обработчика некому передать
+# в Telegram (фронт воркеров в режиме polling или фронт уже ответил
+# Telegram), его нужно отправить обычным запросом к Bot API
+NO_REPLY_HEADER = "X-Bot-No-Reply"
+# Заголовок запроса: сколько секунд фронт еще ждет ответ воркера
+# (меньше WEBHOOK_REPLY_TIMEOUT, если обновление ждало в очереди)
+REPLY_TIMEOUT_HEADER = "X-Bot-Reply-Timeout"
+
+
+def reply_timeout(request: web.Request) -> float:
+    """Сколько ждать обработчик, чтобы ответить методом (0 — не ждать)"""
+    if request.headers.get(NO_REPLY_HEADER):
+        return 0.0
+    try:
+        limit = float(
+            request.headers.get(REPLY_TIMEOUT_HEADER, WEBHOOK_REPLY_TIMEOUT)
+        )
+    except ValueError:
+        limit = WEBHOOK_REPLY_TIMEOUT
+    return max(0.0, min(limit, WEBHOOK_REPLY_TIMEOUT))
+
+
+class CallbackReplyRequestHandler(SimpleRequestHandler):
+    """
+    Обработчик webhook с ответом на callback в HTTP-ответе
+
+    Нажатия кнопок (callback_query) обрабатываются до ответа Telegram:
+    если обработчик вернул метод (return callback.answer(...)), он
+    уходит в теле ответа на webhook без отдельного запроса к Bot API.
+    Если обработчик не уложился в WEBHOOK_REPLY_TIMEOUT (или в срок
+    из заголовка REPLY_TIMEOUT_HEADER), Telegram получает пустой ответ,
+    а метод отправляется обычным запросом.
+    Остальные обновления, а также все запросы с заголовком
+    NO_REPLY_HEADER обрабатываются в фоне, ответ — сразу; метод,
+    возвращенный обработчиком, отправляется обычным запросом.
+
+    При остановке сервера принятые обновления дорабатываются
+    (не дольше SHUTDOWN_TIMEOUT) до закрытия сессии бота.
+    """
+
+    async def handle(self, request: web.Request) -> web.Response:
+        bot = await self.resolve_bot(request)
+        secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not self.verify_secret(secret, bot):
+            return web.Response(body="Unauthorized", status=401)
+
+        update = await request.json(loads=bot.session.json_loads)
+        timeout = reply_timeout(request)
+        if "callback_query" not in update or timeout <= 0:
+            return self._feed_in_background(bot, update)
+
+        # Запрос тоже учитывается как обновление в обработке
+        task = asyncio.current_task()
+        self._background_feed_update_tasks.add(task)
+        try:
+            result = await self.dispatcher.feed_webhook_update(
+                bot, update, _timeout=timeout, **self.data
+            )
+        finally:
+            self._background_feed_update_tasks.discard(task)
+        return web.Response(
+            body=self._build_response_writer(bot=bot, result=result)
+        )
+
+    def _feed_in_background(
+            self,
+            bot: Bot,
+            update: Dict[str, Any]
+    ) -> web.Response:
+        """Обработка обновления в фоне с немедленным ответом Telegram"""
+        task = asyncio.create_task(
+            self._background_feed_update(bot=bot, update=update)
+        )
+        self._background_feed_update_tasks.add(task)
+        task.add_done_callback(self._background_feed_update_tasks.discard)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def close(self):
+        """Ожидание обновлений в обработке и закрытие сессии бота"""
+        pending = set(self._background_feed_update_tasks)
+        if pending:
+            logger.info(f"Ожидание обработки обновлений: {len(pending)}")
+            await asyncio.wait(pending, timeout=SHUTDOWN_TIMEOUT)
+        await super().close()
+
+
+def create_webhook_app(
+        bot: Bot,
+        dp: Dispatcher,
+        secret_token: str = WEBHOOK_SECRET
+) -> web.Application:
+    """aiohttp-приложение с обработчиком webhook на WEBHOOK_PATH"""
+    app = web.Application()
+    CallbackReplyRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=secret_token or None
+    ).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def register_webhook(bot: Bot, allowed_updates: List[str]) -> str:
+    """
+    Регистрация webhook при старте (если задан WEBHOOK_URL)
+
+    Без WEBHOOK_SECRET секрет генерируется заново. Без WEBHOOK_URL
+    webhook должен быть зарегистрирован заранее (например, за обратным
+    прокси) с тем же WEBHOOK_SECRET.
+
+    Returns:
+        Секрет для проверки запросов ("" — без проверки)
+    """
+    secret_token = WEBHOOK_SECRET
+    if WEBHOOK_URL:
+        secret_token = secret_token or secrets.token_urlsafe(32)
+        await bot.set_webhook(
+            f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+            secret_token=secret_token,
+            allowed_updates=allowed_updates
+        )
+        logger.info(f"Webhook установлен: {WEBHOOK_URL}{WEBHOOK_PATH}")
+    elif not secret_token:
+        logger.warning(
+            "WEBHOOK_SECRET не задан: запросы к webhook не проверяются"
+        )
+    return secret_token
+
+
+async def serve_forever(app: web.Application, host: str, port: int):
+    """Запуск aiohttp-приложения до отмены (Ctrl+C / остановка процесса)"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"HTTP-сервер слушает {host}:{port}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher):
+    """Прием обновлений через webhook вместо поллинга"""
+    secret_token = await register_webhook(
+        bot, dp.resolve_used_update_types()
+    )
+    await serve_forever(
+        create_webhook_app(bot, dp, secret_token),
+        WEBHOOK_HOST,
+        WEBHOOK_PORT
+    )
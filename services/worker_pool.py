@@ -0,0 +1,502 @@
+import asyncio
+import multiprocessing
+import secrets
+import signal
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+from aiogram import Bot
+from aiohttp import web
+
+from bot import (
+    create_bot,
+    create_dispatcher,
+    start_background_tasks,
+    stop_background_tasks
+)
+from config import (
+    ARCHIVE_ENABLED,
+    OUTBOUND_GLOBAL_RATE,
+    OUTBOUND_RATE_LIMIT,
+    WEBHOOK_HOST,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_REPLY_TIMEOUT,
+    WORKER_BASE_PORT,
+    WORKER_CONCURRENCY,
+    WORKER_QUEUE_SIZE,
+    WORKERS
+)
+from database import db
+from services.outbound import OutboundScheduler
+from services.webhook import (
+    NO_REPLY_HEADER,
+    REPLY_TIMEOUT_HEADER,
+    SHUTDOWN_TIMEOUT,
+    create_webhook_app,
+    register_webhook,
+    serve_forever
+)
+from utils.logging_config import get_logger
+from utils.sharding import shard_for_user
+
+logger = get_logger(__name__)
+
+# Пауза перед повторной доставкой обновления недоступному воркеру, с
+RETRY_DELAY = 0.2
+MAX_RETRY_DELAY = 2.0
+# Как часто проверять, что процессы воркеров живы, с
+SUPERVISE_INTERVAL = 1.0
+# Сколько ждать завершения воркера после SIGTERM, с
+STOP_TIMEOUT = SHUTDOWN_TIMEOUT + 10
+
+# Ответ воркера на обновление: тело и Content-Type
+WorkerResponse = Tuple[bytes, str]
+
+
+def update_user_id(update: Dict[str, Any]) -> int:
+    """Пользователь, от которого пришло обновление (0 — неизвестен)"""
+    for value in update.values():
+        if not isinstance(value, dict):
+            continue
+        user = value.get('from') or value.get('user') or value.get('chat')
+        if user:
+            return user['id']
+    return 0
+
+
+def worker_process(index: int, port: int, secret: str, workers: int):
+    """Точка входа процесса-воркера"""
+    # Ctrl+C получает вся группа процессов: воркеры останавливает фронт,
+    # дождавшись доставки очередей
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(run_worker(index, port, secret, workers))
+
+
+async def run_worker(index: int, port: int, secret: str, workers: int):
+    """
+    Воркер: свой Dispatcher, хранилище состояний и пул БД
+
+    Общий лимит исходящих запросов бота делится поровну между workers
+    воркерами, лимиты чатов соблюдаются в воркере пользователя.
+
+    Принимает обновления от фронта по HTTP на 127.0.0.1:port тем же
+    обработчиком, что и режим webhook. По SIGTERM перестает принимать
+    обновления, дорабатывает принятые и завершается.
+    """
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+
+    outbound = (
+        OutboundScheduler(global_rate=OUTBOUND_GLOBAL_RATE / workers)
+        if OUTBOUND_RATE_LIMIT else None
+    )
+    bot = create_bot(outbound)
+    dp = create_dispatcher()
+    runner = web.AppRunner(
+        create_webhook_app(bot, dp, secret), access_log=None
+    )
+    background_tasks = []
+
+    try:
+        await db.create_pool()
+        # Архивация и очистка FSM-состояний общие для всех
+        # пользователей: хватит одного воркера
+        background_tasks = start_background_tasks(
+            archiver=ARCHIVE_ENABLED and index == 0,
+            fsm_storage=dp.storage,
+            fsm_cleanup=index == 0,
+            outbound=outbound
+        )
+
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        logger.info(f"Воркер {index} слушает 127.0.0.1:{port}")
+
+        await stop.wait()
+        logger.info(f"Воркер {index} останавливается")
+    finally:
+        # Сначала перестаем принимать обновления и дорабатываем принятые
+        await runner.cleanup()
+        await stop_background_tasks(background_tasks)
+        await db.close_pool()
+        if outbound is not None:
+            await outbound.close()
+        await bot.session.close()
+
+
+class WorkerChannel:
+    """
+    Очередь обновлений одного воркера и их пересылка
+
+    Обновление считается доставленным, только когда воркер ответил
+    на него. Пока воркер перезапускается, обновления ждут в очереди,
+    а доставка текущих повторяется; обновление, на котором процесс
+    воркера упал, может быть обработано повторно.
+    """
+
+    def __init__(self, index: int, port: int, secret: str):
+        self.index = index
+        self.url = f"http://127.0.0.1:{port}{WEBHOOK_PATH}"
+        self.headers = {"X-Telegram-Bot-Api-Secret-Token": secret}
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WORKER_QUEUE_SIZE)
+        self.delivered = 0
+        self.retries = 0
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self, session: aiohttp.ClientSession):
+        """Запуск WORKER_CONCURRENCY пересылающих задач"""
+        self._tasks = [
+            asyncio.create_task(self._forward(session))
+            for _ in range(WORKER_CONCURRENCY)
+        ]
+
+    async def stop(self):
+        """Остановка пересылки (очередь должна быть доставлена заранее)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def put(
+            self,
+            update: Dict[str, Any],
+            reply: Optional[asyncio.Future] = None
+    ):
+        """
+        Постановка обновления в очередь (ждет, если очередь полна)
+
+        В reply, если передан, придет ответ воркера или None; ждать его
+        стоит не дольше WEBHOOK_REPLY_TIMEOUT + 1 с, а перестав ждать —
+        отменить reply. Без reply (или если он отменен до доставки)
+        ответ некому передать, и метод, возвращенный обработчиком
+        (например, ответ на callback), воркер отправит сам
+        """
+        deadline = None
+        if reply is not None:
+            deadline = (
+                asyncio.get_running_loop().time() + WEBHOOK_REPLY_TIMEOUT
+            )
+        await self.queue.put((update, reply, deadline))
+
+    async def _forward(self, session: aiohttp.ClientSession):
+        while True:
+            update, reply, deadline = await self.queue.get()
+            response = None
+            try:
+                response = await self._deliver(
+                    session, update, reply, deadline
+                )
+            except Exception as e:
+                logger.error(
+                    f"Ошибка доставки обновления {update.get('update_id')} "
+                    f"воркеру {self.index}: {e}"
+                )
+            finally:
+                self.queue.task_done()
+                if reply is not None and not reply.done():
+                    reply.set_result(response)
+                elif response is not None:
+                    logger.warning(
+                        f"Ответ воркера {self.index} на обновление "
+                        f"{update.get('update_id')} опоздал и потерян"
+                    )
+
+    def _reply_headers(
+            self,
+            reply: Optional[asyncio.Future],
+            deadline: Optional[float]
+    ) -> Dict[str, str]:
+        """
+        Заголовки запроса к воркеру: сколько ждать метод обработчика
+
+        Если фронт уже ответил Telegram (reply отменен) или срок вышел,
+        пока обновление ждало в очереди, воркер отправит метод сам
+        """
+        if reply is not None and not reply.done():
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout > 0:
+                return {**self.headers, REPLY_TIMEOUT_HEADER: f"{timeout:.3f}"}
+        return {**self.headers, NO_REPLY_HEADER: "1"}
+
+    async def _deliver(
+            self,
+            session: aiohttp.ClientSession,
+            update: Dict[str, Any],
+            reply: Optional[asyncio.Future] = None,
+            deadline: Optional[float] = None
+    ) -> Optional[WorkerResponse]:
+        """
+        Отправка обновления воркеру с повторами, пока он недоступен
+
+        Returns:
+            Ответ воркера, если его ждали (reply), иначе None
+        """
+        delay = RETRY_DELAY
+        while True:
+            headers = self._reply_headers(reply, deadline)
+            try:
+                async with session.post(
+                    self.url, json=update, headers=headers
+                ) as response:
+                    body = await response.read()
+                    if response.status != 200:
+                        logger.error(
+                            f"Воркер {self.index} ответил {response.status} "
+                            f"на обновление {update.get('update_id')}"
+                        )
+                        return None
+                    self.delivered += 1
+                    if NO_REPLY_HEADER in headers:
+                        return None
+                    return body, response.headers.get(
+                        "Content-Type", "application/json"
+                    )
+            except aiohttp.ClientConnectionError:
+                # Воркер перезапускается или упал: ждем новый процесс
+                self.retries += 1
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+
+
+class WorkerPool:
+    """
+    Процессы-воркеры и распределение обновлений между ними
+
+    Обновления пользователя всегда попадают в один воркер
+    (shard_for_user от user_id), поэтому его FSM-состояние хранится
+    в памяти (или кэше FSM-хранилища) одного процесса.
+    """
+
+    def __init__(self, count: int = WORKERS):
+        self.count = count
+        # Секрет запросов фронта к воркерам
+        self.secret = secrets.token_urlsafe(32)
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: List[Optional[multiprocessing.Process]] = (
+            [None] * count
+        )
+        self.channels = [
+            WorkerChannel(index, WORKER_BASE_PORT + index, self.secret)
+            for index in range(count)
+        ]
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._supervisor: Optional[asyncio.Task] = None
+        self._restarting = set()
+        self._restart_lock = asyncio.Lock()
+
+    def _spawn(self, index: int):
+        process = self.context.Process(
+            target=worker_process,
+            args=(index, WORKER_BASE_PORT + index, self.secret, self.count),
+            name=f"worker-{index}"
+        )
+        process.start()
+        self.processes[index] = process
+        logger.info(f"Запущен воркер {index} (pid {process.pid})")
+
+    async def start(self):
+        """Запуск процессов воркеров и пересылки обновлений"""
+        self._session = aiohttp.ClientSession()
+        for index, channel in enumerate(self.channels):
+            self._spawn(index)
+            channel.start(self._session)
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def dispatch(
+            self,
+            update: Dict[str, Any],
+            reply: Optional[asyncio.Future] = None
+    ):
+        """Передача обновления воркеру его пользователя"""
+        index = shard_for_user(update_user_id(update), self.count)
+        await self.channels[index].put(update, reply)
+
+    async def _supervise(self):
+        """Перезапуск воркеров, завершившихся сами (сбой, kill -TERM)"""
+        while True:
+            await asyncio.sleep(SUPERVISE_INTERVAL)
+            for index, process in enumerate(self.processes):
+                if index in self._restarting or process.is_alive():
+                    continue
+                logger.warning(
+                    f"Воркер {index} завершился "
+                    f"(код {process.exitcode}), перезапуск"
+                )
+                self._spawn(index)
+
+    async def _stop_process(self, process: multiprocessing.Process):
+        """SIGTERM и ожидание плавного завершения процесса"""
+        process.terminate()
+        await asyncio.get_running_loop().run_in_executor(
+            None, process.join, STOP_TIMEOUT
+        )
+        if process.is_alive():
+            logger.warning(
+                f"{process.name} не завершился за {STOP_TIMEOUT} с"
+            )
+            process.kill()
+            process.join()
+
+    async def restart_worker(self, index: int):
+        """
+        Плавный перезапуск одного воркера
+
+        Старый процесс дорабатывает принятые обновления, новые
+        обновления его пользователей ждут в очереди и доставляются
+        новому процессу.
+        """
+        async with self._restart_lock:
+            self._restarting.add(index)
+            try:
+                await self._stop_process(self.processes[index])
+                self._spawn(index)
+            finally:
+                self._restarting.discard(index)
+
+    async def rolling_restart(self):
+        """Поочередный перезапуск всех воркеров"""
+        logger.info("Поочередный перезапуск воркеров")
+        for index in range(self.count):
+            await self.restart_worker(index)
+
+    async def stop(self):
+        """Доставка накопленных обновлений и остановка воркеров"""
+        if self._supervisor:
+            self._supervisor.cancel()
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    *(channel.queue.join() for channel in self.channels)
+                ),
+                timeout=STOP_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Не доставлены обновления: {self.stats()}"
+            )
+
+        for channel in self.channels:
+            await channel.stop()
+        await asyncio.gather(*(
+            self._stop_process(process)
+            for process in self.processes
+            if process is not None
+        ))
+        if self._session:
+            await self._session.close()
+        logger.info(f"Воркеры остановлены: {self.stats()}")
+
+    def stats(self) -> Dict[int, Dict[str, int]]:
+        """Очередь, доставленные обновления и повторы по воркерам"""
+        return {
+            channel.index: {
+                'queued': channel.queue.qsize(),
+                'delivered': channel.delivered,
+                'retries': channel.retries
+            }
+            for channel in self.channels
+        }
+
+
+async def poll_updates(pool: WorkerPool, bot: Bot, allowed_updates: List[str]):
+    """
+    Прием обновлений long polling и передача воркерам
+
+    Ответа на обновление здесь нет, поэтому методы, возвращенные
+    обработчиками (ответы на callback), воркеры отправляют сами
+    """
+    await bot.delete_webhook()
+    offset = None
+
+    while True:
+        try:
+            updates = await bot.get_updates(
+                offset=offset, timeout=30, allowed_updates=allowed_updates
+            )
+        except Exception as e:
+            logger.error(f"Ошибка получения обновлений: {e}")
+            await asyncio.sleep(1)
+            continue
+
+        for update in updates:
+            await pool.dispatch(
+                update.model_dump(
+                    mode="json", exclude_unset=True, by_alias=True
+                )
+            )
+            offset = update.update_id + 1
+
+
+def create_intake_app(pool: WorkerPool, secret_token: str) -> web.Application:
+    """
+    Прием webhook на фронте
+
+    Ответ воркера на нажатие кнопки передается Telegram как есть, так что
+    ответ на callback в ответе webhook работает и с воркерами.
+    """
+
+    async def handle(request: web.Request) -> web.Response:
+        received = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if secret_token and not secrets.compare_digest(
+                received, secret_token
+        ):
+            return web.Response(body="Unauthorized", status=401)
+
+        update = await request.json()
+        if "callback_query" not in update:
+            await pool.dispatch(update)
+            return web.json_response({})
+
+        reply = asyncio.get_running_loop().create_future()
+        await pool.dispatch(update, reply)
+        try:
+            response = await asyncio.wait_for(
+                asyncio.shield(reply), WEBHOOK_REPLY_TIMEOUT + 1
+            )
+        except asyncio.TimeoutError:
+            # Воркер недоступен или обработчик долгий: ответ не ждем,
+            # и воркер отправит ответ на callback сам
+            reply.cancel()
+            response = None
+
+        if response is None:
+            return web.json_response({})
+        body, content_type = response
+        return web.Response(body=body, headers={"Content-Type": content_type})
+
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, handle)
+    return app
+
+
+async def run_front(mode: str, count: int = WORKERS):
+    """
+    Фронт: прием обновлений и распределение по count воркерам
+
+    SIGHUP — поочередный перезапуск воркеров; kill -TERM процесса
+    воркера — плавный перезапуск только его.
+    """
+    bot = create_bot()
+    allowed_updates = create_dispatcher().resolve_used_update_types()
+    pool = WorkerPool(count)
+
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(
+        signal.SIGHUP, lambda: asyncio.create_task(pool.rolling_restart())
+    )
+
+    await pool.start()
+    try:
+        if mode == "webhook":
+            secret_token = await register_webhook(bot, allowed_updates)
+            await serve_forever(
+                create_intake_app(pool, secret_token),
+                WEBHOOK_HOST,
+                WEBHOOK_PORT
+            )
+        else:
+            await poll_updates(pool, bot, allowed_updates)
+    finally:
+        await pool.stop()
+        await bot.session.close()
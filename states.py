@@ -4,6 +4,8 @@ from aiogram.fsm.state import State, StatesGroup
 class TaskStates(StatesGroup):
     """Состояния для работы с задачами"""
     waiting_for_new_task = State()     # Ожидание ввода новой задачи
+    # Ожидание ввода нескольких задач (по одной на строку)
+    waiting_for_new_tasks = State()
     # Ожидание ввода для редактирования задачи
     waiting_for_task_edit = State()
 
@@ -11,3 +13,8 @@ class TaskStates(StatesGroup):
 class TimezoneStates(StatesGroup):
     """Состояния для работы с часовым поясом"""
     waiting_for_manual_timezone = State()
+
+
+class ImportStates(StatesGroup):
+    """Состояния для импорта задач из файла"""
+    waiting_for_file = State()
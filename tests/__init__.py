@@ -0,0 +1,6 @@
+import os
+
+# config.py проверяет окружение при импорте: для тестов хранилищ
+# PostgreSQL и настоящий токен не нужны
+os.environ.setdefault('BOT_TOKEN', '1:test')
+os.environ.setdefault('DB_BACKEND', 'memory')
@@ -0,0 +1,243 @@
+"""
+Контракт TaskRepository на хранилищах без PostgreSQL
+
+Одни и те же проверки выполняются для InMemoryTaskRepository
+и SqliteTaskRepository: добавление, страницы списка по курсору
+в обе стороны, выполнение, скрытие, удаление, поиск и архивация.
+
+Запуск: python -m pytest tests (или python -m unittest discover tests)
+"""
+import os
+import tempfile
+import unittest
+
+from repositories.memory import InMemoryTaskRepository
+from repositories.sqlite import SqliteTaskRepository
+from utils.pagination import cursor_from_task, search_cursor_from_task
+
+USER_ID = 1001
+OTHER_USER_ID = 2002
+
+
+class RepositoryContract:
+    """Проверки контракта; хранилище создает make_repository"""
+
+    def make_repository(self):
+        raise NotImplementedError
+
+    async def asyncSetUp(self):
+        self.repo = self.make_repository()
+        await self.repo.create_pool()
+
+    async def asyncTearDown(self):
+        await self.repo.close_pool()
+
+    async def add_numbered_tasks(self, count: int, user_id: int = USER_ID):
+        """Задачи "Задача 1".."Задача count" по одной, ID по порядку"""
+        return [
+            await self.repo.add_task(user_id, f"Задача {number}")
+            for number in range(1, count + 1)
+        ]
+
+    async def test_add_task(self):
+        task_id = await self.repo.add_task(USER_ID, "  Купить молоко  ")
+
+        task = await self.repo.get_task_by_id(task_id, USER_ID)
+        self.assertEqual(task['task_text'], "Купить молоко")
+        self.assertFalse(task['status'])
+        self.assertIsNone(
+            await self.repo.get_task_by_id(task_id, OTHER_USER_ID)
+        )
+
+    async def test_add_task_rejects_invalid_text(self):
+        with self.assertRaises(ValueError):
+            await self.repo.add_task(USER_ID, "   ")
+        with self.assertRaises(ValueError):
+            await self.repo.add_task(USER_ID, "x" * 1001)
+
+    async def test_add_tasks_is_all_or_nothing(self):
+        task_ids = await self.repo.add_tasks(USER_ID, ["Первая", "Вторая"])
+        self.assertEqual(len(task_ids), 2)
+
+        with self.assertRaises(ValueError):
+            await self.repo.add_tasks(USER_ID, ["Третья", ""])
+        self.assertEqual(await self.repo.get_user_tasks_count(USER_ID), 2)
+
+    async def test_list_pagination(self):
+        task_ids = await self.add_numbered_tasks(25)
+        newest_first = task_ids[::-1]
+
+        first = await self.repo.get_tasks_list_snapshot(USER_ID, limit=10)
+        self.assertEqual([t['id'] for t in first['tasks']], newest_first[:10])
+        self.assertFalse(first['has_prev'])
+        self.assertTrue(first['has_next'])
+        self.assertEqual(first['active_count'], 25)
+
+        second = await self.repo.get_tasks_list_snapshot(
+            USER_ID, limit=10, cursor=cursor_from_task(first['tasks'][-1])
+        )
+        self.assertEqual(
+            [t['id'] for t in second['tasks']], newest_first[10:20]
+        )
+        self.assertTrue(second['has_prev'])
+        self.assertTrue(second['has_next'])
+
+        last = await self.repo.get_tasks_list_snapshot(
+            USER_ID, limit=10, cursor=cursor_from_task(second['tasks'][-1])
+        )
+        self.assertEqual([t['id'] for t in last['tasks']], newest_first[20:])
+        self.assertFalse(last['has_next'])
+
+        back = await self.repo.get_tasks_list_snapshot(
+            USER_ID, limit=10, cursor=cursor_from_task(last['tasks'][0]),
+            backward=True
+        )
+        self.assertEqual(back['tasks'], second['tasks'])
+
+        back_to_first = await self.repo.get_tasks_list_snapshot(
+            USER_ID, limit=10, cursor=cursor_from_task(back['tasks'][0]),
+            backward=True
+        )
+        self.assertEqual(back_to_first['tasks'], first['tasks'])
+        self.assertFalse(back_to_first['has_prev'])
+
+    async def test_list_with_completed(self):
+        task_ids = await self.add_numbered_tasks(4)
+        await self.repo.complete_task(task_ids[0], USER_ID)
+        await self.repo.complete_task(task_ids[2], USER_ID)
+
+        active = await self.repo.get_tasks_list_snapshot(USER_ID)
+        self.assertEqual(
+            [t['id'] for t in active['tasks']], [task_ids[3], task_ids[1]]
+        )
+        self.assertEqual(active['completed_count'], 2)
+
+        everything = await self.repo.get_tasks_list_snapshot(
+            USER_ID, include_completed=True, limit=3
+        )
+        self.assertEqual(
+            [t['id'] for t in everything['tasks']],
+            [task_ids[3], task_ids[1], task_ids[2]]
+        )
+        rest = await self.repo.get_tasks_list_snapshot(
+            USER_ID, include_completed=True, limit=3,
+            cursor=cursor_from_task(everything['tasks'][-1])
+        )
+        self.assertEqual([t['id'] for t in rest['tasks']], [task_ids[0]])
+        self.assertFalse(rest['has_next'])
+
+    async def test_complete_and_reactivate(self):
+        task_id = await self.repo.add_task(USER_ID, "Позвонить маме")
+
+        completed = await self.repo.complete_task(task_id, USER_ID)
+        self.assertTrue(completed['status'])
+        self.assertIsNotNone(completed['completed_at'])
+        self.assertIsNone(await self.repo.complete_task(task_id, USER_ID))
+        self.assertIsNone(
+            await self.repo.complete_task(task_id, OTHER_USER_ID)
+        )
+        self.assertEqual(await self.repo.get_completed_tasks_count(USER_ID), 1)
+
+        reactivated = await self.repo.reactivate_task(task_id, USER_ID)
+        self.assertFalse(reactivated['status'])
+        self.assertEqual(await self.repo.get_completed_tasks_count(USER_ID), 0)
+
+    async def test_hide(self):
+        task_ids = await self.add_numbered_tasks(3)
+        await self.repo.complete_task(task_ids[1], USER_ID)
+
+        self.assertFalse(await self.repo.hide_task(task_ids[0], OTHER_USER_ID))
+        self.assertTrue(await self.repo.hide_task(task_ids[1], USER_ID))
+
+        snapshot = await self.repo.get_tasks_list_snapshot(
+            USER_ID, include_completed=True
+        )
+        visible = [t['id'] for t in snapshot['tasks']]
+        self.assertNotIn(task_ids[1], visible)
+        self.assertEqual(snapshot['completed_count'], 0)
+        self.assertEqual(snapshot['active_count'], 2)
+
+    async def test_delete(self):
+        task_ids = await self.add_numbered_tasks(3)
+
+        self.assertFalse(
+            await self.repo.delete_task(task_ids[0], OTHER_USER_ID)
+        )
+        self.assertTrue(await self.repo.delete_task(task_ids[0], USER_ID))
+        self.assertFalse(await self.repo.delete_task(task_ids[0], USER_ID))
+        self.assertIsNone(await self.repo.get_task_by_id(task_ids[0], USER_ID))
+
+        deleted = await self.repo.delete_tasks(task_ids, USER_ID)
+        self.assertEqual(sorted(deleted), task_ids[1:])
+        self.assertEqual(await self.repo.get_user_tasks_count(USER_ID), 0)
+
+    async def test_search(self):
+        milk = await self.repo.add_task(USER_ID, "Купить молоко")
+        await self.repo.add_task(USER_ID, "Позвонить маме")
+        hidden = await self.repo.add_task(USER_ID, "Молоко для кота")
+        await self.repo.complete_task(hidden, USER_ID)
+        await self.repo.hide_task(hidden, USER_ID)
+        await self.repo.add_task(OTHER_USER_ID, "Молоко соседу")
+
+        found = await self.repo.search_tasks(USER_ID, "молоко")
+        self.assertEqual([t['id'] for t in found['tasks']], [milk])
+
+        substring = await self.repo.search_tasks(USER_ID, "звон")
+        self.assertEqual(len(substring['tasks']), 1)
+
+        nothing = await self.repo.search_tasks(USER_ID, "велосипед")
+        self.assertEqual(nothing['tasks'], [])
+
+        with self.assertRaises(ValueError):
+            await self.repo.search_tasks(USER_ID, "   ")
+
+    async def test_search_pagination(self):
+        await self.add_numbered_tasks(5)
+
+        first = await self.repo.search_tasks(USER_ID, "задача", limit=3)
+        self.assertEqual(len(first['tasks']), 3)
+        self.assertTrue(first['has_next'])
+
+        rest = await self.repo.search_tasks(
+            USER_ID, "задача", limit=3,
+            cursor=search_cursor_from_task(first['tasks'][-1])
+        )
+        self.assertEqual(len(rest['tasks']), 2)
+        self.assertFalse(rest['has_next'])
+        found = {t['id'] for t in first['tasks'] + rest['tasks']}
+        self.assertEqual(len(found), 5)
+
+    async def test_archive_moves_only_hidden_completed_tasks(self):
+        task_ids = await self.add_numbered_tasks(2)
+        self.assertFalse(await self.repo.hide_task(task_ids[0], USER_ID))
+        await self.repo.complete_task(task_ids[1], USER_ID)
+        await self.repo.hide_task(task_ids[1], USER_ID)
+
+        moved = await self.repo.archive_tasks_batch(30, 100)
+        self.assertEqual(moved, 1)
+
+        archive = await self.repo.get_archived_tasks(USER_ID)
+        self.assertEqual([t['id'] for t in archive['tasks']], [task_ids[1]])
+        self.assertIsNotNone(
+            await self.repo.get_task_by_id(task_ids[0], USER_ID)
+        )
+
+
+class InMemoryRepositoryTest(RepositoryContract,
+                             unittest.IsolatedAsyncioTestCase):
+
+    def make_repository(self):
+        return InMemoryTaskRepository()
+
+
+class SqliteRepositoryTest(RepositoryContract,
+                           unittest.IsolatedAsyncioTestCase):
+
+    def make_repository(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return SqliteTaskRepository(os.path.join(directory.name, "tasks.db"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Ответ на callback при приеме webhook фронтом воркеров
+
+Фронт (create_intake_app) ждет ответ воркера ограниченное время.
+Если он перестал ждать и ответил Telegram пустым ответом, ответ
+на callback не должен теряться: воркер отправляет его сам.
+
+Запуск: python -m pytest tests (или python -m unittest discover tests)
+"""
+import asyncio
+import unittest
+from unittest import mock
+
+import aiohttp
+from aiogram import Bot, Dispatcher
+from aiogram.methods import AnswerCallbackQuery
+from aiogram.types import CallbackQuery
+from aiohttp.test_utils import TestClient, TestServer
+
+from config import WEBHOOK_PATH
+from services import worker_pool
+from services.webhook import create_webhook_app
+from services.worker_pool import WorkerPool, create_intake_app
+
+SECRET = "test-secret"
+# Как долго фронт ждет ответ воркера в тестах, с
+REPLY_TIMEOUT = 0.2
+
+
+def callback_update(update_id: int) -> dict:
+    user = {"id": 7, "is_bot": False, "first_name": "User"}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": user,
+            "chat_instance": "7",
+            "data": "noop"
+        }
+    }
+
+
+class IntakeReplyTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        patcher = mock.patch.object(
+            worker_pool, 'WEBHOOK_REPLY_TIMEOUT', REPLY_TIMEOUT
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # Воркер: настоящий обработчик webhook, а вызовы Bot API
+        # вместо отправки записываются в sent
+        self.sent = []
+        self.bot = Bot("1:test")
+        dp = Dispatcher()
+
+        @dp.callback_query()
+        async def answer(callback: CallbackQuery):
+            return callback.answer("ok")
+
+        async def silent_call_request(bot, result):
+            self.sent.append(result)
+
+        dp.silent_call_request = silent_call_request
+
+        self.worker = TestServer(create_webhook_app(self.bot, dp, SECRET))
+        await self.worker.start_server()
+
+        self.pool = WorkerPool(1)
+        self.pool.secret = SECRET
+        self.channel = self.pool.channels[0]
+        self.channel.url = str(self.worker.make_url(WEBHOOK_PATH))
+        self.channel.headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+
+        self.front = TestClient(
+            TestServer(create_intake_app(self.pool, SECRET))
+        )
+        await self.front.start_server()
+        self.session = aiohttp.ClientSession()
+
+    async def asyncTearDown(self):
+        await self.channel.stop()
+        await self.session.close()
+        await self.front.close()
+        await self.worker.close()
+        await self.bot.session.close()
+
+    async def post_update(self, update: dict) -> bytes:
+        response = await self.front.post(
+            WEBHOOK_PATH,
+            json=update,
+            headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}
+        )
+        self.assertEqual(response.status, 200)
+        return await response.read()
+
+    async def test_answer_in_webhook_response(self):
+        self.channel.start(self.session)
+
+        body = await self.post_update(callback_update(1))
+
+        self.assertIn(b"answerCallbackQuery", body)
+        self.assertEqual(self.sent, [])
+
+    async def test_answer_sent_by_worker_after_front_timeout(self):
+        # Пересылка не запущена: обновление ждет в очереди, как при
+        # перезапуске воркера, и фронт отвечает Telegram без метода
+        body = await self.post_update(callback_update(2))
+        self.assertEqual(body, b"{}")
+
+        self.channel.start(self.session)
+        await asyncio.wait_for(self.channel.queue.join(), 5)
+        for _ in range(50):
+            if self.sent:
+                break
+            await asyncio.sleep(0.01)
+
+        self.assertEqual(len(self.sent), 1)
+        self.assertIsInstance(self.sent[0], AnswerCallbackQuery)
+        self.assertEqual(self.sent[0].callback_query_id, "2")
+
+
+if __name__ == "__main__":
+    unittest.main()
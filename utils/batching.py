@@ -0,0 +1,92 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+
+class MicroBatcher:
+    """
+    Объединение одиночных операций в пачки
+
+    Вызовы submit с одинаковым ключом (например, пулом БД) копятся
+    не дольше max_delay секунд или до max_size штук и выполняются
+    одним вызовом flush(key, items). flush должен вернуть результаты
+    в порядке items; каждый вызывающий получает свой результат,
+    а при ошибке — исключение всей пачки.
+    """
+
+    def __init__(
+            self,
+            flush: Callable[[Hashable, List[Any]], Awaitable[List[Any]]],
+            max_delay: float = 0.005,
+            max_size: int = 100
+    ):
+        self._flush = flush
+        self.max_delay = max_delay
+        self.max_size = max_size
+        self._pending: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self._running = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        """Добавление операции в пачку и ожидание ее результата"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        pending = self._pending.setdefault(key, [])
+        pending.append((item, future))
+
+        if len(pending) >= self.max_size:
+            self._start_flush(key)
+        elif len(pending) == 1:
+            self._timers[key] = loop.call_later(
+                self.max_delay, self._start_flush, key
+            )
+
+        return await future
+
+    def _start_flush(self, key: Hashable):
+        """Запуск выполнения накопленной пачки"""
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+
+        batch = self._pending.pop(key, None)
+        if batch:
+            task = asyncio.create_task(self._run(key, batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, key: Hashable, batch):
+        """Выполнение пачки и передача результатов вызывающим"""
+        self.batches += 1
+        self.items += len(batch)
+
+        try:
+            results = await self._flush(key, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self):
+        """Выполнение всех накопленных пачек (при остановке)"""
+        for key in list(self._pending):
+            self._start_flush(key)
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    def stats(self) -> Dict[str, float]:
+        """Количество пачек, операций и средний размер пачки"""
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': (
+                round(self.items / self.batches, 2) if self.batches else 0
+            )
+        }
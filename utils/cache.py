@@ -0,0 +1,183 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+# Маркер отсутствия значения (None — допустимое значение в кэше)
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    In-process LRU-кэш с ограничением времени жизни записей
+
+    Хранит не более maxsize записей: при переполнении вытесняется
+    давно не использованная. Записи старше ttl секунд считаются
+    отсутствующими. Не потокобезопасен — рассчитан на один event loop.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Получение значения с обновлением позиции в LRU"""
+        entry = self._data.get(key, _MISSING)
+
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Получение значения без обновления LRU и счетчиков"""
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING or entry[1] <= time.monotonic():
+            return default
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Сохранение значения с вытеснением самых старых записей"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """Удаление записи из кэша"""
+        self._data.pop(key, None)
+
+    def clear(self):
+        """Полная очистка кэша"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики попаданий, промахов и вытеснений"""
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
+class PerUserCache:
+    """
+    Ограниченный кэш, сгруппированный по пользователям
+
+    Позволяет сбросить все записи пользователя одним вызовом
+    (например, после изменения его задач). Общее число записей
+    не превышает max_entries: при переполнении целиком вытесняется
+    пользователь, к чьим записям дольше всего не обращались.
+    """
+
+    def __init__(
+            self,
+            max_entries: int = 10000,
+            max_entries_per_user: int = 8,
+            ttl: float = 300
+    ):
+        self.max_entries = max_entries
+        self.max_entries_per_user = max_entries_per_user
+        self.ttl = ttl
+        self._users: "OrderedDict[Hashable, OrderedDict]" = OrderedDict()
+        self._entries = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(
+            self,
+            user_id: Hashable,
+            key: Hashable,
+            default: Any = None
+    ) -> Any:
+        """Получение записи пользователя"""
+        entries = self._users.get(user_id)
+        entry = entries.get(key, _MISSING) if entries else _MISSING
+
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del entries[key]
+            self._entries -= 1
+            self.misses += 1
+            return default
+
+        self._users.move_to_end(user_id)
+        entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, user_id: Hashable, key: Hashable, value: Any):
+        """Сохранение записи пользователя"""
+        entries = self._users.get(user_id)
+        if entries is None:
+            entries = self._users[user_id] = OrderedDict()
+        elif key in entries:
+            self._entries -= 1
+
+        entries[key] = (value, time.monotonic() + self.ttl)
+        entries.move_to_end(key)
+        self._users.move_to_end(user_id)
+        self._entries += 1
+
+        # Ограничение на число записей одного пользователя
+        while len(entries) > self.max_entries_per_user:
+            entries.popitem(last=False)
+            self._entries -= 1
+            self.evictions += 1
+
+        # Общее ограничение: вытесняем пользователей целиком
+        while self._entries > self.max_entries and len(self._users) > 1:
+            _, evicted = self._users.popitem(last=False)
+            self._entries -= len(evicted)
+            self.evictions += len(evicted)
+
+    def invalidate_user(self, user_id: Hashable):
+        """Сброс всех записей пользователя"""
+        entries = self._users.pop(user_id, None)
+        if entries:
+            self._entries -= len(entries)
+            self.invalidations += 1
+
+    def clear(self):
+        """Полная очистка кэша"""
+        self._users.clear()
+        self._entries = 0
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики попаданий, промахов, вытеснений и сбросов"""
+        return {
+            'users': len(self._users),
+            'size': self._entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
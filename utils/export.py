@@ -0,0 +1,107 @@
+import codecs
+import csv
+import io
+import json
+from typing import AsyncIterator, BinaryIO, Dict, List
+
+from aiogram.types import InputFile
+
+# Колонки выгрузки в порядке вывода
+EXPORT_COLUMNS = (
+    'id', 'task_text', 'status', 'is_hidden', 'archived',
+    'created_at', 'completed_at'
+)
+
+EXPORT_FORMATS = ('csv', 'json')
+
+
+def _row_to_dict(row) -> Dict:
+    """Строка выгрузки с датами в ISO 8601"""
+    result = {}
+    for column in EXPORT_COLUMNS:
+        value = row[column]
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        result[column] = value
+    return result
+
+
+async def write_csv(batches: AsyncIterator[List], file: BinaryIO) -> int:
+    """
+    Потоковая запись задач в CSV
+
+    Каждая пачка строк форматируется и сразу записывается в файл,
+    поэтому в памяти не бывает больше одной пачки.
+
+    Returns:
+        Количество записанных задач
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM нужен, чтобы Excel открыл кириллицу в UTF-8
+    file.write(codecs.BOM_UTF8)
+    writer.writerow(EXPORT_COLUMNS)
+
+    count = 0
+    async for batch in batches:
+        for row in batch:
+            values = _row_to_dict(row)
+            writer.writerow([values[column] for column in EXPORT_COLUMNS])
+        count += len(batch)
+
+        file.write(buffer.getvalue().encode("utf-8"))
+        buffer.seek(0)
+        buffer.truncate()
+
+    file.write(buffer.getvalue().encode("utf-8"))
+    return count
+
+
+async def write_json(batches: AsyncIterator[List], file: BinaryIO) -> int:
+    """
+    Потоковая запись задач в JSON (массив объектов)
+
+    Returns:
+        Количество записанных задач
+    """
+    file.write(b"[")
+
+    count = 0
+    async for batch in batches:
+        chunk = []
+        for row in batch:
+            separator = ",\n" if count else "\n"
+            chunk.append(
+                separator
+                + json.dumps(_row_to_dict(row), ensure_ascii=False)
+            )
+            count += 1
+        file.write("".join(chunk).encode("utf-8"))
+
+    file.write(b"\n]\n")
+    return count
+
+
+EXPORT_WRITERS = {
+    'csv': write_csv,
+    'json': write_json
+}
+
+
+class SpooledInputFile(InputFile):
+    """
+    Файл для отправки в Telegram из открытого файлового объекта
+
+    В отличие от BufferedInputFile не требует держать содержимое
+    в памяти целиком: данные читаются частями при загрузке
+    (например, из tempfile.SpooledTemporaryFile).
+    """
+
+    def __init__(self, file: BinaryIO, filename: str, **kwargs):
+        super().__init__(filename=filename, **kwargs)
+        self.file = file
+
+    async def read(self, bot):
+        self.file.seek(0)
+        while chunk := self.file.read(self.chunk_size):
+            yield chunk
@@ -0,0 +1,209 @@
+import bisect
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Hashable, Optional, Sequence
+
+import asyncpg
+
+from utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Верхние границы корзин гистограммы задержек, мс
+LATENCY_BUCKETS = (
+    1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf')
+)
+
+
+class Histogram:
+    """
+    Гистограмма задержек с фиксированными корзинами
+
+    Память не растет с числом наблюдений; перцентили оцениваются
+    верхней границей корзины, в которую они попали.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """Учет одного наблюдения"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction: float) -> float:
+        """Оценка перцентиля (fraction от 0 до 1)"""
+        if not self.count:
+            return 0.0
+
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def stats(self) -> Dict[str, float]:
+        """Количество, среднее, p50/p95/p99 и максимум"""
+        return {
+            'count': self.count,
+            'avg': round(self.total / self.count, 2) if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': round(self.max, 2)
+        }
+
+
+class LatencyMetrics:
+    """Набор гистограмм задержек по меткам"""
+
+    def __init__(self):
+        self._histograms: Dict[Hashable, Histogram] = {}
+
+    def observe(self, label: Hashable, value: float):
+        """Учет задержки для метки"""
+        histogram = self._histograms.get(label)
+        if histogram is None:
+            histogram = self._histograms[label] = Histogram()
+        histogram.observe(value)
+
+    def stats(self) -> Dict[Hashable, Dict[str, float]]:
+        """Статистика всех меток, самые медленные по p99 — первыми"""
+        return dict(sorted(
+            ((label, histogram.stats())
+             for label, histogram in self._histograms.items()),
+            key=lambda item: item[1]['p99'],
+            reverse=True
+        ))
+
+
+def params_shape(args: Sequence) -> str:
+    """Типы и размеры параметров запроса без их значений"""
+    parts = []
+    for arg in args:
+        kind = type(arg).__name__
+        if isinstance(arg, (str, bytes, list, tuple)):
+            kind += f"[{len(arg)}]"
+        parts.append(kind)
+    return ", ".join(parts)
+
+
+class SlowQueryLog:
+    """
+    Журнал медленных запросов
+
+    Запрос дольше threshold_ms пишется в лог с текстом SQL и формой
+    параметров (значения не логируются). План EXPLAIN (ANALYZE, BUFFERS)
+    снимается для запроса не чаще раза в explain_interval секунд,
+    потому что ANALYZE выполняет запрос повторно.
+    """
+
+    def __init__(
+            self,
+            threshold_ms: Optional[float] = None,
+            explain_interval: float = 60,
+            keep: int = 50
+    ):
+        self.threshold_ms = threshold_ms
+        self.explain_interval = explain_interval
+        self.recent = deque(maxlen=keep)
+        self._explained_at: Dict[Hashable, float] = {}
+
+    def configure(
+            self,
+            threshold_ms: Optional[float],
+            explain_interval: float
+    ):
+        """Настройка порога (None или 0 — журнал выключен)"""
+        self.threshold_ms = threshold_ms or None
+        self.explain_interval = explain_interval
+
+    def is_slow(self, duration: float) -> bool:
+        """Превышает ли время запроса порог"""
+        return self.threshold_ms is not None and duration >= self.threshold_ms
+
+    def should_explain(self, label: Hashable) -> bool:
+        """Пора ли снять план запроса (с учетом интервала)"""
+        now = time.monotonic()
+        explained_at = self._explained_at.get(label)
+        if explained_at and now - explained_at < self.explain_interval:
+            return False
+        self._explained_at[label] = now
+        return True
+
+    def record(
+            self,
+            label: Hashable,
+            sql: str,
+            args: Sequence,
+            duration: float,
+            plan: Optional[str] = None
+    ):
+        """Запись медленного запроса в журнал и лог"""
+        entry = {
+            'label': label,
+            'duration_ms': round(duration, 2),
+            'sql': " ".join(sql.split()),
+            'params': params_shape(args),
+            'plan': plan
+        }
+        self.recent.append(entry)
+
+        message = (
+            f"Медленный запрос {label}: {entry['duration_ms']} мс\n"
+            f"SQL: {entry['sql']}\nПараметры: {entry['params']}"
+        )
+        if plan:
+            message += f"\nПлан:\n{plan}"
+        logger.warning(message)
+
+
+# Время выполнения запросов по имени запроса (метод Database)
+QUERY_LATENCY = LatencyMetrics()
+
+# Время ожидания свободного соединения в пуле
+POOL_ACQUIRE_WAIT = Histogram()
+
+# Журнал медленных запросов (включается в Database.create_pool)
+SLOW_QUERIES = SlowQueryLog()
+
+
+def elapsed_ms(started: float) -> float:
+    """Миллисекунды, прошедшие с отметки time.perf_counter()"""
+    return (time.perf_counter() - started) * 1000
+
+
+@contextmanager
+def observe_query(label: Hashable, sql: str, args: Sequence = ()):
+    """
+    Замер времени запроса, не входящего в реестр STATEMENTS
+
+    Медленные запросы попадают в журнал без плана: такие запросы
+    (обслуживание, пакетные изменения) не стоит выполнять повторно.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = elapsed_ms(started)
+        QUERY_LATENCY.observe(label, duration)
+        if SLOW_QUERIES.is_slow(duration):
+            SLOW_QUERIES.record(label, sql, args, duration)
+
+
+@asynccontextmanager
+async def acquire(pool: asyncpg.Pool):
+    """pool.acquire() с учетом времени ожидания соединения"""
+    started = time.perf_counter()
+    async with pool.acquire() as connection:
+        POOL_ACQUIRE_WAIT.observe(elapsed_ms(started))
+        yield connection
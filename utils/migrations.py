@@ -0,0 +1,203 @@
+import re
+from pathlib import Path
+from typing import List, Set, Tuple
+
+import asyncpg
+
+from utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+# Ключ advisory-блокировки: не дает нескольким репликам
+# применять миграции одновременно
+MIGRATIONS_LOCK_KEY = 0x746F646F  # 'todo'
+
+# Первая строка миграции, которую нужно выполнять вне транзакции
+# (CREATE INDEX CONCURRENTLY и другие команды, запрещенные в транзакции)
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+
+# Имя индекса в CREATE INDEX CONCURRENTLY [IF NOT EXISTS] имя
+CONCURRENT_INDEX_NAME = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+"
+    r"(?:IF\s+NOT\s+EXISTS\s+)?(\w+)",
+    re.IGNORECASE
+)
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(255) PRIMARY KEY,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def list_migrations() -> List[Tuple[str, Path]]:
+    """
+    Получение списка файлов миграций
+
+    Returns:
+        Список пар (версия, путь), отсортированный по версии.
+        Версия — имя файла без расширения, например
+        20250730_add_is_hidden_column
+    """
+    return sorted(
+        (path.stem, path) for path in MIGRATIONS_DIR.glob("*.sql")
+    )
+
+
+def get_latest_version() -> str:
+    """Получение версии последней известной миграции"""
+    migrations = list_migrations()
+    return migrations[-1][0] if migrations else ""
+
+
+async def get_applied_versions(conn: asyncpg.Connection) -> Set[str]:
+    """Получение множества примененных версий"""
+    table_exists = await conn.fetchval(
+        "SELECT to_regclass('public.schema_migrations') IS NOT NULL"
+    )
+    if not table_exists:
+        return set()
+
+    rows = await conn.fetch("SELECT version FROM schema_migrations")
+    return {row['version'] for row in rows}
+
+
+async def get_pending_migrations(
+        conn: asyncpg.Connection
+) -> List[Tuple[str, Path]]:
+    """Получение списка еще не примененных миграций"""
+    applied = await get_applied_versions(conn)
+    return [
+        (version, path)
+        for version, path in list_migrations()
+        if version not in applied
+    ]
+
+
+def is_non_transactional(sql_script: str) -> bool:
+    """Миграция помечена для выполнения вне транзакции"""
+    lines = sql_script.lstrip().splitlines()
+    return bool(lines) and lines[0].strip() == NO_TRANSACTION_MARKER
+
+
+def split_statements(sql_script: str) -> List[str]:
+    """
+    Разбиение миграции на отдельные команды
+
+    Команда заканчивается строкой, которая завершается ';'. Достаточно
+    для простых DDL-команд; тела функций ($$ ... $$) в миграциях
+    вне транзакции не поддерживаются.
+    """
+    statements, current = [], []
+    for line in sql_script.splitlines():
+        skip = not line.strip() or line.lstrip().startswith('--')
+        if skip and not current:
+            continue
+        current.append(line)
+        if line.rstrip().endswith(';'):
+            statements.append("\n".join(current))
+            current = []
+    if current and "".join(current).strip():
+        statements.append("\n".join(current))
+    return statements
+
+
+def concurrent_index_names(sql_script: str) -> List[str]:
+    """Индексы, которые миграция строит с CREATE INDEX CONCURRENTLY"""
+    without_comments = re.sub(r"--[^\n]*", "", sql_script)
+    return [
+        match.group(1).lower()
+        for match in CONCURRENT_INDEX_NAME.finditer(without_comments)
+    ]
+
+
+async def apply_non_transactional(
+        conn: asyncpg.Connection,
+        version: str,
+        sql_script: str
+):
+    """
+    Выполнение миграции вне транзакции, по одной команде
+
+    Команды такой миграции должны быть идемпотентными (IF NOT EXISTS):
+    если выполнение прервалось, версия не записывается и при повторном
+    запуске миграция выполняется с начала. Прерванный CREATE INDEX
+    CONCURRENTLY оставляет недостроенный индекс, который IF NOT EXISTS
+    пропустил бы, поэтому версия не записывается, пока недостроен
+    какой-либо из индексов этой миграции.
+
+    Raises:
+        RuntimeError: если индекс миграции недостроен (INVALID)
+    """
+    for statement in split_statements(sql_script):
+        await conn.execute(statement)
+
+    invalid = await conn.fetch(
+        """
+        SELECT index.indexrelid::regclass::text AS name
+        FROM pg_index AS index
+        JOIN pg_class AS class ON class.oid = index.indexrelid
+        WHERE NOT index.indisvalid
+          AND class.relname = ANY($1::TEXT[])
+          AND pg_table_is_visible(class.oid)
+        """,
+        concurrent_index_names(sql_script)
+    )
+    if invalid:
+        names = ', '.join(row['name'] for row in invalid)
+        raise RuntimeError(
+            f"Миграция {version}: недостроенные индексы {names}. "
+            f"Удалите их (DROP INDEX CONCURRENTLY) и повторите"
+        )
+
+    await conn.execute(
+        "INSERT INTO schema_migrations (version) VALUES ($1)", version
+    )
+
+
+async def apply_migrations(conn: asyncpg.Connection) -> List[str]:
+    """
+    Применение всех неприменённых миграций по порядку
+
+    Выполняется под advisory-блокировкой, каждая миграция — в отдельной
+    транзакции вместе с записью в schema_migrations. Миграции
+    с NO_TRANSACTION_MARKER выполняются по одной команде вне транзакции.
+
+    Returns:
+        Список примененных версий
+    """
+    applied_now = []
+
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATIONS_LOCK_KEY)
+    try:
+        await conn.execute(CREATE_MIGRATIONS_TABLE)
+
+        # Список перечитывается под блокировкой: другая реплика
+        # могла применить миграции, пока мы ждали
+        for version, path in await get_pending_migrations(conn):
+            sql_script = path.read_text(encoding="utf-8")
+
+            if is_non_transactional(sql_script):
+                await apply_non_transactional(conn, version, sql_script)
+                applied_now.append(version)
+                logger.info(f"Применена миграция {version} (вне транзакции)")
+                continue
+
+            async with conn.transaction():
+                await conn.execute(sql_script)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version) VALUES ($1)",
+                    version
+                )
+
+            applied_now.append(version)
+            logger.info(f"Применена миграция {version}")
+    finally:
+        await conn.execute(
+            "SELECT pg_advisory_unlock($1)", MIGRATIONS_LOCK_KEY
+        )
+
+    return applied_now
@@ -0,0 +1,94 @@
+import base64
+import binascii
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Tuple
+
+# Курсор keyset-пагинации: (status, created_at, id) последней/первой
+# задачи на странице. В callback_data передается в виде непрозрачной
+# строки, чтобы уложиться в лимит Telegram в 64 байта
+Cursor = Tuple[bool, datetime, int]
+
+# Курсор результатов поиска: (rank, id) последней/первой задачи
+SearchCursor = Tuple[float, int]
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_CURSOR_FORMAT = ">?qq"
+_SEARCH_CURSOR_FORMAT = ">dq"
+
+
+def _pack(cursor_format: str, *values) -> str:
+    """Упаковка значений в строку urlsafe base64 без выравнивания"""
+    raw = struct.pack(cursor_format, *values)
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _unpack(cursor_format: str, value: str) -> tuple:
+    """Распаковка строки из _pack (ValueError при ошибке)"""
+    try:
+        padding = "=" * (-len(value) % 4)
+        raw = base64.urlsafe_b64decode(value + padding)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Некорректный курсор: {value}") from e
+
+    if len(raw) != struct.calcsize(cursor_format):
+        raise ValueError(f"Некорректный курсор: {value}")
+
+    return struct.unpack(cursor_format, raw)
+
+
+def cursor_from_task(task: Dict) -> Cursor:
+    """Получение курсора из строки задачи"""
+    return task['status'], task['created_at'], task['id']
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    """
+    Кодирование курсора в строку для callback_data
+
+    Args:
+        cursor: кортеж (status, created_at, id)
+
+    Returns:
+        Строка в urlsafe base64 без выравнивания
+    """
+    status, created_at, task_id = cursor
+
+    # Если datetime naive, считаем его UTC
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+
+    micros = (created_at - _EPOCH) // timedelta(microseconds=1)
+    return _pack(_CURSOR_FORMAT, bool(status), micros, task_id)
+
+
+def decode_cursor(value: str) -> Cursor:
+    """
+    Декодирование курсора из callback_data
+
+    Raises:
+        ValueError: если строка не является корректным курсором
+    """
+    status, micros, task_id = _unpack(_CURSOR_FORMAT, value)
+    return status, _EPOCH + timedelta(microseconds=micros), task_id
+
+
+def search_cursor_from_task(task: Dict) -> SearchCursor:
+    """Получение курсора поиска из найденной задачи"""
+    return task['rank'], task['id']
+
+
+def encode_search_cursor(cursor: SearchCursor) -> str:
+    """Кодирование курсора поиска в строку для callback_data"""
+    rank, task_id = cursor
+    return _pack(_SEARCH_CURSOR_FORMAT, rank, task_id)
+
+
+def decode_search_cursor(value: str) -> SearchCursor:
+    """
+    Декодирование курсора поиска из callback_data
+
+    Raises:
+        ValueError: если строка не является корректным курсором
+    """
+    return _unpack(_SEARCH_CURSOR_FORMAT, value)
@@ -0,0 +1,16 @@
+import zlib
+
+# Шаг последовательности tasks_id_seq на каждом шарде: шард k выдает
+# id вида k + 1 + MAX_SHARDS * n, поэтому id задач уникальны между
+# шардами и сохраняются при переносе пользователя
+MAX_SHARDS = 32
+
+
+def shard_for_user(user_id: int, shard_count: int) -> int:
+    """
+    Шард пользователя по умолчанию (без записи в карте шардов)
+
+    Используется crc32, а не hash(): результат не должен зависеть
+    от процесса и версии Python
+    """
+    return zlib.crc32(str(user_id).encode("ascii")) % shard_count
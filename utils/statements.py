@@ -0,0 +1,518 @@
+import json
+import time
+from itertools import product
+from typing import Dict, Iterable, Optional, Tuple
+
+import asyncpg
+from asyncpg.exceptions import (
+    InvalidCachedStatementError,
+    OutdatedSchemaCacheError
+)
+
+from utils.logging_config import get_logger
+from utils.metrics import QUERY_LATENCY, SLOW_QUERIES, elapsed_ms
+from utils.pagination import Cursor
+
+logger = get_logger(__name__)
+
+
+def tasks_page_clause(
+        include_completed: bool,
+        has_cursor: bool,
+        backward: bool,
+        first_param: int
+) -> Tuple[str, str]:
+    """
+    Условие и сортировка для страницы списка задач
+
+    Страница строится по ключу (status, created_at, id): сначала активные,
+    затем выполненные, внутри группы — от новых к старым. Вместо OFFSET
+    используется сравнение с курсором, поэтому стоимость выборки
+    не зависит от глубины страницы.
+
+    Returns:
+        Кортеж (условие WHERE, ORDER BY); параметры курсора
+        (см. tasks_page_params) начинаются с номера first_param
+    """
+    conditions = ["is_hidden = FALSE"]
+
+    if not include_completed:
+        conditions.append("status = FALSE")
+
+    if has_cursor:
+        n = first_param
+        key_op = ">" if backward else "<"
+
+        if include_completed:
+            status_op = "<" if backward else ">"
+            conditions.append(
+                f"(status {status_op} ${n} OR (status = ${n} "
+                f"AND (created_at, id) {key_op} (${n + 1}, ${n + 2})))"
+            )
+        else:
+            conditions.append(f"(created_at, id) {key_op} (${n}, ${n + 1})")
+
+    if backward:
+        order = "status DESC, created_at ASC, id ASC"
+    else:
+        order = "status ASC, created_at DESC, id DESC"
+
+    return " AND ".join(conditions), order
+
+
+def tasks_page_params(
+        include_completed: bool,
+        cursor: Optional[Cursor]
+) -> list:
+    """Параметры курсора для условия из tasks_page_clause"""
+    if cursor is None:
+        return []
+    status, created_at, task_id = cursor
+    if include_completed:
+        return [status, created_at, task_id]
+    return [created_at, task_id]
+
+
+def page_statement(
+        kind: str,
+        include_completed: bool,
+        has_cursor: bool,
+        backward: bool
+) -> str:
+    """Имя варианта запроса страницы задач в реестре"""
+    return (
+        f"{kind}:{'all' if include_completed else 'active'}"
+        f":{'cursor' if has_cursor else 'first'}"
+        f":{'backward' if backward else 'forward'}"
+    )
+
+
+TASKS_PAGE = """
+SELECT id, task_text, status, created_at, completed_at, is_hidden
+FROM tasks
+WHERE user_id = $1 AND {condition}
+ORDER BY {order}
+LIMIT $2
+"""
+
+# Страница вместе со счетчиками и часовым поясом. Если задач нет,
+# LEFT JOIN вернет одну строку с NULL в полях задачи
+TASKS_SNAPSHOT = """
+WITH page AS (
+    SELECT id, task_text, status, created_at, completed_at, is_hidden
+    FROM tasks
+    WHERE user_id = $1 AND {condition}
+    ORDER BY {order}
+    LIMIT $2
+)
+SELECT
+    COALESCE(counters.active_count, 0) AS active_count,
+    COALESCE(counters.completed_count, 0) AS completed_count,
+    COALESCE(users.timezone, 'UTC') AS timezone,
+    page.id, page.task_text, page.status,
+    page.created_at, page.completed_at, page.is_hidden
+FROM (SELECT $1::BIGINT AS user_id) AS me
+LEFT JOIN user_task_counters AS counters
+    ON counters.user_id = me.user_id
+LEFT JOIN users ON users.user_id = me.user_id
+LEFT JOIN page ON TRUE
+ORDER BY page.status ASC, page.created_at DESC, page.id DESC
+"""
+
+# Поиск задач пользователя ($2 — запрос, $3 — шаблон ILIKE):
+# полнотекстовый по to_tsvector('russian', task_text) (то же выражение,
+# что в индексе idx_tasks_user_search) и нечеткий/по подстроке через
+# pg_trgm. Результаты ранжируются суммой ts_rank и word_similarity
+SEARCH_TASKS = """
+WITH found AS (
+    SELECT
+        tasks.id, tasks.task_text, tasks.status,
+        tasks.created_at, tasks.completed_at, tasks.is_hidden,
+        (
+            ts_rank(to_tsvector('russian', tasks.task_text), q.query)
+            + word_similarity($2, tasks.task_text)
+        )::FLOAT8 AS rank
+    FROM tasks, websearch_to_tsquery('russian', $2) AS q(query)
+    WHERE tasks.user_id = $1
+      AND tasks.is_hidden = FALSE
+      AND (
+          to_tsvector('russian', tasks.task_text) @@ q.query
+          OR $2 <% tasks.task_text
+          OR tasks.task_text ILIKE $3
+      )
+)
+SELECT id, task_text, status, created_at, completed_at, is_hidden, rank
+FROM found
+{condition}
+ORDER BY {order}
+LIMIT $4
+"""
+
+
+def contains_pattern(text: str) -> str:
+    """Шаблон ILIKE для поиска подстроки (спецсимволы экранируются)"""
+    escaped = (
+        text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    )
+    return f"%{escaped}%"
+
+
+def search_statement(has_cursor: bool, backward: bool) -> str:
+    """Имя варианта поискового запроса в реестре"""
+    return (
+        f"search_tasks:{'cursor' if has_cursor else 'first'}"
+        f":{'backward' if backward else 'forward'}"
+    )
+
+
+def _search_statements() -> Dict[str, str]:
+    """Все варианты поискового запроса: от лучших совпадений к худшим"""
+    statements = {}
+    for has_cursor, backward in product((False, True), repeat=2):
+        condition = ""
+        if has_cursor:
+            key_op = ">" if backward else "<"
+            condition = f"WHERE (rank, id) {key_op} ($5, $6)"
+        order = "rank ASC, id ASC" if backward else "rank DESC, id DESC"
+        statements[search_statement(has_cursor, backward)] = (
+            SEARCH_TASKS.format(condition=condition, order=order)
+        )
+    return statements
+
+
+# Обертка для UPDATE задачи ($1 — id, $2 — user_id): возвращает
+# обновленную строку вместе с часовым поясом пользователя, чтобы
+# обработчику не нужно было заново читать задачу для отрисовки
+TASK_WITH_TIMEZONE = """
+WITH updated AS (
+    {update}
+    RETURNING id, task_text, status, created_at, completed_at
+)
+SELECT
+    updated.id, updated.task_text, updated.status,
+    updated.created_at, updated.completed_at,
+    COALESCE(users.timezone, 'UTC') AS timezone
+FROM updated
+LEFT JOIN users ON users.user_id = $2
+"""
+
+# Запросы только на чтение (их можно готовить и на реплике)
+READ_STATEMENTS: Dict[str, str] = {
+    'get_task_by_id': """
+        SELECT id, task_text, status, created_at, completed_at
+        FROM tasks
+        WHERE id = $1 AND user_id = $2
+    """,
+    'count_active_tasks': """
+        SELECT active_count FROM user_task_counters WHERE user_id = $1
+    """,
+    'count_all_tasks': """
+        SELECT active_count + completed_count + hidden_count
+        FROM user_task_counters
+        WHERE user_id = $1
+    """,
+    'count_completed_tasks': """
+        SELECT completed_count FROM user_task_counters WHERE user_id = $1
+    """,
+    'get_archived_tasks': """
+        SELECT
+            id, task_text, status, is_hidden, created_at, completed_at,
+            COUNT(*) OVER () AS total
+        FROM tasks_archive
+        WHERE user_id = $1
+        ORDER BY completed_at DESC NULLS LAST, id DESC
+        LIMIT $2
+    """,
+    'get_user_timezone': "SELECT timezone FROM users WHERE user_id = $1",
+    'get_shard_map_entry': """
+        SELECT shard, locked FROM user_shards WHERE user_id = $1
+    """,
+    'get_locked_shard_users': """
+        SELECT user_id FROM user_shards WHERE locked = TRUE
+    """
+}
+
+
+def _page_statements() -> Dict[str, str]:
+    """Все варианты запросов страницы задач"""
+    statements = {}
+    for kind, template in (('tasks_page', TASKS_PAGE),
+                           ('tasks_snapshot', TASKS_SNAPSHOT)):
+        for include_completed, has_cursor, backward in product(
+                (False, True), repeat=3
+        ):
+            condition, order = tasks_page_clause(
+                include_completed, has_cursor, backward, first_param=3
+            )
+            name = page_statement(
+                kind, include_completed, has_cursor, backward
+            )
+            statements[name] = template.format(
+                condition=condition, order=order
+            )
+    return statements
+
+
+READ_STATEMENTS.update(_page_statements())
+READ_STATEMENTS.update(_search_statements())
+
+WRITE_STATEMENTS: Dict[str, str] = {
+    'add_task': """
+        INSERT INTO tasks (user_id, task_text)
+        VALUES ($1, $2)
+        RETURNING id
+    """,
+    # Пачка задач от разных пользователей (см. Database.add_task)
+    'add_tasks_batch': """
+        INSERT INTO tasks (user_id, task_text)
+        SELECT batch.user_id, batch.task_text
+        FROM unnest($1::BIGINT[], $2::TEXT[]) WITH ORDINALITY
+            AS batch(user_id, task_text, position)
+        ORDER BY batch.position
+        RETURNING id, user_id, task_text
+    """,
+    'complete_task': TASK_WITH_TIMEZONE.format(update="""
+        UPDATE tasks
+        SET status = TRUE, completed_at = CURRENT_TIMESTAMP
+        WHERE id = $1 AND user_id = $2 AND status = FALSE
+    """),
+    'reactivate_task': TASK_WITH_TIMEZONE.format(update="""
+        UPDATE tasks
+        SET status = FALSE, completed_at = NULL
+        WHERE id = $1 AND user_id = $2 AND status = TRUE
+    """),
+    'update_task': TASK_WITH_TIMEZONE.format(update="""
+        UPDATE tasks
+        SET task_text = $3
+        WHERE id = $1 AND user_id = $2 AND status = FALSE
+    """),
+    'delete_task': """
+        DELETE FROM tasks WHERE id = $1 AND user_id = $2 RETURNING id
+    """,
+    'hide_task': """
+        UPDATE tasks
+        SET is_hidden = TRUE
+        WHERE id = $1 AND user_id = $2 AND status = TRUE
+        RETURNING id
+    """,
+    'complete_tasks': """
+        UPDATE tasks
+        SET status = TRUE, completed_at = CURRENT_TIMESTAMP
+        WHERE id = ANY($1::INTEGER[]) AND user_id = $2 AND status = FALSE
+        RETURNING id
+    """,
+    'hide_tasks': """
+        UPDATE tasks
+        SET is_hidden = TRUE
+        WHERE id = ANY($1::INTEGER[])
+          AND user_id = $2
+          AND status = TRUE
+          AND is_hidden = FALSE
+        RETURNING id
+    """,
+    'delete_tasks': """
+        DELETE FROM tasks
+        WHERE id = ANY($1::INTEGER[]) AND user_id = $2
+        RETURNING id
+    """,
+    'set_user_timezone': """
+        INSERT INTO users (user_id, timezone, updated_at)
+        VALUES ($1, $2, CURRENT_TIMESTAMP)
+        ON CONFLICT (user_id)
+        DO UPDATE SET
+            timezone = EXCLUDED.timezone,
+            updated_at = CURRENT_TIMESTAMP
+    """
+}
+
+FSM_STATE_FRESH = (
+    "fsm.updated_at > CURRENT_TIMESTAMP - make_interval(secs => $6)"
+)
+
+FSM_UPSERT = """
+    INSERT INTO fsm_states AS fsm
+        (bot_id, chat_id, user_id, thread_id, destiny, {column})
+    VALUES ($1, $2, $3, $4, $5, $7)
+    ON CONFLICT (bot_id, chat_id, user_id, thread_id, destiny)
+    DO UPDATE SET
+        {column} = {value},
+        {other} = CASE WHEN {fresh} THEN fsm.{other} ELSE {empty} END,
+        updated_at = CURRENT_TIMESTAMP
+    RETURNING {returning}
+"""
+
+# FSM-состояния (services/fsm_storage.py): ключ — $1..$5, время жизни
+# состояния в секундах — $6. Устаревшая, но еще не удаленная запись
+# читается как пустая. Таблица UNLOGGED недоступна на реплике,
+# поэтому запросы только в этом реестре
+WRITE_STATEMENTS.update({
+    # expires_in — сколько секунд записи осталось до устаревания
+    'fsm_get_state': f"""
+        SELECT
+            state,
+            data,
+            ($6 - EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - fsm.updated_at))
+                ::FLOAT8 AS expires_in
+        FROM fsm_states AS fsm
+        WHERE bot_id = $1 AND chat_id = $2 AND user_id = $3
+          AND thread_id = $4 AND destiny = $5
+          AND {FSM_STATE_FRESH}
+    """,
+    'fsm_set_state': FSM_UPSERT.format(
+        column="state", value="EXCLUDED.state",
+        other="data", empty="'{}'::JSONB",
+        fresh=FSM_STATE_FRESH, returning="data"
+    ),
+    'fsm_set_data': FSM_UPSERT.format(
+        column="data", value="EXCLUDED.data",
+        other="state", empty="NULL",
+        fresh=FSM_STATE_FRESH, returning="state"
+    ),
+    # Слияние на стороне БД: data || $7, как dict.update
+    'fsm_update_data': FSM_UPSERT.format(
+        column="data",
+        value=f"CASE WHEN {FSM_STATE_FRESH} "
+              "THEN fsm.data || EXCLUDED.data ELSE EXCLUDED.data END",
+        other="state", empty="NULL",
+        fresh=FSM_STATE_FRESH, returning="state, data"
+    ),
+    'fsm_delete_expired': """
+        WITH deleted AS (
+            DELETE FROM fsm_states
+            WHERE updated_at <= CURRENT_TIMESTAMP - make_interval(secs => $1)
+               OR (state IS NULL AND data = '{}'::JSONB)
+            RETURNING 1
+        )
+        SELECT COUNT(*) FROM deleted
+    """
+})
+
+# Реестр именованных запросов горячего пути обработчиков
+STATEMENTS: Dict[str, str] = {**READ_STATEMENTS, **WRITE_STATEMENTS}
+
+
+class _ExplainRollback(Exception):
+    """Откат транзакции после EXPLAIN ANALYZE"""
+
+
+class StatementConnection(asyncpg.Connection):
+    """
+    Соединение с подготовленными запросами из реестра STATEMENTS
+
+    Запрос готовится один раз на соединение (обычно заранее,
+    в init-хуке пула) и дальше выполняется без разбора и планирования.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._statements = {}
+
+    async def prepare_statement(self, name: str):
+        """Получение подготовленного запроса по имени"""
+        statement = self._statements.get(name)
+        if statement is None:
+            statement = await self.prepare(STATEMENTS[name])
+            self._statements[name] = statement
+        return statement
+
+    async def _execute_statement(self, method: str, name: str, args):
+        """Выполнение запроса с повторной подготовкой после смены схемы"""
+        statement = await self.prepare_statement(name)
+        try:
+            return await getattr(statement, method)(*args)
+        except (InvalidCachedStatementError, OutdatedSchemaCacheError):
+            # План устарел после миграции: готовим запрос заново
+            self._statements.pop(name, None)
+            statement = await self.prepare_statement(name)
+            return await getattr(statement, method)(*args)
+
+    async def _run_statement(self, method: str, name: str, args):
+        """Выполнение запроса с замером времени и журналом медленных"""
+        started = time.perf_counter()
+        try:
+            result = await self._execute_statement(method, name, args)
+        finally:
+            duration = elapsed_ms(started)
+            QUERY_LATENCY.observe(name, duration)
+
+        if SLOW_QUERIES.is_slow(duration):
+            plan = None
+            if SLOW_QUERIES.should_explain(name):
+                plan = await self.explain_analyze(STATEMENTS[name], args)
+            SLOW_QUERIES.record(name, STATEMENTS[name], args, duration, plan)
+        return result
+
+    async def explain_analyze(self, sql: str, args) -> str:
+        """
+        План запроса EXPLAIN (ANALYZE, BUFFERS)
+
+        ANALYZE выполняет запрос повторно, поэтому он запускается
+        в транзакции (или точке сохранения), которая откатывается.
+        """
+        rows = []
+        try:
+            async with self.transaction():
+                rows = await self.fetch(
+                    f"EXPLAIN (ANALYZE, BUFFERS) {sql}", *args
+                )
+                raise _ExplainRollback()
+        except _ExplainRollback:
+            pass
+        except Exception as e:
+            return f"EXPLAIN не выполнен: {e}"
+        return "\n".join(row[0] for row in rows)
+
+    async def fetch_statement(self, name: str, *args):
+        return await self._run_statement('fetch', name, args)
+
+    async def fetchrow_statement(self, name: str, *args):
+        return await self._run_statement('fetchrow', name, args)
+
+    async def fetchval_statement(self, name: str, *args):
+        return await self._run_statement('fetchval', name, args)
+
+
+async def setup_codecs(conn: asyncpg.Connection):
+    """Кодеки типов: json/jsonb передаются как объекты Python"""
+    for type_name in ('json', 'jsonb'):
+        await conn.set_type_codec(
+            type_name,
+            encoder=json.dumps,
+            decoder=json.loads,
+            schema='pg_catalog'
+        )
+
+
+def make_connection_init(names: Iterable[str]):
+    """
+    Создание init-хука пула
+
+    Хук выполняется для каждого нового соединения: настраивает
+    кодеки и заранее готовит запросы names, чтобы первые запросы
+    после деплоя или роста пула не платили за подготовку.
+    """
+    names = tuple(names)
+
+    async def init_connection(conn: StatementConnection):
+        await setup_codecs(conn)
+        for name in names:
+            await conn.prepare_statement(name)
+
+    return init_connection
+
+
+async def create_statement_pool(
+        names: Iterable[str],
+        **kwargs
+) -> asyncpg.Pool:
+    """Создание пула с подготовкой запросов names на каждом соединении"""
+    pool = await asyncpg.create_pool(
+        connection_class=StatementConnection,
+        init=make_connection_init(names),
+        **kwargs
+    )
+    logger.info(
+        f"Пул подключений готов: min_size={pool.get_min_size()}, "
+        f"max_size={pool.get_max_size()}"
+    )
+    return pool
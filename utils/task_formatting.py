@@ -1,5 +1,11 @@
+import html
+from typing import Optional
+
 from utils.timezone_utils import format_datetime_for_user
 
+# Максимальная длина текста сообщения Telegram
+MESSAGE_MAX_LENGTH = 4096
+
 
 async def format_task_detail_text(
         task: dict,
@@ -29,9 +35,21 @@ async def format_task_detail_text(
 def format_tasks_list_text(
     tasks: list,
     user_timezone: str = 'UTC',
-    show_completed: bool = False
+    show_completed: bool = False,
+    active_count: Optional[int] = None,
+    completed_count: Optional[int] = None,
+    offset: int = 0
 ) -> str:
-    """Форматирование текста списка задач"""
+    """
+    Форматирование текста списка задач
+
+    Args:
+        tasks: задачи текущей страницы
+        active_count, completed_count: количество задач у пользователя
+            для заголовка (None — считать по странице)
+        offset: сколько задач в списке перед страницей, чтобы нумерация
+            продолжалась на следующих страницах
+    """
     if not tasks:
         if show_completed:
             return """📋 <b>Список задач</b>
@@ -50,16 +68,21 @@ def format_tasks_list_text(
     active_tasks = [task for task in tasks if not task['status']]
     completed_tasks = [task for task in tasks if task['status']]
 
+    if active_count is None:
+        active_count = len(active_tasks)
+    if completed_count is None:
+        completed_count = len(completed_tasks)
+
     if show_completed:
-        total_count = len(tasks)
+        total_count = active_count + completed_count
         header = f"📋 <b>Все задачи ({total_count})</b>"
-        if len(active_tasks) > 0 and len(completed_tasks) > 0:
+        if active_count > 0 and completed_count > 0:
             header += (
-                f"\n<i>Активных: {len(active_tasks)}, "
-                f"выполненных: {len(completed_tasks)}</i>"
+                f"\n<i>Активных: {active_count}, "
+                f"выполненных: {completed_count}</i>"
             )
     else:
-        header = f"📋 <b>Активные задачи ({len(active_tasks)})</b>"
+        header = f"📋 <b>Активные задачи ({active_count})</b>"
 
     tasks_text = header + "\n\n"
 
@@ -68,7 +91,7 @@ def format_tasks_list_text(
         if show_completed and completed_tasks:
             tasks_text += "<b>⏳ Активные:</b>\n"
 
-        for i, task in enumerate(active_tasks, 1):
+        for i, task in enumerate(active_tasks, offset + 1):
             created_date = format_datetime_for_user(
                 task['created_at'], user_timezone
             ).split(' в ')[0]
@@ -85,7 +108,9 @@ def format_tasks_list_text(
         if active_tasks:
             tasks_text += "<b>✅ Выполненные:</b>\n"
 
-        for i, task in enumerate(completed_tasks, len(active_tasks) + 1):
+        for i, task in enumerate(
+            completed_tasks, offset + len(active_tasks) + 1
+        ):
             created_date = format_datetime_for_user(
                 task['created_at'], user_timezone
             ).split(' в ')[0]
@@ -108,3 +133,104 @@ def format_tasks_list_text(
 
     tasks_text += "👇 <i>Нажми на задачу для подробного просмотра</i>"
     return tasks_text
+
+
+def format_archive_text(
+    tasks: list,
+    total: int,
+    user_timezone: str = 'UTC'
+) -> str:
+    """Форматирование текста архива задач"""
+    if not tasks:
+        return """🗄 <b>Архив задач</b>
+
+Архив пока пуст.
+
+<i>Сюда попадают скрытые задачи и задачи, выполненные давно</i>"""
+
+    tasks_text = f"🗄 <b>Архив задач ({total})</b>\n\n"
+
+    for i, task in enumerate(tasks, 1):
+        status_emoji = "✅" if task['status'] else "⏳"
+
+        task_text = task['task_text']
+        if len(task_text) > 60:
+            task_text = task_text[:57] + "..."
+
+        tasks_text += f"{i}. {status_emoji} <i>{task_text}</i>\n"
+        if task['completed_at']:
+            completed_date = format_datetime_for_user(
+                task['completed_at'], user_timezone
+            ).split(' в ')[0]
+            tasks_text += f"   ✅ {completed_date}\n"
+        tasks_text += "\n"
+
+    if total > len(tasks):
+        tasks_text += f"<i>Показаны последние {len(tasks)} из {total}</i>"
+
+    return tasks_text.rstrip()
+
+
+def format_search_results_text(
+    tasks: list,
+    query: str,
+    user_timezone: str = 'UTC'
+) -> str:
+    """Форматирование текста результатов поиска"""
+    query = html.escape(query)
+
+    if not tasks:
+        return f"""🔍 <b>Поиск: {query}</b>
+
+Ничего не найдено.
+
+<i>Попробуй другие слова или часть слова</i>"""
+
+    tasks_text = f"🔍 <b>Поиск: {query}</b>\n\n"
+
+    for i, task in enumerate(tasks, 1):
+        status_emoji = "✅" if task['status'] else "⏳"
+        created_date = format_datetime_for_user(
+            task['created_at'], user_timezone
+        ).split(' в ')[0]
+
+        task_text = task['task_text']
+        if len(task_text) > 60:
+            task_text = task_text[:57] + "..."
+
+        tasks_text += f"{i}. {status_emoji} <i>{task_text}</i>\n"
+        tasks_text += f"   📅 {created_date}\n\n"
+
+    tasks_text += "👇 <i>Нажми на задачу для подробного просмотра</i>"
+    return tasks_text
+
+
+def format_added_tasks_text(
+    task_texts: list,
+    max_length: int = MESSAGE_MAX_LENGTH
+) -> str:
+    """
+    Подтверждение добавления нескольких задач
+
+    Список задач обрезается так, чтобы сообщение уложилось в max_length;
+    о не поместившихся задачах говорит последняя строка.
+    """
+    text = f"✅ <b>Добавлено задач: {len(task_texts)}</b>\n\n"
+    # Запас под строку о не поместившихся задачах
+    budget = max_length - len(text) - 40
+
+    lines = []
+    for task_text in task_texts:
+        if len(task_text) > 60:
+            task_text = task_text[:57] + "..."
+        line = f"• <i>{html.escape(task_text)}</i>"
+        budget -= len(line) + 1
+        if budget < 0:
+            break
+        lines.append(line)
+
+    text += "\n".join(lines)
+    hidden = len(task_texts) - len(lines)
+    if hidden:
+        text += f"\n<i>…и еще {hidden}</i>"
+    return text
@@ -0,0 +1,43 @@
+import csv
+import io
+from typing import List
+
+
+def decode_file(data: bytes) -> str:
+    """Декодирование текстового файла: UTF-8 (с BOM или без) или cp1251"""
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("cp1251")
+
+
+def parse_tasks_file(data: bytes, filename: str = "") -> List[str]:
+    """
+    Извлечение текстов задач из загруженного файла
+
+    Текстовый файл — одна задача на строку. В CSV берется колонка
+    task_text (как в выгрузке /export), а если заголовка нет —
+    первая колонка. Пустые строки пропускаются.
+    """
+    text = decode_file(data)
+
+    if not filename.lower().endswith(".csv"):
+        return [line for line in text.splitlines() if line.strip()]
+
+    rows = csv.reader(io.StringIO(text))
+    header = next(rows, [])
+    column = 0
+    task_texts = []
+
+    normalized = [name.strip().lower() for name in header]
+    if "task_text" in normalized:
+        column = normalized.index("task_text")
+    elif header:
+        task_texts.append(header[0])
+
+    for row in rows:
+        if not any(value.strip() for value in row):
+            continue
+        task_texts.append(row[column] if column < len(row) else "")
+
+    return task_texts